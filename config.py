@@ -31,6 +31,15 @@ class Config:
     GOOGLE_CLOUD_PROJECT = os.environ.get('GOOGLE_CLOUD_PROJECT')
     GCS_BUCKET_NAME = os.environ.get('GCS_BUCKET_NAME')
     
+    # Pools de conexão dos clientes compartilhados (src/core/clientes.py)
+    GCS_POOL_MAX = int(os.environ.get('GCS_POOL_MAX', '16'))
+    PINECONE_POOL_MAX = int(os.environ.get('PINECONE_POOL_MAX', '16'))
+    HTTP_POOL_MAX = int(os.environ.get('HTTP_POOL_MAX', '10'))
+
+    # Cache de Signed URLs: re-assina quando restar menos que RENOVAR_ANTES segundos
+    SIGNED_URL_CACHE_MAX = int(os.environ.get('SIGNED_URL_CACHE_MAX', '4096'))
+    SIGNED_URL_RENOVAR_ANTES = float(os.environ.get('SIGNED_URL_RENOVAR_ANTES', '900'))
+
     # Validação opcional para evitar erros tardios de upload
     if not GCS_BUCKET_NAME:
         print("AVISO: 'GCS_BUCKET_NAME' não configurado. Uploads falharão.")
@@ -45,6 +54,87 @@ class Config:
         print("AVISO: 'GOOGLE_API_KEY' ausente. O Chatbot não funcionará.")
 
     PINECONE_INDEX_NAME = os.environ.get('PINECONE_INDEX_NAME', 'laurabot-comunicados')
+    PINECONE_LOTE_UPSERT = int(os.environ.get('PINECONE_LOTE_UPSERT', '100'))
+
+    # Embeddings em lote: teto de concorrência e limite de requisições/minuto por API key
+    EMBEDDING_CONCORRENCIA = int(os.environ.get('EMBEDDING_CONCORRENCIA', '4'))
+    EMBEDDING_RPM = float(os.environ.get('EMBEDDING_RPM', '1500'))
+    EMBEDDING_LOTE_MAX_TEXTOS = int(os.environ.get('EMBEDDING_LOTE_MAX_TEXTOS', '100'))
+
+    # Cache de embeddings de consultas (LRU em memória + camada opcional em disco)
+    EMBEDDING_CACHE_MAX = int(os.environ.get('EMBEDDING_CACHE_MAX', '2048'))
+    EMBEDDING_CACHE_TTL = float(os.environ.get('EMBEDDING_CACHE_TTL', str(7 * 24 * 3600)))
+    EMBEDDING_CACHE_DISCO = os.environ.get('EMBEDDING_CACHE_DISCO')  # Ex: /tmp/laurabot_cache.db
+
+    # Cache de buscas (invalidado pela versão do corpus a cada ingestão/edição/exclusão)
+    RETRIEVAL_CACHE_MAX = int(os.environ.get('RETRIEVAL_CACHE_MAX', '1024'))
+    RETRIEVAL_CACHE_TTL = float(os.environ.get('RETRIEVAL_CACHE_TTL', '600'))
+    CORPUS_VERSAO_INTERVALO = float(os.environ.get('CORPUS_VERSAO_INTERVALO', '5'))
+    # Atraso de consistência do Pinecone: a versão muda de novo após esse tempo
+    PINECONE_ATRASO_CONSISTENCIA = float(os.environ.get('PINECONE_ATRASO_CONSISTENCIA', '10'))
+
+    # Texto dos fragmentos fora do metadata do Pinecone: 'firestore' (padrão) ou 'sqlite'
+    TEXTOS_BACKEND = os.environ.get('TEXTOS_BACKEND', 'firestore')
+    TEXTOS_SQLITE_PATH = os.environ.get('TEXTOS_SQLITE_PATH', '/tmp/laurabot_textos.db')
+    TEXTOS_CACHE_MAX = int(os.environ.get('TEXTOS_CACHE_MAX', '4096'))
+
+    # Busca do chat com vários filhos: uma busca por filho em paralelo (prazo por ramo)
+    CHAT_BUSCA_WORKERS = int(os.environ.get('CHAT_BUSCA_WORKERS', '8'))
+    CHAT_BUSCA_TIMEOUT = float(os.environ.get('CHAT_BUSCA_TIMEOUT', '4'))
+    CHAT_BUSCA_MAX_DOCS = int(os.environ.get('CHAT_BUSCA_MAX_DOCS', '6'))
+    # Preparação do turno em pipeline concorrente; prazos contados do início do turno
+    CHAT_TURNO_WORKERS = int(os.environ.get('CHAT_TURNO_WORKERS', '16'))
+    CHAT_PRAZO_HISTORICO = float(os.environ.get('CHAT_PRAZO_HISTORICO', '2'))
+    CHAT_PRAZO_BUSCA = float(os.environ.get('CHAT_PRAZO_BUSCA', '6'))
+    CHAT_PRAZO_ASSINATURA = float(os.environ.get('CHAT_PRAZO_ASSINATURA', '8'))
+    # Cache de conversas em processo (histórico lido da memória; Firestore só no miss)
+    CHAT_CONVERSAS_MAX = int(os.environ.get('CHAT_CONVERSAS_MAX', '2000'))
+    CHAT_CONVERSAS_TTL = float(os.environ.get('CHAT_CONVERSAS_TTL', '3600'))
+    CHAT_CONVERSA_MENSAGENS = int(os.environ.get('CHAT_CONVERSA_MENSAGENS', '20'))
+    # Histórico do chat gravado em batches (write-behind): lote cheio ou intervalo vencido
+    GRAVACAO_LOTE_MAX = int(os.environ.get('GRAVACAO_LOTE_MAX', '200'))
+    GRAVACAO_INTERVALO = float(os.environ.get('GRAVACAO_INTERVALO', '1'))
+    GRAVACAO_BUFFER_MAX = int(os.environ.get('GRAVACAO_BUFFER_MAX', '5000'))
+    GRAVACAO_TENTATIVAS = int(os.environ.get('GRAVACAO_TENTATIVAS', '5'))
+
+    # Chunking: tamanho da janela e sobreposição (em caracteres)
+    CHUNK_TAMANHO = int(os.environ.get('CHUNK_TAMANHO', '1500'))
+    CHUNK_SOBREPOSICAO = int(os.environ.get('CHUNK_SOBREPOSICAO', '200'))
+
+    # === EXTRAÇÃO DE PDF ===
+    # Motor: 'auto' (pypdf; pdfplumber só nas páginas com tabela/grade), 'rapido' ou 'layout'
+    PARSER_MOTOR = os.environ.get('PARSER_MOTOR', 'auto')
+    # Pool de processos por intervalos de páginas; PDFs menores que o mínimo ficam no próprio processo
+    PARSER_WORKERS = int(os.environ.get('PARSER_WORKERS', '2'))
+    PARSER_PAGINAS_POR_LOTE = int(os.environ.get('PARSER_PAGINAS_POR_LOTE', '4'))
+    PARSER_MIN_PAGINAS_PARALELO = int(os.environ.get('PARSER_MIN_PAGINAS_PARALELO', '6'))
+    # Sandbox: extração em processos filhos com prazo por página e teto de memória (RSS)
+    PARSER_SANDBOX = os.environ.get('PARSER_SANDBOX', 'True').lower() in ('true', '1')
+    PARSER_TIMEOUT_PAGINA = float(os.environ.get('PARSER_TIMEOUT_PAGINA', '30'))
+    PARSER_MAX_MEMORIA_MB = int(os.environ.get('PARSER_MAX_MEMORIA_MB', '768'))
+    PARSER_MAX_PAGINAS = int(os.environ.get('PARSER_MAX_PAGINAS', '300'))
+    PARSER_MAX_BYTES = int(os.environ.get('PARSER_MAX_BYTES', str(40 * 1024 * 1024)))
+
+    # === NORMALIZAÇÃO DE TEXTO ===
+    # Linhas de topo/rodapé repetidas em 'FRACAO' das páginas (ou em MIN_DOCS documentos) são removidas
+    NORMALIZACAO_ZONA_LINHAS = int(os.environ.get('NORMALIZACAO_ZONA_LINHAS', '6'))
+    NORMALIZACAO_FRACAO_PAGINAS = float(os.environ.get('NORMALIZACAO_FRACAO_PAGINAS', '0.5'))
+    NORMALIZACAO_CORPUS_MIN_DOCS = int(os.environ.get('NORMALIZACAO_CORPUS_MIN_DOCS', '3'))
+    NORMALIZACAO_CORPUS_TTL = float(os.environ.get('NORMALIZACAO_CORPUS_TTL', '300'))
+
+    # === INGESTÃO (FILA DE PROCESSAMENTO) ===
+    # Backend da fila: 'memoria' (padrão) ou 'sqlite' (persiste em arquivo local)
+    INGESTAO_BACKEND = os.environ.get('INGESTAO_BACKEND', 'memoria')
+    INGESTAO_SQLITE_PATH = os.environ.get('INGESTAO_SQLITE_PATH', '/tmp/laurabot_fila.db')
+    INGESTAO_WORKERS = int(os.environ.get('INGESTAO_WORKERS', '2'))
+    INGESTAO_FILA_MAX = int(os.environ.get('INGESTAO_FILA_MAX', '200'))
+    INGESTAO_MAX_TENTATIVAS = int(os.environ.get('INGESTAO_MAX_TENTATIVAS', '3'))
+    INGESTAO_BACKOFF_BASE = float(os.environ.get('INGESTAO_BACKOFF_BASE', '5'))
+    INGESTAO_ETAPA_TENTATIVAS = int(os.environ.get('INGESTAO_ETAPA_TENTATIVAS', '3'))
+    INGESTAO_ETAPA_BACKOFF = float(os.environ.get('INGESTAO_ETAPA_BACKOFF', '1'))
+    INGESTAO_VARRER_NA_INICIALIZACAO = os.environ.get('INGESTAO_VARRER_NA_INICIALIZACAO', 'True').lower() in ('true', '1')
+    # Spool local do upload: a extração lê daqui enquanto o envio ao GCS corre em paralelo
+    INGESTAO_SPOOL_DIR = os.environ.get('INGESTAO_SPOOL_DIR', '/tmp/laurabot_spool')
 
     # === FLASK & SEGURANÇA ===
     # Detecta ambiente: Se FLASK_DEBUG for '1' ou 'True', estamos em DEV.
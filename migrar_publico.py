@@ -0,0 +1,31 @@
+"""
+Script Utilitário: migrar_publico.py
+Grava as chaves de público-alvo ('publico') nos vetores de comunicados indexados
+antes delas existirem. Sem a chave, o vetor não aparece nas buscas filtradas do chat.
+
+Idempotente: pode ser executado de novo a qualquer momento.
+"""
+
+from src import create_app
+from src.admin.services import COLLECTION_COMUNICADOS
+from src.core import publico, vector_db
+from src.core.database import db
+
+app = create_app()
+
+def migrar():
+    with app.app_context():
+        total = 0
+        for doc in db.collection(COLLECTION_COMUNICADOS).where('status', '==', 'concluido').stream():
+            dados = doc.to_dict()
+            chaves = publico.chaves_documento(**dados)
+            try:
+                vector_db.atualizar_metadados_vetor(doc.id, {'publico': chaves}, dados.get('vetor_chunks'))
+                total += 1
+                print(f"✅ {doc.id}: {chaves}")
+            except Exception as e:
+                print(f"❌ {doc.id}: {e}")
+        print(f"--- {total} comunicado(s) atualizado(s) ---")
+
+if __name__ == "__main__":
+    migrar()
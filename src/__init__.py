@@ -7,7 +7,7 @@ from werkzeug.middleware.proxy_fix import ProxyFix # Importação necessária pa
 from config import Config
 
 # Importa as instâncias das extensões centralizadas
-from .core.extensions import csrf, limiter, oauth
+from .core.extensions import csrf, limiter, oauth, fila_ingestao, gravador_historico
 from .core.constants import DADOS_ESCOLA
 
 def create_app(config_class=Config):
@@ -33,6 +33,7 @@ def create_app(config_class=Config):
     csrf.init_app(app)
     limiter.init_app(app) # Rate Limiting
     oauth.init_app(app)
+    gravador_historico.init_app(app)
     
     google_client_id = app.config.get('GOOGLE_CLIENT_ID')
     google_client_secret = app.config.get('GOOGLE_CLIENT_SECRET')
@@ -72,6 +73,16 @@ def create_app(config_class=Config):
     from .admin import admin_bp
     app.register_blueprint(admin_bp)
 
+    # Fila de Ingestão: os workers sobem sob demanda no primeiro upload.
+    # A varredura re-enfileira PDFs que ficaram 'processando' após um restart.
+    from .admin.services import processar_comunicado, marcar_erro_comunicado, varrer_comunicados_pendentes
+    fila_ingestao.init_app(
+        app,
+        processador=processar_comunicado,
+        ao_falhar=marcar_erro_comunicado,
+        varredor=varrer_comunicados_pendentes
+    )
+
     # 4. Rota de Health Check
     @app.route("/health")
     def health_check():
@@ -1,12 +1,10 @@
 """
 Rotas do Módulo Admin
 
-Refatorado: Passagem segura de parâmetros para Thread (Blob Name).
+Refatorado: Processamento delegado à fila de ingestão (pool limitado de workers).
 """
-import threading
 import unicodedata
 import re
-import traceback # Para imprimir erro detalhado no terminal
 from flask import (
     render_template, 
     session, 
@@ -14,18 +12,21 @@ from flask import (
     url_for, 
     flash, 
     abort, 
-    request, 
-    current_app
+    request
 )
 from google.cloud import firestore
 
 from . import admin_bp
-from src.core import parser, storage, vector_db
+from .services import COLLECTION_COMUNICADOS, gravar_spool, montar_payload, remover_spool
+from src.core import publico, storage, vector_db
+from src.core.clientes import registro as registro_clientes
 from src.core.database import db 
+from src.core.extensions import fila_ingestao
+from src.core.fila import FilaCheia
 from src.core.logger import get_logger
+from src.core.metricas import metricas
 
 logger = get_logger(__name__)
-COLLECTION_COMUNICADOS = 'comunicados'
 
 # === FUNÇÕES AUXILIARES ===
 
@@ -48,99 +49,6 @@ def restringir_acesso():
     if 'user_profile' not in session: return redirect(url_for('auth_bp.login'))
     if not verificar_admin(): abort(403)
 
-# === TAREFA EM BACKGROUND (WORKER) ===
-
-def _tarefa_processamento_background(app, doc_id, nome_blob, url_download_placeholder, nome_arquivo, dados_manuais):
-    """
-    Executa o processamento pesado.
-    Usa 'nome_blob' para download seguro.
-    """
-    print(f"🚀 [THREAD] Iniciando processamento para: {doc_id}") # Debug Visual
-    
-    with app.app_context():
-        try:
-            # 1. Baixa o PDF usando o NOME SEGURO
-            print(f"📥 [THREAD] Baixando blob: {nome_blob}...")
-            arquivo_bytes = storage.download_bytes_by_name(nome_blob)
-            
-            # 2. Extrai Texto
-            print("📄 [THREAD] Extraindo texto...")
-            texto_extraido = parser.extrair_texto_pdf(arquivo_bytes)
-            if not texto_extraido:
-                raise ValueError("OCR retornou texto vazio ou PDF ilegível.")
-
-            # 3. Inteligência Artificial
-            print("🤖 [THREAD] Consultando Gemini...")
-            metadados_ia = parser.analisar_metadados_ia(texto_extraido, nome_arquivo)
-            
-            # 4. Merge de Dados
-            segmento = dados_manuais['segmento'] if dados_manuais['segmento'] else metadados_ia['segmento']
-            series = dados_manuais['series'] if dados_manuais['series'] else metadados_ia['series']
-            
-            turmas_ia = metadados_ia.get('turmas', [])
-            turmas = dados_manuais['turmas'] if dados_manuais['turmas'] else turmas_ia
-            
-            assunto = metadados_ia.get('assunto', 'Processado Automaticamente')
-            
-            # 5. Atualiza Firestore
-            print("💾 [THREAD] Salvando no Firestore...")
-            doc_ref = db.collection(COLLECTION_COMUNICADOS).document(doc_id)
-            doc_ref.update({
-                'segmento': segmento,
-                'series': series,
-                'turmas': turmas,
-                'assunto': assunto,
-                'status': 'concluido',
-                'processado_em': firestore.SERVER_TIMESTAMP
-            })
-            
-            # 6. Salva no Vetor
-            print("🧠 [THREAD] Salvando no Pinecone...")
-            metadados_vetor = {
-                'nome_arquivo': nome_arquivo,
-                'url_download': nome_blob, # AGORA SALVAMOS O BLOB NAME (ID)
-                'segmento': segmento,
-                'series': series,
-                'periodos': dados_manuais['periodos'],
-                'turmas': turmas,
-                'integral': dados_manuais['integral'],
-                'assunto': assunto
-            }
-            
-            series_str = ", ".join(series) if series else "Todas"
-            turmas_str = ", ".join(turmas) if turmas else "Todas"
-            
-            texto_final = (
-                f"Metadados Importantes:\n"
-                f"Assunto: {assunto}\n"
-                f"Segmento: {segmento}\n"
-                f"Séries: {series_str}\n"
-                f"Turmas: {turmas_str}\n"
-                f"----------------\n"
-                f"{texto_extraido}"
-            )
-            
-            vector_db.salvar_no_vetor(doc_id, texto_final, metadados_vetor)
-            
-            print(f"✅ [THREAD] SUCESSO TOTAL: {doc_id}")
-            logger.info(f"[BG] Sucesso total no arquivo {doc_id}")
-
-        except Exception as e:
-            err_msg = str(e)
-            print(f"❌ [THREAD] ERRO FATAL: {err_msg}")
-            traceback.print_exc() # Imprime erro completo no terminal
-            logger.error(f"[BG] Erro ao processar {doc_id}: {e}", exc_info=True)
-            
-            # Tenta atualizar o status para erro no Firestore
-            try:
-                if db:
-                    db.collection(COLLECTION_COMUNICADOS).document(doc_id).update({
-                        'status': 'erro',
-                        'erro_msg': f"Falha no processamento: {err_msg}"
-                    })
-            except Exception as db_err:
-                 logger.critical(f"Falha ao salvar status de erro no DB: {db_err}")
-
 # === ROTAS ===
 
 @admin_bp.route('/')
@@ -155,19 +63,15 @@ def gerenciar_arquivos():
         for doc in docs_ref:
             dados = doc.to_dict()
             dados['id'] = doc.id
-            
-            # GERA SIGNED URL DINAMICAMENTE
-            if dados.get('url_download'):
-                # Assumindo que url_download agora guarda o nome_blob (ID)
-                # Se for URL antiga, o generate_signed_url deve falhar ou o storage.delete_file deve tratar (no delete já tratamos)
-                # Vamos tentar gerar. Se falhar, fica vazio.
-                signed_url = storage.generate_signed_url(dados['url_download'])
-                if signed_url:
-                    dados['url_visualizacao'] = signed_url
-                else:
-                    dados['url_visualizacao'] = "#"
-            
             arquivos.append(dados)
+
+        # GERA SIGNED URLs EM LOTE (um setup de credenciais + cache por blob)
+        # url_download guarda o nome_blob (ID). URLs antigas falham e ficam "#".
+        urls = storage.generate_signed_urls(a['url_download'] for a in arquivos if a.get('url_download'))
+        for dados in arquivos:
+            if dados.get('url_download'):
+                dados['url_visualizacao'] = urls.get(dados['url_download']) or "#"
+
         return render_template('admin/gerenciar.html', arquivos=arquivos)
     except Exception as e:
         logger.error(f"Erro dashboard: {e}", exc_info=True)
@@ -186,13 +90,40 @@ def check_status(doc_id):
             return {"status": "erro", "msg": "Não encontrado"}, 404
         
         dados = doc.to_dict()
+        job = fila_ingestao.obter(doc_id)
         return {
             "status": dados.get('status', 'processando'),
-            "msg": dados.get('erro_msg', '')
+            "msg": dados.get('erro_msg', ''),
+            "tentativas": job['tentativas'] if job else 0
         }
     except Exception as e:
         return {"status": "erro", "msg": str(e)}, 500
 
+@admin_bp.route('/metricas')
+def painel_metricas():
+    """
+    Métricas do processo em JSON (throughput de embeddings, caches, filas...).
+    """
+    dados = metricas.snapshot()
+    dados['contadores']['fila.ingestao.pendentes'] = fila_ingestao.pendentes()
+    return dados
+
+@admin_bp.route('/clientes')
+def saude_clientes():
+    """
+    Saúde dos clientes compartilhados (Storage, Pinecone, Firestore, HTTP).
+    """
+    return registro_clientes.saude()
+
+@admin_bp.route('/clientes/<nome>/reset', methods=['POST'])
+def resetar_cliente(nome):
+    """
+    Descarta um cliente (ex: conexão travada). Ele é recriado no próximo uso.
+    """
+    registro_clientes.resetar(nome)
+    logger.warning(f"Cliente '{nome}' resetado por {session['user_profile'].get('email')}")
+    return registro_clientes.saude()
+
 @admin_bp.route('/upload')
 def upload_form():
     return render_template('admin/upload.html')
@@ -229,11 +160,13 @@ def upload_arquivo():
         return redirect(url_for('admin_bp.upload_form'))
 
     user_email = session['user_profile']['email']
+    spool = None
 
     try:
-        # 1. Upload Seguro (Retorna NOME DO BLOB apenas)
-        nome_blob_1, nome_blob_2 = storage.upload_file(arquivo, arquivo.filename)
-        nome_blob = nome_blob_1 # Ambos são iguais agora
+        # 1. Spool local durável. O envio ao GCS acontece no worker, em paralelo com a extração;
+        # o NOME DO BLOB é gerado aqui para o Firestore já apontar para ele.
+        nome_blob = storage.gerar_nome_blob(arquivo.filename)
+        spool = gravar_spool(arquivo, nome_blob)
         
         doc_id = limpar_nome_para_id(arquivo.filename)
         
@@ -260,21 +193,26 @@ def upload_arquivo():
         
         db.collection(COLLECTION_COMUNICADOS).document(doc_id).set(metadados_iniciais)
         
-        # 4. Dispara Thread com NOME DO BLOB
-        app_real = current_app._get_current_object()
-        thread = threading.Thread(
-            target=_tarefa_processamento_background,
-            # Passamos nome_blob
-            args=(app_real, doc_id, nome_blob, nome_blob, arquivo.filename, dados_manuais)
-        )
-        thread.start()
+        # 4. Enfileira o processamento (pool limitado de workers) com NOME DO BLOB
+        fila_ingestao.enfileirar(doc_id, montar_payload(doc_id, nome_blob, arquivo.filename, dados_manuais, spool))
 
         logger.info(f"Upload iniciado: {doc_id}")
         flash(f"Upload iniciado! Processando em segundo plano.", "success")
         return redirect(url_for('admin_bp.gerenciar_arquivos'))
 
+    except FilaCheia as e:
+        logger.warning(f"Upload recusado, fila cheia: {e}")
+        remover_spool(spool)
+        db.collection(COLLECTION_COMUNICADOS).document(doc_id).update({
+            'status': 'erro',
+            'erro_msg': "Fila de processamento cheia. Tente novamente em alguns minutos."
+        })
+        flash("Muitos arquivos em processamento. Tente novamente em alguns minutos.", "error")
+        return redirect(url_for('admin_bp.gerenciar_arquivos'))
+
     except Exception as e:
         logger.critical(f"Erro no início do upload: {e}", exc_info=True)
+        remover_spool(spool)
         flash(f"Erro ao iniciar: {e}", "error")
         return redirect(url_for('admin_bp.dashboard'))
 
@@ -287,7 +225,7 @@ def excluir_arquivo(doc_id):
         if doc.exists:
             dados = doc.to_dict()
             if dados.get('url_download'): storage.delete_file(dados['url_download'])
-            vector_db.excluir_do_vetor(doc_id)
+            vector_db.excluir_do_vetor(doc_id, dados.get('vetor_chunks'))
             doc_ref.delete()
             flash("Excluído com sucesso.", "success")
     except Exception as e:
@@ -311,7 +249,9 @@ def editar_arquivo(doc_id):
                 'integral': True if request.form.get('integral') == 'on' else False
             }
             doc_ref.update(novos)
-            vector_db.atualizar_metadados_vetor(doc_id, novos)
+            vector_db.atualizar_metadados_vetor(
+                doc_id, {**novos, 'publico': publico.chaves_documento(**novos)}, doc.to_dict().get('vetor_chunks')
+            )
             flash("Atualizado.", "success")
             return redirect(url_for('admin_bp.gerenciar_arquivos'))
         except Exception as e:
@@ -0,0 +1,300 @@
+"""
+Camada de Serviço (Service Layer) do Admin
+
+Pipeline de ingestão de comunicados executado pelos workers da fila
+(src.core.fila): spool -> extração -> normalização -> classificação IA -> Pinecone -> Firestore.
+
+O upload do admin é gravado em um spool local (durável) e a requisição
+retorna; o worker extrai direto do spool enquanto o envio ao GCS corre em
+paralelo. Sem spool (ex: outra instância), cai no download do GCS.
+"""
+
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, BinaryIO, Dict, List, Optional
+
+from flask import current_app
+from google.cloud import firestore
+
+from src.core import extracao, normalizacao, parser, publico, storage, vector_db
+from src.core.database import db
+from src.core.fila import ErroPermanente, FilaTrabalhos, STATUS_ATIVOS, executar_etapa
+from src.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+COLLECTION_COMUNICADOS = 'comunicados'
+
+
+def montar_payload(doc_id: str, nome_blob: str, nome_arquivo: str, dados_manuais: dict,
+                   caminho_spool: Optional[str] = None) -> Dict[str, Any]:
+    """Payload serializável (JSON) guardado no registro do job."""
+    return {
+        'doc_id': doc_id,
+        'nome_blob': nome_blob,
+        'nome_arquivo': nome_arquivo,
+        'dados_manuais': dados_manuais,
+        'caminho_spool': caminho_spool,
+    }
+
+
+# === SPOOL DO UPLOAD ===
+
+def caminho_spool(nome_blob: str) -> str:
+    """Caminho determinístico: o varredor reencontra o spool após um reinício."""
+    return os.path.join(current_app.config.get('INGESTAO_SPOOL_DIR', '/tmp/laurabot_spool'), nome_blob)
+
+
+def gravar_spool(arquivo: BinaryIO, nome_blob: str) -> str:
+    """
+    Grava o upload em disco de forma durável (fsync + rename atômico).
+    Ao retornar, o arquivo sobrevive a uma queda do processo.
+    """
+    destino = caminho_spool(nome_blob)
+    pasta = os.path.dirname(destino)
+    os.makedirs(pasta, exist_ok=True)
+
+    descritor, temporario = tempfile.mkstemp(dir=pasta, suffix='.parcial')
+    try:
+        with os.fdopen(descritor, 'wb') as saida:
+            arquivo.seek(0)
+            while True:
+                bloco = arquivo.read(1024 * 1024)
+                if not bloco:
+                    break
+                saida.write(bloco)
+            saida.flush()
+            os.fsync(saida.fileno())
+        os.replace(temporario, destino)
+    except Exception:
+        remover_spool(temporario)
+        raise
+
+    # fsync do diretório garante que o rename também está em disco
+    fd_pasta = os.open(pasta, os.O_RDONLY)
+    try:
+        os.fsync(fd_pasta)
+    finally:
+        os.close(fd_pasta)
+    return destino
+
+
+def remover_spool(caminho: Optional[str]) -> None:
+    if not caminho:
+        return
+    try:
+        os.remove(caminho)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"[SPOOL] Não foi possível remover {caminho}: {e}")
+
+
+_executor_envios: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def _get_executor_envios() -> ThreadPoolExecutor:
+    """Um envio ao GCS por worker de ingestão, no máximo."""
+    global _executor_envios
+    if _executor_envios is None:
+        with _executor_lock:
+            if _executor_envios is None:
+                _executor_envios = ThreadPoolExecutor(
+                    max_workers=int(current_app.config.get('INGESTAO_WORKERS', 2)),
+                    thread_name_prefix='ingestao-gcs'
+                )
+    return _executor_envios
+
+
+def _enviar_spool(app, caminho: str, nome_blob: str, nome_arquivo: str) -> None:
+    with app.app_context():
+        with open(caminho, 'rb') as arquivo:
+            _etapa('upload', storage.upload_file, arquivo, nome_arquivo, nome_blob=nome_blob)
+
+
+def _iniciar_envio(caminho: str, nome_blob: str, nome_arquivo: str) -> Future:
+    app = current_app._get_current_object()
+    return _get_executor_envios().submit(_enviar_spool, app, caminho, nome_blob, nome_arquivo)
+
+
+def _etapa(nome: str, funcao, *args, **kwargs):
+    """Atalho para executar_etapa com os limites de retry da configuração."""
+    return executar_etapa(
+        nome, funcao, *args,
+        tentativas=int(current_app.config.get('INGESTAO_ETAPA_TENTATIVAS', 3)),
+        espera_base=float(current_app.config.get('INGESTAO_ETAPA_BACKOFF', 1.0)),
+        **kwargs
+    )
+
+
+def processar_comunicado(payload: Dict[str, Any]) -> None:
+    """
+    Executa o processamento pesado de um comunicado (roda dentro de um worker da fila).
+    Com spool: extrai do disco local e envia ao GCS em paralelo.
+    Sem spool: usa 'nome_blob' para download seguro.
+    """
+    doc_id = payload['doc_id']
+    nome_blob = payload['nome_blob']
+    nome_arquivo = payload['nome_arquivo']
+    dados_manuais = payload['dados_manuais']
+    spool = payload.get('caminho_spool')
+
+    logger.info(f"[BG] Iniciando processamento para: {doc_id}")
+
+    envio: Optional[Future] = None
+    try:
+        # 1. Origem do PDF: spool local (envio ao GCS em paralelo) ou download pelo NOME SEGURO
+        if spool and os.path.exists(spool):
+            envio = _iniciar_envio(spool, nome_blob, nome_arquivo)
+            origem = spool
+        else:
+            origem = _etapa('download', storage.download_bytes_by_name, nome_blob)
+
+        total_fragmentos, campos = _indexar(doc_id, nome_blob, nome_arquivo, dados_manuais, origem)
+
+        # 'concluido' exige o PDF no bucket (o link da resposta aponta para ele)
+        if envio is not None:
+            envio.result()
+    finally:
+        # Nunca deixa um envio órfão rodando quando o job falha e é reagendado
+        if envio is not None:
+            wait([envio])
+
+    # 6. Atualiza Firestore
+    doc_ref = db.collection(COLLECTION_COMUNICADOS).document(doc_id)
+    _etapa('firestore', doc_ref.update, {
+        **campos,
+        'status': 'concluido',
+        'vetor_chunks': total_fragmentos, # Manifesto para exclusão/edição
+        'processado_em': firestore.SERVER_TIMESTAMP
+    })
+
+    remover_spool(spool)
+    logger.info(f"[BG] Sucesso total no arquivo {doc_id}")
+
+
+def _indexar(doc_id: str, nome_blob: str, nome_arquivo: str, dados_manuais: dict, origem: Any):
+    """Extração -> classificação IA -> Pinecone. Retorna (total_fragmentos, campos do Firestore)."""
+    # 2. Extrai Texto por página (erro de leitura não melhora com retry)
+    try:
+        detalhes = parser.extrair_paginas_detalhadas(origem)
+    except extracao.ArquivoRecusado as e:
+        raise ErroPermanente(str(e))
+
+    # 2b. Normalização: espaços do layout e timbre/rodapé repetidos não vão para embeddings nem prompts
+    boilerplate = normalizacao.get_boilerplate_corpus()
+    paginas, relatorio_normalizacao = normalizacao.normalizar_paginas(
+        [p['texto'] for p in detalhes], boilerplate.frequentes()
+    )
+    candidatas = relatorio_normalizacao.pop('candidatas')
+    logger.info(
+        f"[BG] Normalização {doc_id}: {relatorio_normalizacao['tokens_antes']} -> "
+        f"{relatorio_normalizacao['tokens_depois']} tokens (-{relatorio_normalizacao['economia_pct']}%)"
+    )
+    texto_extraido = parser.juntar_paginas(paginas)
+    if not texto_extraido:
+        raise ErroPermanente("OCR retornou texto vazio ou PDF ilegível.")
+
+    # 3. Inteligência Artificial (já possui fallback regex interno)
+    metadados_ia = parser.analisar_metadados_ia(texto_extraido, nome_arquivo)
+
+    # 4. Merge de Dados
+    segmento = dados_manuais['segmento'] if dados_manuais['segmento'] else metadados_ia['segmento']
+    series = dados_manuais['series'] if dados_manuais['series'] else metadados_ia['series']
+
+    turmas_ia = metadados_ia.get('turmas', [])
+    turmas = dados_manuais['turmas'] if dados_manuais['turmas'] else turmas_ia
+
+    assunto = metadados_ia.get('assunto', 'Processado Automaticamente')
+
+    # 5. Salva no Vetor (antes do Firestore: 'concluido' só depois do índice pronto)
+    metadados_vetor = {
+        'nome_arquivo': nome_arquivo,
+        'url_download': nome_blob, # AGORA SALVAMOS O BLOB NAME (ID)
+        'segmento': segmento,
+        'series': series,
+        'periodos': dados_manuais['periodos'],
+        'turmas': turmas,
+        'integral': dados_manuais['integral'],
+        'assunto': assunto
+    }
+    # Chaves de público pré-computadas: a busca filtra por série/turma com um único $in
+    metadados_vetor['publico'] = publico.chaves_documento(**metadados_vetor)
+
+    # Fragmentação por página/seção: N vetores 'doc_id#chunk_n'
+    total_fragmentos = _etapa('vetor', vector_db.salvar_no_vetor, doc_id, paginas, metadados_vetor)
+
+    # Alimenta a detecção de boilerplate entre documentos (melhor esforço)
+    boilerplate.registrar(doc_id, candidatas)
+
+    return total_fragmentos, {
+        'segmento': segmento,
+        'series': series,
+        'turmas': turmas,
+        'assunto': assunto,
+        'extracao': resumo_extracao(detalhes),
+        'normalizacao': relatorio_normalizacao,
+    }
+
+
+def resumo_extracao(detalhes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Motor usado em cada página (diagnóstico de qualidade/tempo da ingestão)."""
+    motores = [p.get('motor') for p in detalhes]
+    puladas = extracao.paginas_puladas(detalhes)
+    return {
+        'motores': motores,
+        'paginas_layout': [p['pagina'] for p in detalhes if p.get('motor') == 'layout'],
+        # Páginas além do máximo viram só um contador (podem ser milhares)
+        'paginas_puladas': [p for p in puladas if p['motivo'] != 'limite_paginas'],
+        'paginas_alem_do_limite': sum(1 for p in puladas if p['motivo'] == 'limite_paginas'),
+        'duracao_s': round(sum(p.get('duracao_s', 0.0) for p in detalhes), 3),
+    }
+
+
+def marcar_erro_comunicado(payload: Dict[str, Any], erro: str) -> None:
+    """Callback da fila quando o job esgota as tentativas."""
+    remover_spool(payload.get('caminho_spool'))
+    if db is None:
+        return
+    db.collection(COLLECTION_COMUNICADOS).document(payload['doc_id']).update({
+        'status': 'erro',
+        'erro_msg': f"Falha no processamento: {erro}"
+    })
+
+
+def varrer_comunicados_pendentes(fila: FilaTrabalhos) -> int:
+    """
+    Re-enfileira comunicados que ficaram em status 'processando' após um
+    reinício da instância (o job em memória se perdeu junto com o processo).
+    """
+    if db is None:
+        return 0
+
+    reenfileirados = 0
+    docs = db.collection(COLLECTION_COMUNICADOS).where('status', '==', 'processando').stream()
+    for doc in docs:
+        job = fila.obter(doc.id)
+        if job and job['status'] in STATUS_ATIVOS:
+            continue
+
+        dados = doc.to_dict()
+        if not dados.get('url_download'):
+            continue
+
+        dados_manuais = {
+            'segmento': dados.get('segmento'),
+            'series': dados.get('series', []),
+            'periodos': dados.get('periodos', []),
+            'turmas': dados.get('turmas', []),
+            'integral': dados.get('integral', False)
+        }
+        # Se o spool ainda estiver no disco desta instância, evita o download
+        fila.enfileirar(doc.id, montar_payload(
+            doc.id, dados['url_download'], dados.get('nome_arquivo', doc.id), dados_manuais,
+            caminho_spool=caminho_spool(dados['url_download'])
+        ))
+        reenfileirados += 1
+
+    return reenfileirados
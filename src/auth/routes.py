@@ -5,7 +5,6 @@ Gerencia as rotas para /login, /logout, callbacks e cadastro de estudantes.
 Versão: FINAL (Decodificação Manual Base64).
 """
 
-import requests
 import json
 import base64 # <--- Essencial para decodificar o token manualmente
 from flask import (
@@ -22,6 +21,7 @@ from flask import (
 from . import services as auth_services
 from . import auth_bp  
 from src.core.extensions import oauth
+from src.core.clientes import sessao_http
 from src.core.database import db
 from .forms import CadastroAlunosForm
 
@@ -93,7 +93,8 @@ def google_callback():
             'grant_type': 'authorization_code'
         }
 
-        resp = requests.post(token_url, data=payload)
+        # Sessão HTTP compartilhada: reaproveita a conexão TLS com o Google
+        resp = sessao_http().post(token_url, data=payload, timeout=15)
         
         if resp.status_code != 200:
             raise ValueError(f"Google recusou a troca: {resp.text}")
@@ -17,60 +17,15 @@ from flask import (
     Response, 
     stream_with_context
 )
-from google.cloud import firestore
 from src.core.extensions import limiter # Importa de extensions
 
 from . import chat_bp
-from src.core import vector_db 
-from src.core.database import db
+from . import services as chat_services
+from src.core import vector_db
 from src.core.logger import get_logger
 
 logger = get_logger(__name__)
 
-COLLECTION_HISTORY = 'chat_history'
-
-# ... (Funções auxiliares mantidas, apenas imports mudaram) ...
-
-def _salvar_mensagem(user_email: str, role: str, content: str, conversation_id: str):
-    """
-    Salva a mensagem no Firestore vinculada a um ID de conversa específico.
-    """
-    try:
-        db.collection(COLLECTION_HISTORY).add({
-            'user_email': user_email,
-            'conversation_id': conversation_id,
-            'role': role,
-            'content': content,
-            'timestamp': firestore.SERVER_TIMESTAMP
-        })
-    except Exception as e:
-        logger.error(f"Erro ao salvar mensagem no DB: {e}", exc_info=True)
-
-def _carregar_historico(user_email: str, conversation_id: str, limite=20) -> list:
-    """
-    Carrega apenas as mensagens da conversa ATUAL (filtrada pelo conversation_id).
-    """
-    try:
-        # Filtra por email E pelo ID da conversa atual
-        docs = (
-            db.collection(COLLECTION_HISTORY)
-            .where('user_email', '==', user_email)
-            .where('conversation_id', '==', conversation_id)
-            .order_by('timestamp', direction=firestore.Query.DESCENDING)
-            .limit(limite)
-            .stream()
-        )
-        historico = []
-        for doc in docs:
-            dados = doc.to_dict()
-            historico.append({
-                'role': dados.get('role'),
-                'content': dados.get('content')
-            })
-        return historico[::-1]
-    except Exception as e:
-        logger.error(f"Erro ao carregar histórico: {e}", exc_info=True)
-        return []
 
 @chat_bp.route('/')
 @limiter.limit("60 per minute") # Proteção F5 Spam
@@ -84,8 +39,10 @@ def index():
     conversation_id = str(uuid.uuid4())
     session['conversation_id'] = conversation_id
     
-    # Como o ID é novo, isso retornará uma lista vazia, forçando a mensagem inicial
-    historico = _carregar_historico(user_profile['email'], conversation_id)
+    # Como o ID é novo, o histórico é vazio: registra no cache de conversas (sem ir ao
+    # Firestore) e a mensagem inicial é exibida
+    chat_services.iniciar_conversa(user_profile['email'], conversation_id)
+    historico = chat_services.carregar_historico(user_profile['email'], conversation_id)
     
     mensagem_inicial = None
     if not historico:
@@ -108,6 +65,7 @@ def enviar_mensagem():
     if not conversation_id:
         conversation_id = str(uuid.uuid4())
         session['conversation_id'] = conversation_id
+        chat_services.iniciar_conversa(session['user_profile']['email'], conversation_id)
 
     data = request.get_json()
     mensagem_usuario = data.get('message', '').strip()
@@ -117,47 +75,17 @@ def enviar_mensagem():
     user_email = user_profile['email']
     filhos = user_profile.get('filhos', []) 
     
-    # 1. Salva pergunta original com o ID da conversa atual
-    _salvar_mensagem(user_email, 'user', mensagem_usuario, conversation_id)
-
-    # 2. Lógica de Contexto do Aluno (Query Expansion)
-    segmentos_busca = list(set([f['segmento'] for f in filhos]))
-    mensagem_lower = mensagem_usuario.lower()
-    filho_foco = None
-    
-    # Tenta identificar sobre qual filho o pai está falando
-    for filho in filhos:
-        primeiro_nome = filho['nome'].split()[0].lower()
-        if primeiro_nome in mensagem_lower:
-            filho_foco = filho
-            break
-    
-    if not filho_foco and len(filhos) == 1:
-        filho_foco = filhos[0]
-
-    # 3. Monta a Query Enriquecida
-    query_para_vetor = mensagem_usuario
-    
-    if filho_foco:
-        segmentos_busca = [filho_foco['segmento']]
-        serie = filho_foco.get('serie', '')
-        turma = filho_foco.get('turma', '')
-        
-        query_para_vetor = (
-            f"Comunicados escolares do {serie} turma {turma} sobre: {mensagem_usuario}"
-        )
-        logger.info(f"Query Enriquecida: '{query_para_vetor}' (Foco: {filho_foco['nome']})")
-    
     try:
-        # Carrega contexto para a IA (passando o conversation_id para manter coerência)
-        historico_contexto = _carregar_historico(user_email, conversation_id, 6)
+        # 1. Pipeline do turno: registra a pergunta (write-behind), lê o histórico e busca
+        # os documentos em paralelo; os links são assinados assim que a busca termina.
+        # Filho em foco -> uma busca enriquecida; vários filhos sem foco -> uma busca
+        # por filho em paralelo, fundidas (ver chat/services.py)
+        turno = chat_services.preparar_turno(user_email, conversation_id, mensagem_usuario, filhos, top_k=4)
 
-        # Busca Vetorial
-        documentos_relevantes = vector_db.buscar_documentos(
-            query=query_para_vetor, 
-            filtro_segmentos=segmentos_busca,
-            top_k=4
-        )
+        historico_contexto = turno.resultado('historico')
+        documentos_relevantes = turno.resultado('documentos')
+        urls_assinadas = turno.resultado('urls')
+        logger.info(f"[CHAT] Preparação do turno: {turno.server_timing()}")
 
         def gerar_stream():
             resposta_completa = ""
@@ -165,15 +93,18 @@ def enviar_mensagem():
                 pergunta=mensagem_usuario,
                 contextos=documentos_relevantes,
                 historico=historico_contexto,
-                perfil_usuario=user_profile
+                perfil_usuario=user_profile,
+                urls_assinadas=urls_assinadas
             ):
                 resposta_completa += chunk
                 yield chunk
             
-            # Salva resposta final com o ID da conversa atual
-            _salvar_mensagem(user_email, 'assistant', resposta_completa, conversation_id)
+            # Write-behind: não espera o Firestore (ordem garantida pelo gravador)
+            chat_services.salvar_mensagem(user_email, 'assistant', resposta_completa, conversation_id)
         
-        return Response(stream_with_context(gerar_stream()), mimetype='text/plain')
+        resposta = Response(stream_with_context(gerar_stream()), mimetype='text/plain')
+        resposta.headers['Server-Timing'] = turno.server_timing()
+        return resposta
 
     except Exception as e:
         logger.error(f"Erro chat: {e}", exc_info=True)
@@ -0,0 +1,299 @@
+"""
+Camada de Serviço do Chat (Histórico, Recuperação de Contexto e Preparação do Turno).
+
+Quando o responsável tem filhos em séries/segmentos diferentes e não cita
+nenhum, cada filho vira uma busca enriquecida própria. As buscas rodam em
+paralelo num executor compartilhado, com prazo por ramo: a latência total fica
+próxima à do ramo mais lento e um ramo atrasado só reduz o contexto.
+Os resultados são fundidos por doc id (Reciprocal Rank Fusion).
+
+Antes do primeiro token, as etapas de rede do turno rodam em um pipeline
+concorrente (src.core.pipeline): gravação da pergunta, leitura do histórico e
+embedding+busca em paralelo; a assinatura dos links começa assim que a busca
+termina. O tempo até o primeiro token passa a ser o do caminho mais lento.
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+from google.cloud import firestore
+
+from src.core import publico, vector_db
+from src.core.cache import CacheLRU, chave_hash
+from src.core.database import db
+from src.core.extensions import gravador_historico
+from src.core.logger import get_logger
+from src.core.metricas import metricas
+from src.core.pipeline import Pipeline
+
+logger = get_logger(__name__)
+
+COLLECTION_HISTORY = 'chat_history'
+
+# Constante usual do RRF: amortece a diferença entre 1º e 2º lugar de cada ramo
+_RRF_K = 60
+
+
+# === HISTÓRICO ===
+
+# Cache de conversas: cada conversation_id nasce no index() deste worker e a
+# conversa é curta, então o histórico fica em memória e é atualizado a cada
+# mensagem. O Firestore só é consultado num miss (ex: worker reiniciado).
+# Entradas: tupla de (id, role, content), as últimas CHAT_CONVERSA_MENSAGENS.
+_cache_conversas: Optional[CacheLRU] = None
+_lock_conversas = threading.Lock()
+
+def _get_cache_conversas() -> CacheLRU:
+    global _cache_conversas
+    if _cache_conversas is None:
+        with _lock_conversas:
+            if _cache_conversas is None:
+                _cache_conversas = CacheLRU(
+                    'conversas',
+                    max_itens=int(current_app.config.get('CHAT_CONVERSAS_MAX', 2000)),
+                    ttl=float(current_app.config.get('CHAT_CONVERSAS_TTL', 3600))
+                )
+    return _cache_conversas
+
+def _max_mensagens() -> int:
+    return int(current_app.config.get('CHAT_CONVERSA_MENSAGENS', 20))
+
+def _chave_conversa(user_email: str, conversation_id: str) -> str:
+    return chave_hash(user_email, conversation_id)
+
+def _guardar_conversa(chave: str, mensagens: Iterable[Tuple[str, Any, Any]]) -> None:
+    """Chamado com _lock_conversas. Substitui a tupla inteira: leitores nunca veem meia escrita."""
+    _get_cache_conversas().definir(chave, tuple(mensagens)[-_max_mensagens():])
+
+def iniciar_conversa(user_email: str, conversation_id: str) -> None:
+    """Conversa nova (id recém-gerado): histórico vazio conhecido, sem consulta ao Firestore."""
+    with _lock_conversas:
+        _guardar_conversa(_chave_conversa(user_email, conversation_id), ())
+
+def salvar_mensagem(user_email: str, role: str, content: str, conversation_id: str):
+    """
+    Registra a mensagem (vinculada ao ID da conversa) no gravador write-behind:
+    o turno não espera o Firestore. O horário é o do registro, não o do commit,
+    porque pergunta e resposta podem sair no mesmo batch.
+    """
+    doc_id = gravador_historico.registrar(COLLECTION_HISTORY, {
+        'user_email': user_email,
+        'conversation_id': conversation_id,
+        'role': role,
+        'content': content,
+        'timestamp': datetime.now(timezone.utc)
+    })
+    if doc_id is None:
+        return
+    chave = _chave_conversa(user_email, conversation_id)
+    with _lock_conversas:
+        atual = _get_cache_conversas().obter(chave)
+        # Sem entrada o cache não sabe o começo da conversa: o próximo miss lê do Firestore
+        if atual is not None and all(m[0] != doc_id for m in atual):
+            _guardar_conversa(chave, atual + ((doc_id, role, content),))
+
+def carregar_historico(user_email: str, conversation_id: str, limite=20) -> list:
+    """
+    Carrega apenas as mensagens da conversa ATUAL (filtrada pelo conversation_id).
+    Lê do cache de conversas; no miss, do Firestore mais o que ainda está no
+    buffer de gravação, e reabastece o cache.
+    """
+    chave = _chave_conversa(user_email, conversation_id)
+    maximo = _max_mensagens()
+    mensagens = _get_cache_conversas().obter(chave) if limite <= maximo else None
+    if mensagens is None:
+        mensagens = _carregar_do_firestore(user_email, conversation_id, max(limite, maximo))
+        if mensagens is not None and limite <= maximo:
+            with _lock_conversas:
+                _guardar_conversa(chave, mensagens)
+    if not mensagens:
+        return []
+    return [{'role': role, 'content': content} for _, role, content in mensagens[-limite:]]
+
+def _carregar_do_firestore(user_email: str, conversation_id: str, limite: int) -> Optional[tuple]:
+    """(id, role, content) em ordem, com as pendentes do buffer. None em caso de erro (não vai ao cache)."""
+    try:
+        # Filtra por email E pelo ID da conversa atual
+        docs = (
+            db.collection(COLLECTION_HISTORY)
+            .where('user_email', '==', user_email)
+            .where('conversation_id', '==', conversation_id)
+            .order_by('timestamp', direction=firestore.Query.DESCENDING)
+            .limit(limite)
+            .stream()
+        )
+        gravados = [(doc.id, doc.to_dict()) for doc in docs][::-1]
+    except Exception as e:
+        logger.error(f"Erro ao carregar histórico: {e}", exc_info=True)
+        return None
+
+    ids = {doc_id for doc_id, _ in gravados}
+    pendentes = gravador_historico.pendentes(
+        lambda colecao, dados: colecao == COLLECTION_HISTORY
+        and dados.get('conversation_id') == conversation_id and dados.get('user_email') == user_email
+    )
+    todos = gravados + [(doc_id, dados) for doc_id, dados in pendentes if doc_id not in ids]
+    return tuple((doc_id, dados.get('role'), dados.get('content')) for doc_id, dados in todos[-limite:])
+
+
+# === RECUPERAÇÃO ===
+
+def identificar_filho_foco(mensagem: str, filhos: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Filho citado pelo primeiro nome na mensagem (ou o único filho cadastrado)."""
+    mensagem_lower = mensagem.lower()
+    for filho in filhos:
+        primeiro_nome = filho['nome'].split()[0].lower()
+        if primeiro_nome in mensagem_lower:
+            return filho
+    return filhos[0] if len(filhos) == 1 else None
+
+
+def consulta_enriquecida(mensagem: str, filho: Dict[str, Any]) -> str:
+    """Query Expansion: série e turma do aluno entram no texto da busca."""
+    return f"Comunicados escolares do {filho.get('serie', '')} turma {filho.get('turma', '')} sobre: {mensagem}"
+
+
+def _ramos(mensagem: str, filhos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Uma busca por público distinto (irmãos na mesma turma compartilham o ramo)."""
+    ramos: Dict[tuple, Dict[str, Any]] = {}
+    for filho in filhos:
+        chaves = publico.chaves_aluno(filho)
+        ramos.setdefault(tuple(chaves), {
+            'rotulo': filho.get('nome', ''),
+            'query': consulta_enriquecida(mensagem, filho),
+            'publico': chaves,
+        })
+    return list(ramos.values())
+
+
+def fundir_resultados(resultados: List[List[dict]], limite: int) -> List[dict]:
+    """
+    Une as listas de cada ramo por doc id. Ordem por RRF (soma de 1/(k + posição)):
+    documento relevante para vários filhos sobe. Fica a versão de maior score.
+    """
+    fundidos: Dict[str, dict] = {}
+    pontos: Dict[str, float] = {}
+    for docs in resultados:
+        for posicao, doc in enumerate(docs, start=1):
+            doc_id = doc['id']
+            pontos[doc_id] = pontos.get(doc_id, 0.0) + 1.0 / (_RRF_K + posicao)
+            atual = fundidos.get(doc_id)
+            if atual is None or doc.get('score', 0) > atual.get('score', 0):
+                fundidos[doc_id] = doc
+    ordem = sorted(fundidos, key=lambda d: (-pontos[d], -fundidos[d].get('score', 0)))
+    return [dict(fundidos[d], score_fusao=round(pontos[d], 6)) for d in ordem[:limite]]
+
+
+_executor_buscas: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def _get_executor_buscas() -> ThreadPoolExecutor:
+    """Compartilhado entre requisições: o total de buscas simultâneas fica limitado."""
+    global _executor_buscas
+    if _executor_buscas is None:
+        with _executor_lock:
+            if _executor_buscas is None:
+                _executor_buscas = ThreadPoolExecutor(
+                    max_workers=int(current_app.config.get('CHAT_BUSCA_WORKERS', 8)),
+                    thread_name_prefix='chat-busca'
+                )
+    return _executor_buscas
+
+
+def _buscar_ramo(app, ramo: Dict[str, Any], top_k: int) -> List[dict]:
+    with app.app_context():
+        return vector_db.buscar_documentos(query=ramo['query'], top_k=top_k, publico=ramo['publico'])
+
+
+def buscar_contexto(mensagem: str, filhos: List[Dict[str, Any]], top_k: int = 4) -> List[dict]:
+    """
+    Documentos para o prompt. Filho em foco (ou único): uma busca enriquecida.
+    Vários filhos sem foco: uma busca por filho, em paralelo, fundidas.
+    """
+    filho_foco = identificar_filho_foco(mensagem, filhos)
+    if filho_foco:
+        query = consulta_enriquecida(mensagem, filho_foco)
+        logger.info(f"Query Enriquecida: '{query}' (Foco: {filho_foco['nome']})")
+        return vector_db.buscar_documentos(query=query, top_k=top_k, publico=publico.chaves_aluno(filho_foco))
+    if not filhos:
+        return vector_db.buscar_documentos(query=mensagem, top_k=top_k)
+
+    ramos = _ramos(mensagem, filhos)
+    if len(ramos) == 1:
+        return _buscar_ramo(current_app._get_current_object(), ramos[0], top_k)
+
+    app = current_app._get_current_object()
+    prazo = float(current_app.config.get('CHAT_BUSCA_TIMEOUT', 4.0))
+    inicio = time.monotonic()
+    futuros = {_get_executor_buscas().submit(_buscar_ramo, app, ramo, top_k): ramo for ramo in ramos}
+    # Todos os ramos começam juntos: um único wait aplica o prazo a cada um
+    prontos, atrasados = wait(futuros, timeout=prazo)
+
+    resultados = []
+    for futuro in futuros:
+        if futuro in prontos:
+            try:
+                resultados.append(futuro.result())
+            except Exception as e:
+                logger.error(f"[CHAT] Falha na busca do ramo '{futuros[futuro]['rotulo']}': {e}", exc_info=True)
+    for futuro in atrasados:
+        futuro.cancel()
+        logger.warning(f"[CHAT] Busca do ramo '{futuros[futuro]['rotulo']}' passou de {prazo:.1f}s; seguindo sem ela.")
+    metricas.incrementar('chat.busca.ramos', len(ramos))
+    metricas.incrementar('chat.busca.ramos_atrasados', len(atrasados))
+    metricas.observar('chat.busca.latencia_s', time.monotonic() - inicio)
+
+    limite = int(current_app.config.get('CHAT_BUSCA_MAX_DOCS', 6))
+    return fundir_resultados(resultados, limite)
+
+
+# === PREPARAÇÃO DO TURNO ===
+
+_executor_turnos: Optional[ThreadPoolExecutor] = None
+
+def _get_executor_turnos() -> ThreadPoolExecutor:
+    """Separado do executor de buscas: uma etapa do turno dispara o fan-out sem disputar vaga com ele."""
+    global _executor_turnos
+    if _executor_turnos is None:
+        with _executor_lock:
+            if _executor_turnos is None:
+                _executor_turnos = ThreadPoolExecutor(
+                    max_workers=int(current_app.config.get('CHAT_TURNO_WORKERS', 16)),
+                    thread_name_prefix='chat-turno'
+                )
+    return _executor_turnos
+
+
+def _historico_anterior(user_email: str, conversation_id: str, mensagem: str, limite: int) -> list:
+    """
+    A pergunta atual já foi registrada: ela aparece no histórico (pendente no buffer).
+    Ela vai no prompt como PERGUNTA, então sai do histórico nos dois casos.
+    """
+    historico = carregar_historico(user_email, conversation_id, limite)
+    if historico and historico[-1].get('role') == 'user' and historico[-1].get('content') == mensagem:
+        historico = historico[:-1]
+    return historico
+
+
+def preparar_turno(user_email: str, conversation_id: str, mensagem: str,
+                   filhos: List[Dict[str, Any]], top_k: int = 4) -> Pipeline:
+    """
+    Registra a pergunta (write-behind, não bloqueia), dispara as etapas do turno
+    e devolve o pipeline (resultados: 'historico', 'documentos', 'urls').
+    """
+    config = current_app.config
+    salvar_mensagem(user_email, 'user', mensagem, conversation_id)
+    turno = Pipeline('chat.turno', _get_executor_turnos(), current_app._get_current_object())
+
+    turno.etapa('historico', lambda: _historico_anterior(user_email, conversation_id, mensagem, 6),
+                prazo=float(config.get('CHAT_PRAZO_HISTORICO', 2.0)), padrao=[])
+    turno.etapa('documentos', lambda: buscar_contexto(mensagem, filhos, top_k),
+                prazo=float(config.get('CHAT_PRAZO_BUSCA', 6.0)), padrao=[])
+    # Assinatura depende só da busca: corre enquanto o histórico ainda chega e o prompt é montado
+    turno.etapa('urls', vector_db.assinar_links, depende=('documentos',),
+                prazo=float(config.get('CHAT_PRAZO_ASSINATURA', 8.0)), padrao={})
+    return turno
@@ -1,11 +1,23 @@
 """
 Configuração Centralizada de IA (GenAI).
 Evita re-configuração e importações repetidas.
+
+Inclui o cliente de embeddings em lote: todas as chamadas de embedding
+(consultas e documentos) passam por aqui.
 """
-from typing import Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
 import google.generativeai as genai
 from flask import current_app
 
+from src.core.cache import CacheDisco, CacheLRU, chave_hash, normalizar_texto
+from src.core.logger import get_logger
+from src.core.metricas import metricas
+
+logger = get_logger(__name__)
+
 _configurado: bool = False
 
 def configurar_genai() -> None:
@@ -19,7 +31,7 @@ def configurar_genai() -> None:
     api_key = current_app.config.get('GOOGLE_API_KEY')
     if not api_key:
         raise ValueError("GOOGLE_API_KEY não configurada.")
-    
+
     genai.configure(api_key=api_key)
     _configurado = True
 
@@ -29,4 +41,189 @@ def get_embedding_model() -> str:
 
 def get_generative_model() -> genai.GenerativeModel:
     configurar_genai()
-    return genai.GenerativeModel('gemini-2.5-flash')
\ No newline at end of file
+    return genai.GenerativeModel('gemini-2.5-flash')
+
+
+# === EMBEDDINGS EM LOTE ===
+
+# Limites do batchEmbedContents do Gemini
+LOTE_MAX_TEXTOS = 100
+LOTE_MAX_CHARS = 200_000
+
+
+class BaldeTokens:
+    """Token bucket: libera 'taxa' requisições/segundo com rajada de até 'capacidade'."""
+
+    def __init__(self, taxa: float, capacidade: float):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self._tokens = capacidade
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consumir(self, quantidade: float = 1.0) -> float:
+        """Bloqueia até haver tokens. Retorna o tempo esperado (segundos)."""
+        esperado = 0.0
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self._tokens = min(self.capacidade, self._tokens + (agora - self._ultimo) * self.taxa)
+                self._ultimo = agora
+                if self._tokens >= quantidade:
+                    self._tokens -= quantidade
+                    return esperado
+                espera = (quantidade - self._tokens) / self.taxa
+            time.sleep(espera)
+            esperado += espera
+
+
+_baldes: Dict[str, BaldeTokens] = {}
+_baldes_lock = threading.Lock()
+
+def _balde_da_chave(api_key: str, rpm: float) -> BaldeTokens:
+    """Um balde por API key: o limite de quota do provedor é por chave."""
+    with _baldes_lock:
+        balde = _baldes.get(api_key)
+        if balde is None or balde.taxa != rpm / 60.0:
+            balde = _baldes[api_key] = BaldeTokens(taxa=rpm / 60.0, capacidade=max(1.0, rpm / 60.0))
+        return balde
+
+
+def empacotar_lotes(textos: List[str], max_textos: int = LOTE_MAX_TEXTOS,
+                    max_chars: int = LOTE_MAX_CHARS) -> List[List[int]]:
+    """Agrupa os índices dos textos em lotes respeitando os limites de quantidade e tamanho."""
+    lotes: List[List[int]] = []
+    atual: List[int] = []
+    chars = 0
+    for i, texto in enumerate(textos):
+        if atual and (len(atual) >= max_textos or chars + len(texto) > max_chars):
+            lotes.append(atual)
+            atual, chars = [], 0
+        atual.append(i)
+        chars += len(texto)
+    if atual:
+        lotes.append(atual)
+    return lotes
+
+
+class ClienteEmbeddings:
+    """
+    Cliente de embeddings com empacotamento em lotes, teto de concorrência
+    global e rate limiting (token bucket) por API key. Resultados na ordem de entrada.
+    """
+
+    def __init__(self, modelo: str, balde: BaldeTokens, concorrencia: int = 4,
+                 max_textos: int = LOTE_MAX_TEXTOS, max_chars: int = LOTE_MAX_CHARS,
+                 funcao_embed: Optional[Callable[..., Dict[str, Any]]] = None):
+        self.modelo = modelo
+        self.balde = balde
+        self.concorrencia = max(1, concorrencia)
+        self.max_textos = max_textos
+        self.max_chars = max_chars
+        self._embed = funcao_embed or genai.embed_content
+        self._semaforo = threading.BoundedSemaphore(self.concorrencia)
+        self._executor = ThreadPoolExecutor(max_workers=self.concorrencia, thread_name_prefix='embeddings')
+
+    def _enviar_lote(self, textos: List[str], task_type: str) -> List[List[float]]:
+        with self._semaforo:
+            espera = self.balde.consumir()
+            if espera:
+                metricas.observar('embedding.espera_rate_limit_s', espera)
+            resultado = self._embed(model=self.modelo, content=textos, task_type=task_type)
+            metricas.incrementar('embedding.requisicoes')
+            return resultado['embedding']
+
+    def embed(self, textos: List[str], task_type: str = "retrieval_document") -> List[List[float]]:
+        if not textos:
+            return []
+
+        inicio = time.perf_counter()
+        lotes = empacotar_lotes(textos, self.max_textos, self.max_chars)
+
+        if len(lotes) == 1:
+            # Caso comum (consulta única): roda na própria thread, sem hop no executor
+            vetores_por_lote = [self._enviar_lote(textos, task_type)]
+        else:
+            futuros = [
+                self._executor.submit(self._enviar_lote, [textos[i] for i in lote], task_type)
+                for lote in lotes
+            ]
+            vetores_por_lote = [f.result() for f in futuros]
+
+        resultado: List[List[float]] = [None] * len(textos)
+        for lote, vetores in zip(lotes, vetores_por_lote):
+            for i, vetor in zip(lote, vetores):
+                resultado[i] = vetor
+
+        duracao = time.perf_counter() - inicio
+        metricas.incrementar('embedding.textos', len(textos))
+        metricas.observar('embedding.latencia_s', duracao)
+        if duracao > 0:
+            metricas.observar('embedding.textos_por_segundo', len(textos) / duracao)
+        return resultado
+
+
+_cliente_embeddings: Optional[ClienteEmbeddings] = None
+_cliente_lock = threading.Lock()
+
+def get_cliente_embeddings() -> ClienteEmbeddings:
+    """Retorna o cliente de embeddings do processo (criado sob demanda)."""
+    global _cliente_embeddings
+    if _cliente_embeddings is None:
+        with _cliente_lock:
+            if _cliente_embeddings is None:
+                config = current_app.config
+                _cliente_embeddings = ClienteEmbeddings(
+                    modelo=get_embedding_model(),
+                    balde=_balde_da_chave(config.get('GOOGLE_API_KEY'), float(config.get('EMBEDDING_RPM', 1500))),
+                    concorrencia=int(config.get('EMBEDDING_CONCORRENCIA', 4)),
+                    max_textos=int(config.get('EMBEDDING_LOTE_MAX_TEXTOS', LOTE_MAX_TEXTOS)),
+                    max_chars=int(config.get('EMBEDDING_LOTE_MAX_CHARS', LOTE_MAX_CHARS)),
+                )
+    return _cliente_embeddings
+
+# Só consultas se repetem; fragmentos de documentos são embutidos uma vez por ingestão
+TASKS_COM_CACHE = ('retrieval_query',)
+
+_cache_embeddings: Optional[CacheLRU] = None
+
+def get_cache_embeddings() -> CacheLRU:
+    """Cache (model, task_type, hash do texto normalizado) -> vetor."""
+    global _cache_embeddings
+    if _cache_embeddings is None:
+        with _cliente_lock:
+            if _cache_embeddings is None:
+                config = current_app.config
+                caminho_disco = config.get('EMBEDDING_CACHE_DISCO')
+                _cache_embeddings = CacheLRU(
+                    'embeddings',
+                    max_itens=int(config.get('EMBEDDING_CACHE_MAX', 2048)),
+                    ttl=float(config.get('EMBEDDING_CACHE_TTL', 7 * 24 * 3600)),
+                    disco=CacheDisco(caminho_disco, 'embeddings') if caminho_disco else None
+                )
+    return _cache_embeddings
+
+def gerar_embeddings(textos: List[str], task_type: str = "retrieval_document") -> List[List[float]]:
+    """
+    Gera embeddings para vários textos em lotes, preservando a ordem.
+    Para consultas, reaproveita vetores em cache e só envia os misses.
+    """
+    cliente = get_cliente_embeddings()
+    if task_type not in TASKS_COM_CACHE:
+        return cliente.embed(textos, task_type)
+
+    cache = get_cache_embeddings()
+    chaves = [chave_hash(cliente.modelo, task_type, normalizar_texto(t)) for t in textos]
+    resultado = [cache.obter(chave) for chave in chaves]
+
+    faltantes = [i for i, vetor in enumerate(resultado) if vetor is None]
+    if faltantes:
+        novos = cliente.embed([textos[i] for i in faltantes], task_type)
+        for i, vetor in zip(faltantes, novos):
+            cache.definir(chaves[i], vetor)
+            resultado[i] = vetor
+    return resultado
+
+def gerar_embedding(texto: str, task_type: str = "retrieval_query") -> List[float]:
+    """Atalho para um único texto (ex: consulta do chat)."""
+    return gerar_embeddings([texto], task_type)[0]
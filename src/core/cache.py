@@ -0,0 +1,174 @@
+"""
+Módulo de Cache em Processo.
+
+LRU thread-safe com limite de itens e TTL, contadores de hit/miss em
+'metricas' e uma camada opcional em disco (SQLite) que sobrevive a
+reinícios da instância.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, Tuple
+
+from src.core.logger import get_logger
+from src.core.metricas import metricas
+
+logger = get_logger(__name__)
+
+
+def chave_hash(*partes: Any) -> str:
+    """Gera uma chave estável (sha256) a partir de várias partes."""
+    bruto = "\x1f".join(str(p) for p in partes)
+    return hashlib.sha256(bruto.encode('utf-8')).hexdigest()
+
+
+def normalizar_texto(texto: str) -> str:
+    """Normalização para chave de cache: caixa e espaços não mudam o significado."""
+    return " ".join((texto or "").split()).casefold()
+
+
+class CacheDisco:
+    """Camada persistente simples em SQLite. Valores são serializados em JSON."""
+
+    def __init__(self, caminho: str, tabela: str = 'cache'):
+        self.caminho = caminho
+        self.tabela = ''.join(c for c in tabela if c.isalnum() or c == '_') or 'cache'
+        self._lock = threading.Lock()
+        with self._conectar() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.tabela} "
+                "(chave TEXT PRIMARY KEY, valor TEXT NOT NULL, expira_em REAL)"
+            )
+
+    @contextmanager
+    def _conectar(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.caminho, timeout=10, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def obter(self, chave: str) -> Tuple[Optional[Any], Optional[float]]:
+        """Retorna (valor, expira_em) ou (None, None)."""
+        with self._conectar() as conn:
+            linha = conn.execute(
+                f"SELECT valor, expira_em FROM {self.tabela} WHERE chave = ?", (chave,)
+            ).fetchone()
+        if not linha:
+            return None, None
+        valor, expira_em = linha
+        if expira_em is not None and expira_em <= time.time():
+            self.remover(chave)
+            return None, None
+        return json.loads(valor), expira_em
+
+    def definir(self, chave: str, valor: Any, expira_em: Optional[float]) -> None:
+        with self._lock, self._conectar() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.tabela} (chave, valor, expira_em) VALUES (?, ?, ?)",
+                (chave, json.dumps(valor), expira_em)
+            )
+
+    def remover(self, chave: str) -> None:
+        with self._lock, self._conectar() as conn:
+            conn.execute(f"DELETE FROM {self.tabela} WHERE chave = ?", (chave,))
+
+    def limpar(self) -> None:
+        with self._lock, self._conectar() as conn:
+            conn.execute(f"DELETE FROM {self.tabela}")
+
+
+class CacheLRU:
+    """
+    Cache LRU com TTL. Ao exceder 'max_itens', descarta o item menos usado.
+    Se 'disco' for informado, misses em memória consultam o disco e
+    toda escrita é replicada nele (write-through).
+    """
+
+    def __init__(self, nome: str, max_itens: int = 1024, ttl: Optional[float] = None,
+                 disco: Optional[CacheDisco] = None):
+        self.nome = nome
+        self.max_itens = max(1, max_itens)
+        self.ttl = ttl
+        self.disco = disco
+        self._lock = threading.Lock()
+        self._itens: 'OrderedDict[str, Tuple[Any, Optional[float]]]' = OrderedDict()
+
+    def _expiracao(self, ttl: Optional[float]) -> Optional[float]:
+        ttl = self.ttl if ttl is None else ttl
+        return time.time() + ttl if ttl else None
+
+    def obter(self, chave: str) -> Optional[Any]:
+        """Retorna o valor em cache ou None (miss)."""
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None:
+                valor, expira_em = item
+                if expira_em is None or expira_em > time.time():
+                    self._itens.move_to_end(chave)
+                    metricas.incrementar(f'cache.{self.nome}.hits')
+                    return valor
+                del self._itens[chave]
+
+        if self.disco is not None:
+            try:
+                valor, expira_em = self.disco.obter(chave)
+            except Exception as e:
+                logger.warning(f"[CACHE] Falha ao ler disco ({self.nome}): {e}")
+                valor, expira_em = None, None
+            if valor is not None:
+                self._guardar(chave, valor, expira_em)
+                metricas.incrementar(f'cache.{self.nome}.hits_disco')
+                return valor
+
+        metricas.incrementar(f'cache.{self.nome}.misses')
+        return None
+
+    def _guardar(self, chave: str, valor: Any, expira_em: Optional[float]) -> None:
+        with self._lock:
+            self._itens[chave] = (valor, expira_em)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+                metricas.incrementar(f'cache.{self.nome}.despejos')
+
+    def definir(self, chave: str, valor: Any, ttl: Optional[float] = None) -> None:
+        expira_em = self._expiracao(ttl)
+        self._guardar(chave, valor, expira_em)
+        if self.disco is not None:
+            try:
+                self.disco.definir(chave, valor, expira_em)
+            except Exception as e:
+                logger.warning(f"[CACHE] Falha ao gravar disco ({self.nome}): {e}")
+
+    def remover(self, chave: str) -> None:
+        with self._lock:
+            self._itens.pop(chave, None)
+        if self.disco is not None:
+            self.disco.remover(chave)
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._itens.clear()
+        if self.disco is not None:
+            self.disco.limpar()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._itens)
+
+    def estatisticas(self) -> dict:
+        hits = metricas.contador(f'cache.{self.nome}.hits') + metricas.contador(f'cache.{self.nome}.hits_disco')
+        misses = metricas.contador(f'cache.{self.nome}.misses')
+        total = hits + misses
+        return {
+            'itens': len(self),
+            'hits': hits,
+            'misses': misses,
+            'taxa_acerto': hits / total if total else 0.0,
+        }
@@ -0,0 +1,172 @@
+"""
+Registro Central de Clientes (Cloud/HTTP).
+
+Um único ponto para construir e reaproveitar os clientes externos do processo:
+Storage (cliente e buckets), índice Pinecone, Firestore e sessão HTTP com pool.
+
+- Lazy: cada cliente só é criado no primeiro uso.
+- Process-wide: todas as threads compartilham a mesma instância (e o pool TLS).
+- Fork-safe: após um fork (ex: gunicorn --preload), o processo filho descarta
+  as instâncias herdadas e recria as suas.
+- Hooks de saúde e reset para diagnóstico e recuperação.
+"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import requests
+from flask import current_app, has_app_context
+from requests.adapters import HTTPAdapter
+
+from src.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class RegistroClientes:
+    """Fábricas nomeadas + instâncias construídas sob demanda."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._fabricas: Dict[str, Callable[[], Any]] = {}
+        self._verificadores: Dict[str, Callable[[Any], Any]] = {}
+        self._instancias: Dict[str, Any] = {}
+        self._pid = os.getpid()
+
+    def registrar(self, nome: str, fabrica: Callable[[], Any],
+                  verificador: Optional[Callable[[Any], Any]] = None) -> None:
+        """Registra (ou substitui) a fábrica de um cliente. Não constrói nada."""
+        with self._lock:
+            self._fabricas[nome] = fabrica
+            if verificador:
+                self._verificadores[nome] = verificador
+
+    def obter(self, nome: str) -> Any:
+        self._verificar_fork()
+        instancia = self._instancias.get(nome)
+        if instancia is not None:
+            return instancia
+        with self._lock:
+            instancia = self._instancias.get(nome)
+            if instancia is None:
+                fabrica = self._fabricas.get(nome)
+                if fabrica is None:
+                    raise KeyError(f"Cliente '{nome}' não registrado.")
+                instancia = fabrica()
+                self._instancias[nome] = instancia
+                logger.info(f"[CLIENTES] '{nome}' inicializado (pid {self._pid}).")
+            return instancia
+
+    def resetar(self, nome: Optional[str] = None) -> None:
+        """Fecha e descarta um cliente (ou todos). O próximo obter() recria."""
+        with self._lock:
+            nomes = [nome] if nome else list(self._instancias)
+            # Dependentes ('storage:bucket:x' depende de 'storage') caem junto
+            nomes += [d for d in self._instancias if nome and d.startswith(f"{nome}:")]
+            for n in nomes:
+                instancia = self._instancias.pop(n, None)
+                fechar = getattr(instancia, 'close', None)
+                if callable(fechar):
+                    try:
+                        fechar()
+                    except Exception as e:
+                        logger.warning(f"[CLIENTES] Erro ao fechar '{n}': {e}")
+
+    def saude(self) -> Dict[str, Dict[str, Any]]:
+        """Executa o verificador de cada cliente já inicializado."""
+        self._verificar_fork()
+        relatorio = {}
+        for nome in sorted(self._fabricas):
+            instancia = self._instancias.get(nome)
+            if instancia is None:
+                relatorio[nome] = {'status': 'nao_inicializado'}
+                continue
+            verificador = self._verificadores.get(nome)
+            try:
+                if verificador:
+                    verificador(instancia)
+                relatorio[nome] = {'status': 'ok'}
+            except Exception as e:
+                relatorio[nome] = {'status': 'erro', 'erro': str(e)}
+        return relatorio
+
+    def _verificar_fork(self) -> None:
+        if os.getpid() != self._pid:
+            self._apos_fork()
+
+    def _apos_fork(self) -> None:
+        # Sockets/canais gRPC herdados do pai não são seguros no filho:
+        # descarta sem fechar (fechar afetaria o processo pai).
+        self._lock = threading.RLock()
+        self._instancias = {}
+        self._pid = os.getpid()
+
+
+registro = RegistroClientes()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=registro._apos_fork)
+
+
+# === FÁBRICAS ===
+
+def _fabrica_storage():
+    from google.cloud import storage
+    client = storage.Client(project=current_app.config.get('GOOGLE_CLOUD_PROJECT'))
+    pool = int(current_app.config.get('GCS_POOL_MAX', 16))
+    # O cliente usa uma AuthorizedSession (requests); o pool padrão tem só 10 conexões
+    client._http.mount('https://', HTTPAdapter(pool_connections=pool, pool_maxsize=pool))
+    return client
+
+def _fabrica_pinecone_index():
+    from pinecone import Pinecone
+    api_key = current_app.config.get('PINECONE_API_KEY')
+    if not api_key:
+        raise ValueError("PINECONE_API_KEY não configurada.")
+    pc = Pinecone(
+        api_key=api_key,
+        connection_pool_maxsize=int(current_app.config.get('PINECONE_POOL_MAX', 16))
+    )
+    return pc.Index(current_app.config.get('PINECONE_INDEX_NAME'))
+
+def _fabrica_firestore():
+    # gRPC multiplexa as chamadas em um único canal: não há pool a dimensionar
+    from google.cloud import firestore
+    return firestore.Client()
+
+def _fabrica_sessao_http():
+    sessao = requests.Session()
+    pool = int(current_app.config.get('HTTP_POOL_MAX', 10)) if has_app_context() else 10
+    adaptador = HTTPAdapter(pool_connections=pool, pool_maxsize=pool)
+    sessao.mount('https://', adaptador)
+    sessao.mount('http://', adaptador)
+    return sessao
+
+registro.registrar('storage', _fabrica_storage, verificador=lambda c: c.get_service_account_email())
+registro.registrar('pinecone_index', _fabrica_pinecone_index, verificador=lambda i: i.describe_index_stats())
+registro.registrar('firestore', _fabrica_firestore, verificador=lambda c: next(iter(c.collections()), None))
+registro.registrar('http', _fabrica_sessao_http)
+
+
+# === ATALHOS ===
+
+def storage_client():
+    return registro.obter('storage')
+
+def bucket(nome: Optional[str] = None):
+    """Handle de bucket reaproveitado (padrão: GCS_BUCKET_NAME)."""
+    nome = nome or current_app.config.get('GCS_BUCKET_NAME')
+    chave = f'storage:bucket:{nome}'
+    if chave not in registro._fabricas:
+        registro.registrar(chave, lambda: storage_client().bucket(nome))
+    return registro.obter(chave)
+
+def indice_pinecone():
+    return registro.obter('pinecone_index')
+
+def firestore_client():
+    return registro.obter('firestore')
+
+def sessao_http() -> requests.Session:
+    return registro.obter('http')
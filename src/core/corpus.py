@@ -0,0 +1,93 @@
+"""
+Módulo de Versão do Corpus.
+
+Número monotônico que muda a cada alteração no índice vetorial
+(ingestão, exclusão, edição). Caches de recuperação incluem a versão na
+chave: quando ela muda, as entradas antigas simplesmente deixam de ser lidas.
+
+A versão local muda na hora; a versão remota (Firestore 'sistema/corpus')
+propaga a mudança para as demais instâncias em até CORPUS_VERSAO_INTERVALO s.
+"""
+
+import threading
+import time
+from typing import Optional
+
+from flask import current_app, has_app_context
+from google.cloud import firestore
+
+from src.core.database import db
+from src.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+COLLECTION_SISTEMA = 'sistema'
+DOC_CORPUS = 'corpus'
+
+_lock = threading.Lock()
+_lock_sincronizacao = threading.Lock()
+_versao_local: int = 0
+_versao_remota: int = 0
+_ultima_sincronizacao: float = 0.0
+
+
+def _intervalo_sincronizacao() -> float:
+    if has_app_context():
+        return float(current_app.config.get('CORPUS_VERSAO_INTERVALO', 5))
+    return 5.0
+
+
+def _sincronizar_remota() -> None:
+    """Lê a versão global no Firestore, no máximo uma vez por intervalo (sem dogpile)."""
+    global _versao_remota, _ultima_sincronizacao
+    if db is None or time.monotonic() - _ultima_sincronizacao < _intervalo_sincronizacao():
+        return
+    if not _lock_sincronizacao.acquire(blocking=False):
+        return  # Outra thread já está atualizando; usa o valor atual
+    try:
+        doc = db.collection(COLLECTION_SISTEMA).document(DOC_CORPUS).get()
+        if doc.exists:
+            _versao_remota = int(doc.to_dict().get('versao', 0))
+    except Exception as e:
+        logger.warning(f"[CORPUS] Falha ao ler versão remota: {e}")
+    finally:
+        _ultima_sincronizacao = time.monotonic()
+        _lock_sincronizacao.release()
+
+
+def versao_atual() -> str:
+    """Versão usada nas chaves de cache ('local.remota')."""
+    _sincronizar_remota()
+    with _lock:
+        return f"{_versao_local}.{_versao_remota}"
+
+
+def incrementar_versao(motivo: str = '', reforco_em: Optional[float] = None) -> None:
+    """
+    Invalida os caches dependentes do corpus.
+
+    Args:
+        motivo: Texto livre para log (ex: 'ingestao doc_x').
+        reforco_em: Segundos para um segundo incremento. O Pinecone é eventualmente
+            consistente: uma busca logo após a escrita pode ainda ver o dado antigo
+            e gravá-lo no cache com a versão nova.
+    """
+    global _versao_local
+    with _lock:
+        _versao_local += 1
+        versao = _versao_local
+    logger.info(f"[CORPUS] Versão local -> {versao} ({motivo})")
+
+    if db is not None:
+        try:
+            db.collection(COLLECTION_SISTEMA).document(DOC_CORPUS).set({
+                'versao': firestore.Increment(1),
+                'atualizado_em': firestore.SERVER_TIMESTAMP
+            }, merge=True)
+        except Exception as e:
+            logger.warning(f"[CORPUS] Falha ao propagar versão: {e}")
+
+    if reforco_em:
+        timer = threading.Timer(reforco_em, incrementar_versao, args=(f"reforço {motivo}",))
+        timer.daemon = True
+        timer.start()
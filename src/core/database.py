@@ -1,21 +1,35 @@
 """
 Módulo de Conexão com o Banco de Dados (Core)
 
-Inicializa o cliente do Google Firestore, que será usado
+Expõe o cliente do Google Firestore, que será usado
 pelos "Service Layers" da aplicação.
+
+O cliente real vive no registro central (src.core.clientes): 'db' é um
+proxy que delega para ele, então um reset ou um fork recriam a conexão
+sem que os módulos precisem reimportar nada.
 """
 from typing import Optional, Any
-from google.cloud import firestore
+from src.core.clientes import registro
+
+class _ProxyFirestore:
+    """Encaminha qualquer atributo para o cliente Firestore atual do registro."""
+
+    def __getattr__(self, nome: str) -> Any:
+        return getattr(registro.obter('firestore'), nome)
+
+    def __repr__(self) -> str:
+        return "<Firestore (registro de clientes)>"
 
-# Inicializa o cliente do Firestore.
 # O SDK buscará automaticamente as credenciais na variável de ambiente
 # 'GOOGLE_APPLICATION_CREDENTIALS' (definida no .env).
-db: Optional[firestore.Client] = None
+# A primeira construção continua no import para manter o contrato 'db is None'.
+db: Optional[Any] = None
 
 try:
-    db = firestore.Client()
+    registro.obter('firestore')
+    db = _ProxyFirestore()
     print("Conexão com o Firestore estabelecida com sucesso.")
 except Exception as e:
     print(f"ERRO AO CONECTAR COM O FIRESTORE: {e}")
     # Em um app real, poderíamos usar um logger aqui
-    db = None
\ No newline at end of file
+    db = None
@@ -6,6 +6,8 @@ from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_wtf.csrf import CSRFProtect
 from authlib.integrations.flask_client import OAuth
+from src.core.fila import FilaTrabalhos
+from src.core.gravacao import GravadorLotes
 
 # 1. Limiter (Rate Limiting)
 limiter = Limiter(
@@ -20,3 +22,9 @@ csrf = CSRFProtect()
 
 # 3. OAuth (Authlib)
 oauth = OAuth()
+
+# 4. Fila de Ingestão (pool limitado de workers para processar PDFs)
+fila_ingestao = FilaTrabalhos('ingestao')
+
+# 5. Gravação write-behind do histórico do chat (batches no Firestore)
+gravador_historico = GravadorLotes('historico')
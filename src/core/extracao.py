@@ -0,0 +1,542 @@
+"""
+Módulo de Extração Paralela de PDFs.
+
+O pdfplumber é CPU-bound: rodando em thread, segura o GIL por dezenas de
+segundos em calendários e regimentos e trava as threads que atendem o chat.
+Aqui as páginas são divididas em intervalos (shards) e extraídas em
+processos filhos (sandboxes), com remontagem na ordem original. Arquivos
+pequenos usam um sandbox só, sem divisão.
+
+Sandbox: cada página tem prazo e teto de memória; se estourar, o filho é
+morto, a página entra como pulada e a extração continua em outro filho.
+Arquivos grandes demais são recusados antes de abrir.
+
+Motores (PARSER_MOTOR):
+- 'rapido': pypdf, texto corrido. Suficiente para a maioria dos comunicados (prosa).
+- 'layout': pdfplumber com layout=True. Lento, mas mantém tabelas e calendários alinhados.
+- 'auto' (padrão): pypdf em todas as páginas; só as que parecem tabela/grade
+  são reextraídas pelo pdfplumber. O motor usado fica registrado por página.
+"""
+
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple, Type, Union
+
+import pdfplumber
+from flask import current_app, has_app_context
+from pypdf import PdfReader
+
+from src.core.logger import get_logger
+from src.core.metricas import metricas
+
+logger = get_logger(__name__)
+
+PADROES = {
+    'PARSER_MOTOR': 'auto',
+    'PARSER_WORKERS': 2,
+    'PARSER_PAGINAS_POR_LOTE': 4,
+    'PARSER_MIN_PAGINAS_PARALELO': 6,
+    'PARSER_SANDBOX': True,
+    'PARSER_TIMEOUT_PAGINA': 30.0,
+    'PARSER_MAX_MEMORIA_MB': 768,
+    'PARSER_MAX_PAGINAS': 300,
+    'PARSER_MAX_BYTES': 40 * 1024 * 1024,
+}
+
+
+def _config(chave: str) -> Any:
+    padrao = PADROES[chave]
+    if has_app_context():
+        return type(padrao)(current_app.config.get(chave, padrao))
+    return padrao
+
+
+def _extrair_pagina(page) -> str:
+    # extract_text(layout=True) tenta manter a posição visual (tabelas)
+    texto = page.extract_text(layout=True) or ""
+    # Libera o cache de objetos da página (PDFs grandes incham a memória)
+    fechar = getattr(page, 'close', None)
+    if callable(fechar):
+        fechar()
+    return texto
+
+
+# === DETECÇÃO DE TABELAS/GRADES ===
+
+def parece_grade(trechos: List[Tuple[float, float, float]], min_linhas: int = 3,
+                 fracao: float = 0.3, lacuna_min: float = 12.0) -> bool:
+    """
+    Heurística barata sobre os trechos de texto da página (x_inicio, x_fim, y):
+    em tabelas e calendários, várias linhas têm um trecho começando na mesma
+    coluna depois de um vão largo. Em prosa os trechos de uma linha são
+    contíguos (palavras separadas por um espaço), então não formam colunas.
+    """
+    linhas: Dict[int, List[Tuple[float, float]]] = defaultdict(list)
+    for x0, x1, y in trechos:
+        linhas[round(y / 2)].append((x0, x1))
+    if len(linhas) < min_linhas:
+        return False
+
+    # Colunas internas: inícios de trecho precedidos de um vão >= lacuna_min
+    internas: Dict[int, set] = {}
+    for y, trechos_linha in linhas.items():
+        trechos_linha.sort()
+        internas[y] = {
+            round(x0 / 5) for (_, fim_anterior), (x0, _) in zip(trechos_linha, trechos_linha[1:])
+            if x0 - fim_anterior >= lacuna_min
+        }
+    recorrencia = Counter(x for xs in internas.values() for x in xs)
+    colunas = {x for x, n in recorrencia.items() if n >= min_linhas}
+    linhas_tabulares = sum(1 for xs in internas.values() if xs & colunas)
+    return linhas_tabulares >= max(min_linhas, fracao * len(linhas))
+
+
+def _largura_estimada(args: list, tamanho: float) -> float:
+    """Largura aproximada de um Tj/TJ (meio em por caractere), sem métricas da fonte."""
+    conteudo = args[0] if args else b''
+    partes = conteudo if isinstance(conteudo, list) else [conteudo]
+    caracteres = sum(len(p) for p in partes if isinstance(p, (bytes, str)))
+    return caracteres * tamanho * 0.5
+
+
+# === MOTORES ===
+
+def _abrir(origem: Union[str, BytesIO]) -> Union[str, BytesIO]:
+    # Cada motor lê do seu próprio stream: pypdf e pdfminer fazem seek independentes
+    return BytesIO(origem.getvalue()) if isinstance(origem, BytesIO) else origem
+
+
+class MotorRapido:
+    """pypdf: texto corrido, sem reconstruir layout. Também sinaliza páginas com cara de grade."""
+    nome = 'rapido'
+
+    def __init__(self, origem: Union[str, BytesIO]):
+        self._pdf = PdfReader(_abrir(origem))
+
+    @property
+    def total_paginas(self) -> int:
+        return len(self._pdf.pages)
+
+    def extrair(self, i: int) -> Tuple[str, bool]:
+        trechos: List[Tuple[float, float, float]] = []
+        fonte = {'tamanho': 10.0}
+
+        def visitar(operador, args, cm, tm):
+            # Posição de cada operador de texto (o visitor_text do pypdf já chega com a linha fundida)
+            if operador == b'Tf' and len(args) > 1:
+                fonte['tamanho'] = float(args[1])
+            elif operador in (b'Tj', b'TJ', b"'", b'"'):
+                escala = abs(tm[0] * cm[0]) or 1.0
+                x = tm[4] * cm[0] + tm[5] * cm[2] + cm[4]
+                y = tm[4] * cm[1] + tm[5] * cm[3] + cm[5]
+                trechos.append((x, x + _largura_estimada(args, fonte['tamanho']) * escala, y))
+
+        texto = self._pdf.pages[i].extract_text(visitor_operand_before=visitar) or ""
+        return texto, parece_grade(trechos)
+
+    def fechar(self) -> None:
+        self._pdf.close()
+
+
+class MotorLayout:
+    """pdfplumber com layout=True: mantém a posição visual (tabelas, calendários)."""
+    nome = 'layout'
+
+    def __init__(self, origem: Union[str, BytesIO]):
+        self._pilha = ExitStack()
+        self._pdf = self._pilha.enter_context(pdfplumber.open(_abrir(origem)))
+
+    @property
+    def total_paginas(self) -> int:
+        return len(self._pdf.pages)
+
+    def extrair(self, i: int) -> Tuple[str, bool]:
+        return _extrair_pagina(self._pdf.pages[i]), False
+
+    def fechar(self) -> None:
+        self._pilha.close()
+
+
+MOTORES: Dict[str, Type] = {MotorRapido.nome: MotorRapido, MotorLayout.nome: MotorLayout}
+
+def registrar_motor(classe: Type) -> Type:
+    """Registra um motor extra (classe com 'nome', total_paginas, extrair(i) e fechar())."""
+    MOTORES[classe.nome] = classe
+    return classe
+
+
+class Extrator:
+    """
+    Aplica a estratégia de motores a um PDF. Motores são abertos sob demanda:
+    no modo 'auto', o pdfplumber só é carregado se alguma página precisar.
+    """
+
+    def __init__(self, origem: Union[str, BytesIO], estrategia: str = 'auto'):
+        self.origem = origem
+        self._motores: Dict[str, Any] = {}
+        self.estrategia = estrategia
+        if estrategia == 'auto':
+            try:
+                self._primario = self._motor(MotorRapido.nome)
+            except Exception as e:
+                # PDF que o pypdf não abre pode ainda ser legível pelo pdfplumber
+                logger.info(f"[EXTRACAO] Motor rápido indisponível ({e}); usando layout.")
+                self.estrategia = MotorLayout.nome
+        if self.estrategia != 'auto':
+            if self.estrategia not in MOTORES:
+                raise ValueError(f"Motor de extração desconhecido: {self.estrategia}")
+            self._primario = self._motor(self.estrategia)
+
+    def _motor(self, nome: str):
+        if nome not in self._motores:
+            self._motores[nome] = MOTORES[nome](self.origem)
+        return self._motores[nome]
+
+    @property
+    def total_paginas(self) -> int:
+        return self._primario.total_paginas
+
+    def pagina(self, i: int) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        texto, grade = self._primario.extrair(i)
+        motor = self._primario.nome
+        if self.estrategia == 'auto' and grade:
+            texto, _ = self._motor(MotorLayout.nome).extrair(i)
+            motor = MotorLayout.nome
+        return {'pagina': i + 1, 'texto': texto, 'motor': motor, 'duracao_s': time.perf_counter() - t0}
+
+    def fechar(self) -> None:
+        for motor in self._motores.values():
+            try:
+                motor.fechar()
+            except Exception:
+                pass
+
+    def __enter__(self) -> 'Extrator':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.fechar()
+
+
+def dividir_intervalos(total_paginas: int, por_lote: int) -> List[Tuple[int, int]]:
+    """Intervalos [inicio, fim) contíguos cobrindo todas as páginas."""
+    por_lote = max(1, por_lote)
+    return [(i, min(i + por_lote, total_paginas)) for i in range(0, total_paginas, por_lote)]
+
+
+# === SANDBOX (PROCESSOS ISOLADOS) ===
+
+class ArquivoRecusado(ValueError):
+    """PDF rejeitado antes da extração (tamanho, ou nem a abertura cabe nos limites)."""
+
+
+class LimiteExcedido(Exception):
+    """Uma página estourou tempo ou memória; o processo do sandbox é descartado."""
+
+    def __init__(self, motivo: str):
+        super().__init__(motivo)
+        self.motivo = motivo
+
+
+def _memoria_proc(pid: Union[int, str], campo: str) -> Optional[int]:
+    """Lê VmRSS/VmSize de /proc (Linux). None se indisponível."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for linha in f:
+                if linha.startswith(campo + ':'):
+                    return int(linha.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _limitar_memoria(limite_bytes: int) -> None:
+    """Teto de memória virtual no filho: o que já foi carregado + o limite configurado."""
+    try:
+        import resource
+        base = _memoria_proc('self', 'VmSize') or 0
+        teto = base + limite_bytes
+        resource.setrlimit(resource.RLIMIT_AS, (teto, teto))
+    except (ImportError, ValueError, OSError):
+        pass  # Sem suporte (ex: macOS/Windows): resta a verificação de RSS pelo processo pai
+
+
+def _pagina_pulada(i: int, motivo: str, motor: Optional[str] = None) -> Dict[str, Any]:
+    return {'pagina': i + 1, 'texto': '', 'motor': motor, 'duracao_s': 0.0, 'pulada': motivo}
+
+
+def _laco_sandbox(conn, limite_memoria: int) -> None:
+    """Processo filho: atende tarefas 'contar' e 'extrair' até receber 'sair' ou o pipe fechar."""
+    _limitar_memoria(limite_memoria)
+    while True:
+        try:
+            tarefa = conn.recv()
+        except (EOFError, OSError):
+            return
+        tipo = tarefa[0]
+        if tipo == 'sair':
+            return
+        try:
+            if tipo == 'contar':
+                _, caminho, estrategia = tarefa
+                with Extrator(caminho, estrategia) as extrator:
+                    conn.send(('total', extrator.total_paginas, extrator.estrategia))
+            elif tipo == 'extrair':
+                _, caminho, inicio, fim, estrategia = tarefa
+                with Extrator(caminho, estrategia) as extrator:
+                    for i in range(inicio, fim):
+                        try:
+                            conn.send(('pagina', extrator.pagina(i)))
+                        except MemoryError:
+                            conn.send(('pagina', _pagina_pulada(i, 'memoria')))
+                        except Exception:
+                            conn.send(('pagina', _pagina_pulada(i, 'erro')))
+                conn.send(('fim',))
+        except MemoryError:
+            conn.send(('falha', 'memória insuficiente ao abrir o PDF'))
+        except Exception as e:
+            conn.send(('falha', str(e)))
+
+
+class Sandbox:
+    """
+    Processo filho de extração, reaproveitado entre documentos.
+    O pai espera cada página com prazo e acompanha o RSS do filho; se algum
+    limite estoura, o filho é morto (SIGKILL) e a página é marcada como pulada.
+    """
+
+    def __init__(self, limite_memoria: int):
+        # 'spawn': fork com threads ativas (gunicorn) pode travar o filho
+        ctx = multiprocessing.get_context('spawn')
+        self._conn, conn_filho = ctx.Pipe()
+        self.limite_memoria = limite_memoria
+        self._proc = ctx.Process(target=_laco_sandbox, args=(conn_filho, limite_memoria),
+                                 daemon=True, name='extracao-sandbox')
+        self._proc.start()
+        conn_filho.close()
+
+    @property
+    def vivo(self) -> bool:
+        return self._proc.is_alive()
+
+    def _receber(self, prazo_s: float) -> tuple:
+        limite = time.monotonic() + prazo_s
+        while True:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                raise LimiteExcedido('timeout')
+            if self._conn.poll(min(0.1, restante)):
+                try:
+                    return self._conn.recv()
+                except (EOFError, OSError):
+                    raise LimiteExcedido('erro')  # Filho morreu (ex: segfault em lib nativa)
+            rss = _memoria_proc(self._proc.pid, 'VmRSS')
+            if rss and rss > self.limite_memoria:
+                raise LimiteExcedido('memoria')
+            if not self._proc.is_alive():
+                raise LimiteExcedido('erro')
+
+    def contar(self, caminho: str, estrategia: str, prazo_s: float) -> Tuple[int, str]:
+        self._conn.send(('contar', caminho, estrategia))
+        resposta = self._receber(prazo_s)
+        if resposta[0] == 'falha':
+            raise ValueError(resposta[1])
+        return resposta[1], resposta[2]
+
+    def extrair(self, caminho: str, inicio: int, fim: int, estrategia: str, prazo_pagina_s: float):
+        """Gera as páginas à medida que chegam. LimiteExcedido interrompe na página corrente."""
+        self._conn.send(('extrair', caminho, inicio, fim, estrategia))
+        while True:
+            resposta = self._receber(prazo_pagina_s)
+            if resposta[0] == 'fim':
+                return
+            if resposta[0] == 'falha':
+                raise ValueError(resposta[1])
+            yield resposta[1]
+
+    def encerrar(self) -> None:
+        if self._proc.is_alive():
+            self._proc.kill()
+        self._proc.join(timeout=1)
+        self._conn.close()
+
+
+_sandboxes: List[Sandbox] = []
+_sandboxes_pid: Optional[int] = None
+_sandboxes_lock = threading.Lock()
+
+def _obter_sandbox(limite_memoria: int) -> Sandbox:
+    global _sandboxes, _sandboxes_pid
+    with _sandboxes_lock:
+        if _sandboxes_pid != os.getpid():
+            _sandboxes, _sandboxes_pid = [], os.getpid()  # Filhos do pai não pertencem a este processo
+        while _sandboxes:
+            sandbox = _sandboxes.pop()
+            if sandbox.vivo and sandbox.limite_memoria == limite_memoria:
+                return sandbox
+            sandbox.encerrar()
+    return Sandbox(limite_memoria)
+
+def _devolver_sandbox(sandbox: Sandbox) -> None:
+    with _sandboxes_lock:
+        if sandbox.vivo and _sandboxes_pid == os.getpid() and len(_sandboxes) < max(1, _config('PARSER_WORKERS')):
+            _sandboxes.append(sandbox)
+            return
+    sandbox.encerrar()
+
+def encerrar_pool() -> None:
+    """Encerra os sandboxes ociosos (testes, shutdown)."""
+    with _sandboxes_lock:
+        ociosos = list(_sandboxes) if _sandboxes_pid == os.getpid() else []
+        _sandboxes.clear()
+    for sandbox in ociosos:
+        sandbox.encerrar()
+
+
+def _extrair_intervalo_isolado(caminho: str, inicio: int, fim: int, estrategia: str,
+                               prazo_pagina_s: float, limite_memoria: int) -> List[Dict[str, Any]]:
+    """Supervisiona um intervalo: página que estoura limite é pulada e o resto segue em outro filho."""
+    resultado: List[Dict[str, Any]] = []
+    i = inicio
+    while i < fim:
+        sandbox = _obter_sandbox(limite_memoria)
+        try:
+            for pagina in sandbox.extrair(caminho, i, fim, estrategia, prazo_pagina_s):
+                resultado.append(pagina)
+                i = pagina['pagina']  # 1-based: já é o índice da próxima
+            _devolver_sandbox(sandbox)
+            i = fim
+        except LimiteExcedido as e:
+            sandbox.encerrar()
+            logger.warning(f"[EXTRACAO] Página {i + 1} pulada ({e.motivo}).")
+            resultado.append(_pagina_pulada(i, e.motivo))
+            i += 1
+    return resultado
+
+
+# === API ===
+
+def _extrair_isolado(caminho: str, estrategia: str) -> List[Dict[str, Any]]:
+    prazo = float(_config('PARSER_TIMEOUT_PAGINA'))
+    limite_memoria = int(_config('PARSER_MAX_MEMORIA_MB')) * 1024 * 1024
+
+    sandbox = _obter_sandbox(limite_memoria)
+    try:
+        # Até a abertura do PDF roda isolada: um xref patológico não trava o pai
+        total_paginas, estrategia = sandbox.contar(caminho, estrategia, prazo)
+    except LimiteExcedido as e:
+        sandbox.encerrar()
+        raise ArquivoRecusado(f"PDF não pôde ser aberto dentro dos limites ({e.motivo}).")
+    except Exception:
+        _devolver_sandbox(sandbox)
+        raise
+    _devolver_sandbox(sandbox)
+
+    max_paginas = int(_config('PARSER_MAX_PAGINAS'))
+    alem_do_limite = [_pagina_pulada(i, 'limite_paginas') for i in range(max_paginas, total_paginas)]
+    total_paginas = min(total_paginas, max_paginas)
+
+    workers = int(_config('PARSER_WORKERS'))
+    if workers > 1 and total_paginas >= _config('PARSER_MIN_PAGINAS_PARALELO'):
+        intervalos = dividir_intervalos(total_paginas, _config('PARSER_PAGINAS_POR_LOTE'))
+    else:
+        intervalos = [(0, total_paginas)] if total_paginas else []
+
+    # Threads só supervisionam: o trabalho pesado (e o GIL) fica nos filhos
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(intervalos) or 1)),
+                            thread_name_prefix='extracao') as executor:
+        futuros = [
+            executor.submit(_extrair_intervalo_isolado, caminho, inicio, fim, estrategia, prazo, limite_memoria)
+            for inicio, fim in intervalos
+        ]
+        # Remontagem ordenada: os futuros seguem a ordem dos intervalos
+        resultado = [pagina for futuro in futuros for pagina in futuro.result()]
+    return resultado + alem_do_limite
+
+
+def _tamanho_bytes(origem: Union[str, BytesIO]) -> int:
+    return os.path.getsize(origem) if isinstance(origem, str) else origem.getbuffer().nbytes
+
+
+def paginas_puladas(resultado: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """[{'pagina': n, 'motivo': 'timeout'|'memoria'|'erro'|'limite_paginas'}]"""
+    return [{'pagina': p['pagina'], 'motivo': p['pulada']} for p in resultado if p.get('pulada')]
+
+
+def extrair_paginas(arquivo: Union[str, BytesIO, Any]) -> List[Dict[str, Any]]:
+    """
+    Extrai o texto de cada página do PDF.
+
+    Com PARSER_SANDBOX (padrão), a extração roda em processos filhos com prazo
+    por página (PARSER_TIMEOUT_PAGINA) e teto de memória (PARSER_MAX_MEMORIA_MB).
+    Páginas que estouram um limite, ou além de PARSER_MAX_PAGINAS, voltam vazias
+    com 'pulada' preenchido: o resultado é parcial, mas a numeração é preservada.
+
+    Args:
+        arquivo: Caminho em disco, BytesIO ou objeto file-like.
+
+    Returns:
+        Lista na ordem das páginas:
+        {'pagina': n (1-based), 'texto': str, 'motor': 'rapido'|'layout', 'duracao_s': float,
+         'pulada': motivo (só em páginas puladas)}.
+
+    Raises:
+        ArquivoRecusado: arquivo acima de PARSER_MAX_BYTES ou que não abre dentro dos limites.
+    """
+    inicio = time.perf_counter()
+    temporario = None
+    try:
+        if isinstance(arquivo, (str, BytesIO)):
+            origem = arquivo
+        else:
+            origem = BytesIO(arquivo.read())
+            if hasattr(arquivo, 'seek'):
+                arquivo.seek(0)
+
+        tamanho = _tamanho_bytes(origem)
+        if tamanho > int(_config('PARSER_MAX_BYTES')):
+            raise ArquivoRecusado(f"PDF com {tamanho / 1024 / 1024:.1f} MB excede o limite de extração.")
+
+        if _config('PARSER_SANDBOX'):
+            caminho = origem
+            if not isinstance(origem, str):
+                # Os filhos abrem o arquivo por caminho: evita copiar os bytes pelo pipe
+                with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp:
+                    tmp.write(origem.getvalue())
+                caminho = temporario = tmp.name
+            resultado = _extrair_isolado(caminho, _config('PARSER_MOTOR'))
+        else:
+            # No próprio processo (desenvolvimento/testes): sem prazo nem teto de memória
+            with Extrator(origem, _config('PARSER_MOTOR')) as extrator:
+                max_paginas = int(_config('PARSER_MAX_PAGINAS'))
+                resultado = [
+                    extrator.pagina(i) if i < max_paginas else _pagina_pulada(i, 'limite_paginas')
+                    for i in range(extrator.total_paginas)
+                ]
+
+        duracao = time.perf_counter() - inicio
+        metricas.incrementar('extracao.paginas', len(resultado))
+        for motor, n in Counter(p['motor'] for p in resultado if p.get('motor')).items():
+            metricas.incrementar(f'extracao.paginas_{motor}', n)
+        puladas = paginas_puladas(resultado)
+        if puladas:
+            metricas.incrementar('extracao.paginas_puladas', len(puladas))
+            logger.warning(f"[EXTRACAO] {len(puladas)} página(s) pulada(s): {puladas[:10]}")
+        metricas.observar('extracao.latencia_s', duracao)
+        if duracao > 0 and resultado:
+            metricas.observar('extracao.paginas_por_segundo', len(resultado) / duracao)
+        return resultado
+    finally:
+        if temporario:
+            try:
+                os.remove(temporario)
+            except OSError:
+                pass
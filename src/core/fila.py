@@ -0,0 +1,413 @@
+"""
+Módulo de Fila de Trabalhos (Ingestão em Background).
+
+Substitui o disparo de uma 'threading.Thread' por upload por um pool
+LIMITADO de workers que consome jobs persistidos em um backend plugável:
+- 'memoria': dicionário em processo (padrão, ideal para dev/testes).
+- 'sqlite': arquivo local, sobrevive a reinícios do processo.
+
+Cada job tem um registro próprio (na_fila / executando / concluido / falhou),
+contador de tentativas e backoff exponencial entre tentativas.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from src.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+STATUS_NA_FILA = 'na_fila'
+STATUS_EXECUTANDO = 'executando'
+STATUS_CONCLUIDO = 'concluido'
+STATUS_FALHOU = 'falhou'
+
+STATUS_ATIVOS = (STATUS_NA_FILA, STATUS_EXECUTANDO)
+
+
+class FilaCheia(Exception):
+    """Lançada quando o limite de jobs pendentes foi atingido."""
+
+
+class ErroPermanente(Exception):
+    """Erro que não adianta repetir (ex: PDF ilegível). Encerra o job sem retry."""
+
+
+def executar_etapa(nome: str, funcao: Callable, *args, tentativas: int = 3,
+                   espera_base: float = 1.0, **kwargs) -> Any:
+    """
+    Executa uma etapa do pipeline com retry e backoff exponencial.
+    Assim uma falha no Pinecone não obriga a repetir a extração do PDF.
+    """
+    for tentativa in range(1, tentativas + 1):
+        try:
+            return funcao(*args, **kwargs)
+        except ErroPermanente:
+            raise
+        except Exception as e:
+            if tentativa >= tentativas:
+                raise
+            espera = espera_base * (2 ** (tentativa - 1))
+            logger.warning(
+                f"[FILA] Etapa '{nome}' falhou ({tentativa}/{tentativas}): {e}. "
+                f"Nova tentativa em {espera:.1f}s."
+            )
+            time.sleep(espera)
+
+
+# === BACKENDS ===
+
+class BackendMemoria:
+    """Backend em processo. Os jobs se perdem se o processo reiniciar."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+
+    def salvar(self, job: Dict[str, Any]) -> None:
+        with self._lock:
+            self._jobs[job['id']] = dict(job)
+
+    def obter(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def atualizar(self, job_id: str, **campos) -> None:
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(campos, atualizado_em=time.time())
+
+    def reservar(self, agora: float) -> Optional[Dict[str, Any]]:
+        """Marca como 'executando' o próximo job disponível e o retorna."""
+        with self._lock:
+            disponiveis = [
+                j for j in self._jobs.values()
+                if j['status'] == STATUS_NA_FILA and j['disponivel_em'] <= agora
+            ]
+            if not disponiveis:
+                return None
+            job = min(disponiveis, key=lambda j: (j['disponivel_em'], j['criado_em']))
+            job['status'] = STATUS_EXECUTANDO
+            job['tentativas'] += 1
+            job['atualizado_em'] = agora
+            return dict(job)
+
+    def recuperar_orfaos(self) -> int:
+        with self._lock:
+            orfaos = [j for j in self._jobs.values() if j['status'] == STATUS_EXECUTANDO]
+            for job in orfaos:
+                job['status'] = STATUS_NA_FILA
+            return len(orfaos)
+
+    def contar(self, *status: str) -> int:
+        with self._lock:
+            return sum(1 for j in self._jobs.values() if not status or j['status'] in status)
+
+
+class BackendSQLite:
+    """Backend em arquivo SQLite local. Sobrevive a reinícios da instância."""
+
+    _COLUNAS = ('id', 'payload', 'status', 'tentativas', 'max_tentativas',
+                'erro', 'disponivel_em', 'criado_em', 'atualizado_em')
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        with self._conectar() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    tentativas INTEGER NOT NULL DEFAULT 0,
+                    max_tentativas INTEGER NOT NULL,
+                    erro TEXT,
+                    disponivel_em REAL NOT NULL,
+                    criado_em REAL NOT NULL,
+                    atualizado_em REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, disponivel_em)")
+
+    @contextmanager
+    def _conectar(self) -> Iterator[sqlite3.Connection]:
+        # Uma conexão por operação: sqlite3 não compartilha conexões entre threads.
+        conn = sqlite3.connect(self.caminho, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _linha_para_job(self, linha) -> Dict[str, Any]:
+        job = dict(zip(self._COLUNAS, linha))
+        job['payload'] = json.loads(job['payload'])
+        return job
+
+    def salvar(self, job: Dict[str, Any]) -> None:
+        valores = dict(job, payload=json.dumps(job['payload'], ensure_ascii=False))
+        with self._lock, self._conectar() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO jobs ({', '.join(self._COLUNAS)}) "
+                f"VALUES ({', '.join('?' for _ in self._COLUNAS)})",
+                [valores.get(c) for c in self._COLUNAS]
+            )
+
+    def obter(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._conectar() as conn:
+            linha = conn.execute(
+                f"SELECT {', '.join(self._COLUNAS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._linha_para_job(linha) if linha else None
+
+    def atualizar(self, job_id: str, **campos) -> None:
+        campos['atualizado_em'] = time.time()
+        atribuicoes = ', '.join(f"{c} = ?" for c in campos)
+        with self._lock, self._conectar() as conn:
+            conn.execute(f"UPDATE jobs SET {atribuicoes} WHERE id = ?", [*campos.values(), job_id])
+
+    def reservar(self, agora: float) -> Optional[Dict[str, Any]]:
+        with self._lock, self._conectar() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                linha = conn.execute(
+                    f"SELECT {', '.join(self._COLUNAS)} FROM jobs "
+                    "WHERE status = ? AND disponivel_em <= ? "
+                    "ORDER BY disponivel_em, criado_em LIMIT 1",
+                    (STATUS_NA_FILA, agora)
+                ).fetchone()
+                if not linha:
+                    conn.execute("COMMIT")
+                    return None
+                job = self._linha_para_job(linha)
+                job['status'] = STATUS_EXECUTANDO
+                job['tentativas'] += 1
+                job['atualizado_em'] = agora
+                conn.execute(
+                    "UPDATE jobs SET status = ?, tentativas = ?, atualizado_em = ? WHERE id = ?",
+                    (job['status'], job['tentativas'], agora, job['id'])
+                )
+                conn.execute("COMMIT")
+                return job
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def recuperar_orfaos(self) -> int:
+        with self._lock, self._conectar() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, atualizado_em = ? WHERE status = ?",
+                (STATUS_NA_FILA, time.time(), STATUS_EXECUTANDO)
+            )
+            return cursor.rowcount
+
+    def contar(self, *status: str) -> int:
+        with self._conectar() as conn:
+            if not status:
+                return conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+            marcadores = ', '.join('?' for _ in status)
+            return conn.execute(
+                f"SELECT COUNT(*) FROM jobs WHERE status IN ({marcadores})", status
+            ).fetchone()[0]
+
+
+def criar_backend(config: Dict[str, Any]):
+    """Instancia o backend definido em INGESTAO_BACKEND."""
+    tipo = (config.get('INGESTAO_BACKEND') or 'memoria').lower()
+    if tipo == 'sqlite':
+        return BackendSQLite(config.get('INGESTAO_SQLITE_PATH', 'laurabot_fila.db'))
+    if tipo != 'memoria':
+        logger.warning(f"[FILA] Backend '{tipo}' desconhecido. Usando memória.")
+    return BackendMemoria()
+
+
+# === POOL DE WORKERS ===
+
+class FilaTrabalhos:
+    """
+    Pool limitado de workers que executa jobs persistidos no backend.
+
+    Uso:
+        fila = FilaTrabalhos('ingestao')
+        fila.init_app(app, processador=minha_funcao)
+        fila.enfileirar('doc_1', {'campo': 'valor'})
+    """
+
+    def __init__(self, nome: str = 'ingestao'):
+        self.nome = nome
+        self.app = None
+        self.backend = None
+        self.max_workers = 2
+        self.max_pendentes = 200
+        self.max_tentativas = 3
+        self.backoff_base = 5.0
+        self.intervalo_ocioso = 1.0
+        self._processador: Optional[Callable[[Dict[str, Any]], None]] = None
+        self._ao_falhar: Optional[Callable[[Dict[str, Any], str], None]] = None
+        self._threads: List[threading.Thread] = []
+        self._cond = threading.Condition()
+        self._parar = threading.Event()
+
+    def init_app(self, app, processador: Callable[[Dict[str, Any]], None],
+                 ao_falhar: Optional[Callable[[Dict[str, Any], str], None]] = None,
+                 varredor: Optional[Callable[['FilaTrabalhos'], int]] = None,
+                 backend=None) -> None:
+        """
+        Configura a fila. 'varredor' é chamado uma vez, em background, para
+        re-enfileirar trabalhos que ficaram pendentes de uma execução anterior.
+        """
+        self.app = app
+        self.backend = backend or criar_backend(app.config)
+        self.max_workers = max(1, int(app.config.get('INGESTAO_WORKERS', 2)))
+        self.max_pendentes = int(app.config.get('INGESTAO_FILA_MAX', 200))
+        self.max_tentativas = int(app.config.get('INGESTAO_MAX_TENTATIVAS', 3))
+        self.backoff_base = float(app.config.get('INGESTAO_BACKOFF_BASE', 5.0))
+        self.intervalo_ocioso = float(app.config.get('INGESTAO_INTERVALO_OCIOSO', 1.0))
+        self._processador = processador
+        self._ao_falhar = ao_falhar
+        app.extensions[f'fila_{self.nome}'] = self
+
+        if varredor and app.config.get('INGESTAO_VARRER_NA_INICIALIZACAO', True):
+            threading.Thread(
+                target=self.varrer, args=(varredor,), daemon=True, name=f'{self.nome}-varredor'
+            ).start()
+
+    # --- API pública ---
+
+    def enfileirar(self, job_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Persiste o job como 'na_fila' e acorda um worker. Lança FilaCheia se lotada."""
+        if self.backend is None:
+            raise RuntimeError("Fila não inicializada. Chame init_app() antes.")
+
+        existente = self.backend.obter(job_id)
+        ja_ativo = existente is not None and existente['status'] in STATUS_ATIVOS
+        if not ja_ativo and self.backend.contar(*STATUS_ATIVOS) >= self.max_pendentes:
+            raise FilaCheia(f"Fila '{self.nome}' cheia ({self.max_pendentes} jobs pendentes).")
+
+        agora = time.time()
+        job = {
+            'id': job_id,
+            'payload': payload,
+            'status': STATUS_NA_FILA,
+            'tentativas': 0,
+            'max_tentativas': self.max_tentativas,
+            'erro': None,
+            'disponivel_em': agora,
+            'criado_em': agora,
+            'atualizado_em': agora,
+        }
+        self.backend.salvar(job)
+        logger.info(f"[FILA] Job enfileirado: {job_id}")
+
+        self._garantir_workers()
+        with self._cond:
+            self._cond.notify()
+        return job
+
+    def obter(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.backend.obter(job_id) if self.backend else None
+
+    def pendentes(self) -> int:
+        return self.backend.contar(*STATUS_ATIVOS) if self.backend else 0
+
+    def varrer(self, varredor: Callable[['FilaTrabalhos'], int]) -> None:
+        """Devolve à fila jobs órfãos (executando) e roda o varredor de domínio."""
+        try:
+            orfaos = self.backend.recuperar_orfaos()
+            with self.app.app_context():
+                reenfileirados = varredor(self) or 0
+            if orfaos or reenfileirados:
+                logger.info(f"[FILA] Varredura: {orfaos} órfãos recuperados, {reenfileirados} re-enfileirados.")
+                self._garantir_workers()
+                with self._cond:
+                    self._cond.notify_all()
+        except Exception as e:
+            logger.error(f"[FILA] Falha na varredura de inicialização: {e}", exc_info=True)
+
+    def parar(self, timeout: float = 5.0) -> None:
+        """Sinaliza os workers para encerrarem (usado em testes e shutdown)."""
+        self._parar.set()
+        with self._cond:
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._parar.clear()
+
+    # --- Internos ---
+
+    def _garantir_workers(self) -> None:
+        with self._cond:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.max_workers:
+                thread = threading.Thread(
+                    target=self._loop_worker, daemon=True,
+                    name=f'{self.nome}-worker-{len(self._threads)}'
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _loop_worker(self) -> None:
+        while not self._parar.is_set():
+            try:
+                job = self.backend.reservar(time.time())
+            except Exception as e:
+                logger.error(f"[FILA] Erro ao reservar job: {e}", exc_info=True)
+                job = None
+
+            if job is None:
+                with self._cond:
+                    self._cond.wait(timeout=self.intervalo_ocioso)
+                continue
+
+            self._executar(job)
+
+    def _substituido(self, job: Dict[str, Any]) -> bool:
+        """True se um re-upload re-enfileirou o mesmo id enquanto este job rodava."""
+        atual = self.backend.obter(job['id'])
+        return atual is None or atual['criado_em'] != job['criado_em']
+
+    def _executar(self, job: Dict[str, Any]) -> None:
+        job_id = job['id']
+        inicio = time.monotonic()
+        logger.info(f"[FILA] Executando {job_id} (tentativa {job['tentativas']}/{job['max_tentativas']})")
+
+        try:
+            with self.app.app_context():
+                self._processador(job['payload'])
+            if self._substituido(job):
+                return
+            self.backend.atualizar(job_id, status=STATUS_CONCLUIDO, erro=None)
+            logger.info(f"[FILA] Job {job_id} concluído em {time.monotonic() - inicio:.1f}s")
+            return
+        except ErroPermanente as e:
+            erro, definitivo = str(e), True
+        except Exception as e:
+            erro, definitivo = str(e), job['tentativas'] >= job['max_tentativas']
+            logger.error(f"[FILA] Erro no job {job_id}: {e}", exc_info=True)
+
+        if self._substituido(job):
+            return
+
+        if not definitivo:
+            espera = self.backoff_base * (2 ** (job['tentativas'] - 1))
+            self.backend.atualizar(
+                job_id, status=STATUS_NA_FILA, erro=erro, disponivel_em=time.time() + espera
+            )
+            logger.warning(f"[FILA] Job {job_id} volta para a fila em {espera:.1f}s.")
+            return
+
+        self.backend.atualizar(job_id, status=STATUS_FALHOU, erro=erro)
+        logger.error(f"[FILA] Job {job_id} falhou definitivamente: {erro}")
+        if self._ao_falhar:
+            try:
+                with self.app.app_context():
+                    self._ao_falhar(job['payload'], erro)
+            except Exception as cb_err:
+                logger.critical(f"[FILA] Falha no callback de erro do job {job_id}: {cb_err}")
@@ -0,0 +1,117 @@
+"""
+Módulo de Fragmentação (Chunking) de Documentos.
+
+Divide o texto extraído em janelas sobrepostas para indexação multi-vetor.
+As janelas respeitam o layout: quebram preferencialmente em fronteiras de
+seção (títulos, parágrafos) e registram as páginas de origem de cada trecho.
+"""
+
+import re
+from typing import Any, Dict, List, Union
+
+TAMANHO_PADRAO = 1500
+SOBREPOSICAO_PADRAO = 200
+
+# Linha curta toda em maiúsculas ("CALENDÁRIO DE PROVAS") ou numerada ("2. MATERIAIS")
+_REGEX_TITULO = re.compile(r'^\s*(?:\d+(?:\.\d+)*[\.\)]\s+\S.{0,80}|[^a-zà-ÿ\n]{4,80})\s*$')
+_REGEX_PARAGRAFO = re.compile(r'\n\s*\n')
+
+
+def montar_id_fragmento(doc_id: str, indice: int) -> str:
+    return f"{doc_id}#chunk_{indice}"
+
+
+def _eh_titulo(bloco: str) -> bool:
+    primeira = bloco.strip().split('\n', 1)[0]
+    return bool(primeira) and bool(re.search(r'[A-Za-zÀ-ÿ]', primeira)) and bool(_REGEX_TITULO.match(primeira))
+
+
+def _dividir_bloco_grande(texto: str, tamanho_max: int) -> List[str]:
+    """Quebra um bloco maior que a janela por linhas (e à força, se preciso)."""
+    partes: List[str] = []
+    atual = ""
+    for linha in texto.split('\n'):
+        while len(linha) > tamanho_max:
+            if atual:
+                partes.append(atual)
+                atual = ""
+            partes.append(linha[:tamanho_max])
+            linha = linha[tamanho_max:]
+        if atual and len(atual) + len(linha) + 1 > tamanho_max:
+            partes.append(atual)
+            atual = linha
+        else:
+            atual = f"{atual}\n{linha}" if atual else linha
+    if atual.strip():
+        partes.append(atual)
+    return partes
+
+
+def _blocos_das_paginas(paginas: List[str], tamanho_max: int) -> List[Dict[str, Any]]:
+    blocos = []
+    for num_pagina, texto_pagina in enumerate(paginas, start=1):
+        for paragrafo in _REGEX_PARAGRAFO.split(texto_pagina or ""):
+            if not paragrafo.strip():
+                continue
+            titulo = _eh_titulo(paragrafo)
+            for parte in _dividir_bloco_grande(paragrafo.strip('\n'), tamanho_max):
+                blocos.append({'texto': parte, 'pagina': num_pagina, 'titulo': titulo})
+                titulo = False
+    return blocos
+
+
+def fragmentar_paginas(paginas: Union[str, List[str]], tamanho_max: int = TAMANHO_PADRAO,
+                       sobreposicao: int = SOBREPOSICAO_PADRAO) -> List[Dict[str, Any]]:
+    """
+    Agrupa os blocos das páginas em janelas de até 'tamanho_max' caracteres.
+
+    - Um título de seção encerra a janela atual se ela já estiver mais da metade cheia.
+    - Cada nova janela começa com os últimos blocos da anterior (até 'sobreposicao' chars).
+
+    Returns:
+        Lista de dicts: {'indice', 'texto', 'pagina_inicio', 'pagina_fim'}.
+    """
+    if isinstance(paginas, str):
+        paginas = [paginas]
+
+    blocos = _blocos_das_paginas(paginas, tamanho_max)
+    fragmentos: List[Dict[str, Any]] = []
+    janela: List[Dict[str, Any]] = []
+    novos_na_janela = 0
+
+    def tamanho(lista):
+        return sum(len(b['texto']) + 2 for b in lista)
+
+    def emitir():
+        fragmentos.append({
+            'indice': len(fragmentos),
+            'texto': "\n\n".join(b['texto'] for b in janela),
+            'pagina_inicio': janela[0]['pagina'],
+            'pagina_fim': janela[-1]['pagina'],
+        })
+
+    for bloco in blocos:
+        tamanho_atual = tamanho(janela)
+        estourou = tamanho_atual + len(bloco['texto']) > tamanho_max
+        quebra_secao = bloco['titulo'] and tamanho_atual >= tamanho_max // 2
+
+        if novos_na_janela and (estourou or quebra_secao):
+            emitir()
+            # Sobreposição: reaproveita o final da janela anterior
+            cauda: List[Dict[str, Any]] = []
+            for anterior in reversed(janela):
+                if tamanho(cauda) + len(anterior['texto']) > sobreposicao:
+                    break
+                cauda.insert(0, anterior)
+            if tamanho(cauda) + len(bloco['texto']) > tamanho_max:
+                cauda = []
+            janela = cauda
+            novos_na_janela = 0
+
+        janela.append(bloco)
+        novos_na_janela += 1
+
+    if novos_na_janela:
+        emitir()
+
+    return fragmentos
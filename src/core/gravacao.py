@@ -0,0 +1,180 @@
+"""
+Módulo de Gravação em Lote (write-behind para o Firestore).
+
+Quem registra um documento não espera o Firestore: o item entra em um buffer
+em memória e uma thread gravadora faz o commit em batch quando o lote enche
+(GRAVACAO_LOTE_MAX) ou quando o intervalo vence (GRAVACAO_INTERVALO).
+
+- Ordem: uma única thread grava, em ordem de chegada; um lote que falha é
+  repetido antes do próximo (nada passa na frente de uma conversa).
+- Memória limitada: com o buffer cheio (GRAVACAO_BUFFER_MAX) o item é
+  descartado e contado em métrica, em vez de segurar a requisição.
+- Encerramento: 'encerrar' (registrado no atexit) grava o que restou.
+- Id do documento gerado aqui: leituras juntam o que ainda está pendente
+  sem duplicar o que já foi gravado.
+"""
+
+import atexit
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from src.core.database import db
+from src.core.logger import get_logger
+from src.core.metricas import metricas
+
+logger = get_logger(__name__)
+
+# Limite de operações por batch do Firestore
+LOTE_MAX_FIRESTORE = 500
+
+# (coleção, id do documento, dados)
+Item = Tuple[str, str, Dict[str, Any]]
+
+
+class GravadorLotes:
+    """
+    Buffer write-behind com uma thread gravadora.
+
+    Uso:
+        gravador = GravadorLotes('historico')
+        gravador.init_app(app)
+        gravador.registrar('chat_history', {'role': 'user', ...})
+    """
+
+    def __init__(self, nome: str):
+        self.nome = nome
+        self.lote_max = 200
+        self.intervalo = 1.0
+        self.buffer_max = 5000
+        self.tentativas = 5
+        self._fila: Deque[Item] = deque()
+        self._em_gravacao: List[Item] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._parar = False
+        self._atexit_registrado = False
+
+    def init_app(self, app) -> None:
+        self.lote_max = max(1, min(LOTE_MAX_FIRESTORE, int(app.config.get('GRAVACAO_LOTE_MAX', 200))))
+        self.intervalo = float(app.config.get('GRAVACAO_INTERVALO', 1.0))
+        self.buffer_max = int(app.config.get('GRAVACAO_BUFFER_MAX', 5000))
+        self.tentativas = int(app.config.get('GRAVACAO_TENTATIVAS', 5))
+        app.extensions[f'gravador_{self.nome}'] = self
+        if not self._atexit_registrado:
+            atexit.register(self.encerrar)
+            self._atexit_registrado = True
+
+    # --- API pública ---
+
+    def registrar(self, colecao: str, dados: Dict[str, Any], doc_id: Optional[str] = None) -> Optional[str]:
+        """Enfileira o documento e retorna o id dele (ou None se o buffer estiver cheio). Não bloqueia."""
+        doc_id = doc_id or uuid.uuid4().hex
+        with self._cond:
+            if len(self._fila) >= self.buffer_max:
+                metricas.incrementar(f'gravacao.{self.nome}.descartados')
+                logger.error(f"[GRAVACAO] Buffer '{self.nome}' cheio ({self.buffer_max}); documento descartado.")
+                return None
+            self._fila.append((colecao, doc_id, dados))
+            self._publicar_profundidade()
+            if len(self._fila) >= self.lote_max:
+                self._cond.notify()
+        self._garantir_thread()
+        return doc_id
+
+    def pendentes(self, filtro: Callable[[str, Dict[str, Any]], bool]) -> List[Tuple[str, Dict[str, Any]]]:
+        """(id, dados) ainda não confirmados pelo Firestore que passam no filtro (coleção, dados), em ordem."""
+        with self._cond:
+            itens = self._em_gravacao + list(self._fila)
+        return [(doc_id, dados) for colecao, doc_id, dados in itens if filtro(colecao, dados)]
+
+    def profundidade(self) -> int:
+        with self._cond:
+            return len(self._fila) + len(self._em_gravacao)
+
+    def descarregar(self) -> None:
+        """Grava tudo o que está no buffer agora, na thread de quem chamou."""
+        while True:
+            with self._cond:
+                if not self._fila:
+                    return
+                lote = self._retirar_lote()
+            self._gravar(lote)
+
+    def encerrar(self, timeout: float = 10.0) -> None:
+        """Para a thread gravadora e grava o restante (shutdown)."""
+        with self._cond:
+            self._parar = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.descarregar()
+        with self._cond:
+            self._parar = False
+
+    # --- Internos ---
+
+    def _publicar_profundidade(self) -> None:
+        metricas.definir(f'gravacao.{self.nome}.fila', len(self._fila) + len(self._em_gravacao))
+
+    def _garantir_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._parar or (self._thread is not None and self._thread.is_alive()):
+                return
+            self._thread = threading.Thread(target=self._loop, daemon=True, name=f'gravador-{self.nome}')
+            self._thread.start()
+
+    def _retirar_lote(self) -> List[Item]:
+        """Chamado com o lock: move até 'lote_max' itens para 'em gravação'."""
+        lote = [self._fila.popleft() for _ in range(min(self.lote_max, len(self._fila)))]
+        self._em_gravacao = lote
+        return lote
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                if not self._fila and not self._parar:
+                    self._cond.wait(timeout=self.intervalo)
+                elif len(self._fila) < self.lote_max and not self._parar:
+                    # Lote incompleto: espera o intervalo para juntar mais
+                    self._cond.wait(timeout=self.intervalo)
+                if self._parar:
+                    return  # 'encerrar' grava o restante
+                if not self._fila:
+                    continue
+                lote = self._retirar_lote()
+            self._gravar(lote)
+
+    def _gravar(self, lote: List[Item]) -> None:
+        inicio = time.monotonic()
+        if db is None:
+            metricas.incrementar(f'gravacao.{self.nome}.descartados', len(lote))
+            logger.warning(f"[GRAVACAO] Firestore indisponível; {len(lote)} documento(s) descartado(s).")
+            lote = []
+        for tentativa in range(1, self.tentativas + 1):
+            if not lote:
+                break
+            try:
+                batch = db.batch()
+                for colecao, doc_id, dados in lote:
+                    batch.set(db.collection(colecao).document(doc_id), dados)
+                batch.commit()
+                metricas.incrementar(f'gravacao.{self.nome}.gravados', len(lote))
+                metricas.observar(f'gravacao.{self.nome}.lote_s', time.monotonic() - inicio)
+                break
+            except Exception as e:
+                if tentativa >= self.tentativas:
+                    metricas.incrementar(f'gravacao.{self.nome}.descartados', len(lote))
+                    logger.error(f"[GRAVACAO] Lote de {len(lote)} documento(s) descartado após {tentativa} tentativas: {e}")
+                    break
+                espera = min(5.0, 0.2 * (2 ** (tentativa - 1)))
+                logger.warning(f"[GRAVACAO] Falha ao gravar lote ({tentativa}/{self.tentativas}): {e}. Nova tentativa em {espera:.1f}s.")
+                time.sleep(espera)
+        with self._cond:
+            self._em_gravacao = []
+            self._publicar_profundidade()
@@ -0,0 +1,85 @@
+"""
+Módulo de Métricas em Processo.
+
+Contadores e observações (latência, throughput) com janela deslizante
+para percentis. Exposto em JSON pela rota /admin/metricas.
+"""
+
+import threading
+from collections import deque
+from typing import Any, Deque, Dict
+
+JANELA_AMOSTRAS = 500
+
+
+def _percentil(amostras: list, p: float) -> float:
+    if not amostras:
+        return 0.0
+    ordenadas = sorted(amostras)
+    posicao = min(len(ordenadas) - 1, int(round(p * (len(ordenadas) - 1))))
+    return ordenadas[posicao]
+
+
+class Metricas:
+    """Registro thread-safe de contadores e observações numéricas."""
+
+    def __init__(self, janela: int = JANELA_AMOSTRAS):
+        self._lock = threading.Lock()
+        self._janela = janela
+        self._contadores: Dict[str, float] = {}
+        self._observacoes: Dict[str, Dict[str, Any]] = {}
+
+    def incrementar(self, nome: str, valor: float = 1) -> None:
+        with self._lock:
+            self._contadores[nome] = self._contadores.get(nome, 0) + valor
+
+    def definir(self, nome: str, valor: float) -> None:
+        """Grava um valor instantâneo (gauge), ex: profundidade de fila."""
+        with self._lock:
+            self._contadores[nome] = valor
+
+    def observar(self, nome: str, valor: float) -> None:
+        with self._lock:
+            obs = self._observacoes.get(nome)
+            if obs is None:
+                obs = self._observacoes[nome] = {
+                    'total': 0, 'soma': 0.0, 'max': 0.0,
+                    'amostras': deque(maxlen=self._janela)
+                }
+            obs['total'] += 1
+            obs['soma'] += valor
+            obs['max'] = max(obs['max'], valor)
+            obs['amostras'].append(valor)
+
+    def contador(self, nome: str) -> float:
+        with self._lock:
+            return self._contadores.get(nome, 0)
+
+    def percentil(self, nome: str, p: float) -> float:
+        with self._lock:
+            obs = self._observacoes.get(nome)
+            amostras: Deque[float] = obs['amostras'] if obs else deque()
+            return _percentil(list(amostras), p)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            observacoes = {}
+            for nome, obs in self._observacoes.items():
+                amostras = list(obs['amostras'])
+                observacoes[nome] = {
+                    'total': obs['total'],
+                    'media': obs['soma'] / obs['total'] if obs['total'] else 0.0,
+                    'max': obs['max'],
+                    'p50': _percentil(amostras, 0.50),
+                    'p95': _percentil(amostras, 0.95),
+                }
+            return {'contadores': dict(self._contadores), 'observacoes': observacoes}
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._contadores.clear()
+            self._observacoes.clear()
+
+
+# Instância global usada por todos os módulos
+metricas = Metricas()
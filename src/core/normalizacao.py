@@ -0,0 +1,286 @@
+"""
+Módulo de Normalização de Texto (entre a extração e a indexação).
+
+O layout=True do pdfplumber preenche as linhas com longas sequências de
+espaços, e toda página repete timbre, endereço, CNPJ e rodapé da escola.
+Tudo isso era embutido, gravado no Pinecone e colado nos prompts do chat.
+
+- Espaços: linhas de prosa viram espaço simples; blocos tabulares perdem só
+  as colunas em branco comuns a todas as linhas (o alinhamento se mantém).
+- Repetições: linhas do topo/rodapé presentes na maioria das páginas do
+  documento, ou no topo/rodapé de vários documentos do corpus, são removidas.
+- Relatório: caracteres e tokens estimados antes/depois, por documento.
+"""
+
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from flask import current_app, has_app_context
+from google.cloud import firestore
+
+from src.core.cache import chave_hash, normalizar_texto
+from src.core.database import db
+from src.core.logger import get_logger
+from src.core.metricas import metricas
+
+logger = get_logger(__name__)
+
+COLLECTION_BOILERPLATE = 'boilerplate_linhas'
+
+# Vão interno que caracteriza coluna de tabela (prosa justificada raramente passa de 2)
+_REGEX_VAO_TABULAR = re.compile(r'\S {3,}\S')
+_REGEX_ESPACOS = re.compile(r'[ \t ]+')
+_REGEX_LINHAS_VAZIAS = re.compile(r'\n{3,}')
+_REGEX_DIGITOS = re.compile(r'\d+')
+
+PADROES = {
+    'NORMALIZACAO_ZONA_LINHAS': 6,
+    'NORMALIZACAO_FRACAO_PAGINAS': 0.5,
+    'NORMALIZACAO_CORPUS_MIN_DOCS': 3,
+    'NORMALIZACAO_CORPUS_TTL': 300.0,
+}
+
+
+def _config(chave: str) -> Any:
+    padrao = PADROES[chave]
+    if has_app_context():
+        return type(padrao)(current_app.config.get(chave, padrao))
+    return padrao
+
+
+def estimar_tokens(texto: str) -> int:
+    """Estimativa barata (~4 caracteres por token em português), sem tokenizer."""
+    return (len(texto or "") + 3) // 4
+
+
+# === ESPAÇOS ===
+
+def _compactar_bloco_tabular(linhas: List[str]) -> List[str]:
+    """Remove as colunas de espaço comuns a todas as linhas: vãos viram 2 espaços, margem some."""
+    largura = max(len(l) for l in linhas)
+    grade = [l.ljust(largura) for l in linhas]
+    vazia = [all(l[c] == ' ' for l in grade) for c in range(largura)]
+
+    manter: List[int] = []
+    c = 0
+    while c < largura:
+        if not vazia[c]:
+            manter.append(c)
+            c += 1
+            continue
+        inicio = c
+        while c < largura and vazia[c]:
+            c += 1
+        if inicio > 0 and c < largura:
+            manter.extend(range(inicio, min(c, inicio + 2)))  # Vão interno: até 2 colunas
+    return [''.join(l[i] for i in manter).rstrip() for l in grade]
+
+
+def compactar_espacos(texto: str) -> str:
+    """
+    Prosa: espaços simples, sem margem. Linhas tabulares consecutivas (vãos de 3+
+    espaços) são compactadas em bloco, preservando o alinhamento das colunas.
+    """
+    saida: List[str] = []
+    bloco: List[str] = []
+
+    def descarregar():
+        if len(bloco) > 1:
+            saida.extend(_compactar_bloco_tabular(bloco))
+        elif bloco:
+            # Linha isolada não tem alinhamento a preservar
+            saida.append(_REGEX_ESPACOS.sub(' ', bloco[0]).strip())
+        bloco.clear()
+
+    for linha in (texto or "").replace('\t', '    ').replace(' ', ' ').split('\n'):
+        if _REGEX_VAO_TABULAR.search(linha.strip()):
+            bloco.append(linha.rstrip())
+            continue
+        descarregar()
+        saida.append(_REGEX_ESPACOS.sub(' ', linha).strip())
+    descarregar()
+
+    return _REGEX_LINHAS_VAZIAS.sub('\n\n', '\n'.join(saida)).strip()
+
+
+# === LINHAS REPETIDAS ===
+
+def chave_linha(linha: str) -> str:
+    """Números variam ('Página 2 de 5', datas de emissão): não contam para a repetição."""
+    return _REGEX_DIGITOS.sub('#', normalizar_texto(linha))
+
+
+def _zona(linhas: List[str], tamanho: int) -> Set[int]:
+    """
+    Índices das primeiras/últimas linhas não vazias (topo e rodapé). Em páginas
+    curtas a zona encolhe (até 1/3 das linhas de cada lado) para não alcançar o corpo.
+    """
+    preenchidas = [i for i, l in enumerate(linhas) if l.strip()]
+    tamanho = min(tamanho, max(1, len(preenchidas) // 3))
+    return set(preenchidas[:tamanho]) | set(preenchidas[-tamanho:])
+
+
+def candidatas_boilerplate(paginas: List[str], zona: int) -> List[Set[str]]:
+    """Chaves das linhas de topo/rodapé de cada página."""
+    resultado = []
+    for pagina in paginas:
+        linhas = pagina.split('\n')
+        chaves = {chave_linha(linhas[i]) for i in _zona(linhas, zona)}
+        # Linha só de números (nº de página solto) é ambígua demais para virar boilerplate
+        resultado.append({c for c in chaves if c.strip('# ')})
+    return resultado
+
+
+def linhas_repetidas(paginas: List[str], zona: int = 6, fracao: float = 0.5) -> Set[str]:
+    """Chaves presentes no topo/rodapé de pelo menos 2 páginas e de 'fracao' das páginas com texto."""
+    por_pagina = [c for c, p in zip(candidatas_boilerplate(paginas, zona), paginas) if p.strip()]
+    if len(por_pagina) < 2:
+        return set()
+    contagem: Dict[str, int] = {}
+    for chaves in por_pagina:
+        for chave in chaves:
+            contagem[chave] = contagem.get(chave, 0) + 1
+    minimo = max(2, fracao * len(por_pagina))
+    return {chave for chave, n in contagem.items() if n >= minimo}
+
+
+def _remover_linhas(pagina: str, chaves: Set[str], zona: int) -> Tuple[str, int]:
+    linhas = pagina.split('\n')
+    alvo = {i for i in _zona(linhas, zona) if chave_linha(linhas[i]) in chaves}
+    if not alvo:
+        return pagina, 0
+    restantes = [l for i, l in enumerate(linhas) if i not in alvo]
+    return _REGEX_LINHAS_VAZIAS.sub('\n\n', '\n'.join(restantes)).strip(), len(alvo)
+
+
+def _candidatas_documento(paginas: List[str], zona: int) -> List[str]:
+    """Timbre e rodapé institucionais aparecem na primeira e na última página: bastam essas."""
+    preenchidas = [p for p in paginas if p.strip()]
+    if not preenchidas:
+        return []
+    extremos = [preenchidas[0]] if len(preenchidas) == 1 else [preenchidas[0], preenchidas[-1]]
+    return sorted(set().union(*candidatas_boilerplate(extremos, zona)))
+
+
+def normalizar_paginas(paginas: List[str], boilerplate_corpus: Iterable[str] = ()) -> Tuple[List[str], Dict[str, Any]]:
+    """
+    Normaliza as páginas de um documento (a posição na lista continua sendo a página).
+
+    Args:
+        paginas: Texto bruto por página.
+        boilerplate_corpus: Chaves (chave_linha) já conhecidas como repetidas no corpus.
+
+    Returns:
+        (paginas normalizadas, relatório). O relatório traz 'candidatas' (chaves de
+        topo/rodapé deste documento) para alimentar o registro do corpus.
+    """
+    zona = _config('NORMALIZACAO_ZONA_LINHAS')
+    compactadas = [compactar_espacos(p) for p in paginas]
+
+    repetidas = linhas_repetidas(compactadas, zona, _config('NORMALIZACAO_FRACAO_PAGINAS'))
+    remover = repetidas | set(boilerplate_corpus)
+
+    normalizadas: List[str] = []
+    removidas = 0
+    for pagina in compactadas:
+        texto, n = _remover_linhas(pagina, remover, zona) if pagina else (pagina, 0)
+        normalizadas.append(texto)
+        removidas += n
+
+    chars_antes = sum(len(p or "") for p in paginas)
+    chars_depois = sum(len(p) for p in normalizadas)
+    tokens_antes = sum(estimar_tokens(p) for p in paginas)
+    tokens_depois = sum(estimar_tokens(p) for p in normalizadas)
+    relatorio = {
+        'chars_antes': chars_antes,
+        'chars_depois': chars_depois,
+        'tokens_antes': tokens_antes,
+        'tokens_depois': tokens_depois,
+        'economia_pct': round(100.0 * (tokens_antes - tokens_depois) / tokens_antes, 1) if tokens_antes else 0.0,
+        'linhas_removidas': removidas,
+        'candidatas': _candidatas_documento(compactadas, zona),
+    }
+    metricas.incrementar('normalizacao.tokens_antes', tokens_antes)
+    metricas.incrementar('normalizacao.tokens_economizados', tokens_antes - tokens_depois)
+    return normalizadas, relatorio
+
+
+# === BOILERPLATE DO CORPUS ===
+
+class BoilerplateCorpus:
+    """
+    Linhas de topo/rodapé vistas em vários documentos (Firestore 'boilerplate_linhas').
+    Cada linha guarda os documentos em que apareceu; com 'min_docs' ou mais, é boilerplate.
+    A lista de frequentes fica em memória por 'ttl' segundos.
+    """
+
+    # Depois disso a linha já é boilerplate com folga: não vale mais escrever nela
+    MAX_DOCUMENTOS = 20
+
+    def __init__(self, min_docs: int = 3, ttl: float = 300.0):
+        self.min_docs = min_docs
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._frequentes: Set[str] = set()
+        self._lido_em = 0.0
+
+    @staticmethod
+    def _id(chave: str) -> str:
+        return chave_hash(chave)[:32]
+
+    def frequentes(self) -> Set[str]:
+        if db is None:
+            return set()
+        if time.monotonic() - self._lido_em < self.ttl:
+            return self._frequentes
+        with self._lock:
+            if time.monotonic() - self._lido_em >= self.ttl:
+                try:
+                    docs = db.collection(COLLECTION_BOILERPLATE).where('total', '>=', self.min_docs).stream()
+                    self._frequentes = {d.to_dict().get('linha', '') for d in docs}
+                except Exception as e:
+                    logger.warning(f"[NORMALIZACAO] Falha ao ler boilerplate do corpus: {e}")
+                self._lido_em = time.monotonic()
+        return self._frequentes
+
+    def registrar(self, doc_id: str, chaves: Iterable[str]) -> None:
+        """Idempotente por documento: reprocessar o mesmo arquivo não infla a contagem."""
+        if db is None:
+            return
+        colecao = db.collection(COLLECTION_BOILERPLATE)
+
+        @firestore.transactional
+        def _registrar(transacao, ref, chave):
+            snapshot = ref.get(transaction=transacao)
+            dados = snapshot.to_dict() if snapshot.exists else {'linha': chave, 'documentos': [], 'total': 0}
+            if doc_id in dados['documentos'] or dados['total'] >= self.MAX_DOCUMENTOS:
+                return
+            transacao.set(ref, {
+                'linha': chave,
+                'documentos': dados['documentos'] + [doc_id],
+                'total': dados['total'] + 1,
+                'atualizado_em': firestore.SERVER_TIMESTAMP,
+            })
+
+        for chave in chaves:
+            try:
+                _registrar(db.transaction(), colecao.document(self._id(chave)), chave)
+            except Exception as e:
+                logger.warning(f"[NORMALIZACAO] Falha ao registrar linha do corpus: {e}")
+
+
+_corpus: Optional[BoilerplateCorpus] = None
+_corpus_lock = threading.Lock()
+
+def get_boilerplate_corpus() -> BoilerplateCorpus:
+    global _corpus
+    if _corpus is None:
+        with _corpus_lock:
+            if _corpus is None:
+                _corpus = BoilerplateCorpus(
+                    min_docs=_config('NORMALIZACAO_CORPUS_MIN_DOCS'),
+                    ttl=_config('NORMALIZACAO_CORPUS_TTL'),
+                )
+    return _corpus
@@ -10,40 +10,43 @@ import json
 import re
 from io import BytesIO
 from typing import Dict, Any, Union, List, Optional
-import pdfplumber
+from src.core import extracao
 from src.core.logger import get_logger
 from src.core.ai import get_generative_model
 
 logger = get_logger(__name__)
 
-def extrair_texto_pdf(arquivo_storage: Union[BytesIO, Any]) -> str:
+def extrair_paginas_detalhadas(arquivo_storage: Union[BytesIO, str, Any]) -> List[Dict[str, Any]]:
     """
-    Lê o PDF e extrai texto preservando layout de tabelas via pdfplumber.
+    Resultado por página ({'pagina', 'texto', 'motor', 'duracao_s'}), extraído em paralelo
+    por intervalos de páginas quando o PDF é grande (ver src.core.extracao).
+    Aceita também o caminho de um arquivo em disco (spool do upload), sem copiá-lo para a memória.
+    Páginas que estouraram os limites do sandbox vêm vazias, com 'pulada' preenchido.
     """
     try:
-        # pdfplumber exige arquivo em disco ou objeto file-like (BytesIO)
-        if isinstance(arquivo_storage, BytesIO):
-            pdf_file = arquivo_storage
-        else:
-            pdf_file = BytesIO(arquivo_storage.read())
-            if hasattr(arquivo_storage, 'seek'):
-                arquivo_storage.seek(0)
-
-        texto_completo = ""
-        
-        with pdfplumber.open(pdf_file) as pdf:
-            for page in pdf.pages:
-                # extract_text(layout=True) tenta manter a posição visual (tabelas)
-                # x_tolerance e y_tolerance podem ser ajustados se necessário
-                texto_pag = page.extract_text(layout=True)
-                if texto_pag:
-                    texto_completo += texto_pag + "\n"
-        
-        return texto_completo.strip()
-
+        return extracao.extrair_paginas(arquivo_storage)
+    except extracao.ArquivoRecusado:
+        raise  # Motivo explícito (tamanho/limites): quem chamou decide o que mostrar
     except Exception as e:
         logger.error(f"Erro no pdfplumber: {e}", exc_info=True)
-        return ""
+        return []
+
+def extrair_paginas_pdf(arquivo_storage: Union[BytesIO, str, Any]) -> List[str]:
+    """
+    Lê o PDF e extrai o texto de cada página; páginas com tabelas passam pelo pdfplumber (layout).
+    A posição na lista corresponde ao número da página (usado no chunking).
+    """
+    return [p['texto'] for p in extrair_paginas_detalhadas(arquivo_storage)]
+
+def juntar_paginas(paginas: List[str]) -> str:
+    """Concatena as páginas no formato histórico de extrair_texto_pdf."""
+    return "\n".join(p for p in paginas if p).strip()
+
+def extrair_texto_pdf(arquivo_storage: Union[BytesIO, Any]) -> str:
+    """
+    Lê o PDF e extrai texto preservando layout de tabelas via pdfplumber.
+    """
+    return juntar_paginas(extrair_paginas_pdf(arquivo_storage))
 
 def _analisar_regex_fallback(nome_arquivo: str) -> Dict[str, Any]:
     """
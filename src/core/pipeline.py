@@ -0,0 +1,145 @@
+"""
+Módulo de Pipeline Concorrente (etapas com dependências e prazos).
+
+Cada etapa é submetida ao executor assim que suas dependências terminam
+(callbacks, nenhuma thread fica bloqueada esperando outra). O prazo de cada
+etapa conta a partir do início do pipeline; quem lê um resultado atrasado ou
+com erro recebe o 'padrao' da etapa e segue em frente.
+
+Uso:
+    p = Pipeline('turno', executor, app)
+    p.etapa('busca', buscar, prazo=6.0, padrao=[])
+    p.etapa('assinatura', assinar, depende=('busca',), prazo=8.0, padrao={})
+    urls = p.resultado('assinatura')
+    p.server_timing()  # 'busca;dur=312.4, assinatura;dur=41.0'
+"""
+
+import threading
+import time
+from concurrent.futures import Executor, Future, TimeoutError
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from src.core.logger import get_logger
+from src.core.metricas import metricas
+
+logger = get_logger(__name__)
+
+STATUS_OK = 'ok'
+STATUS_ERRO = 'erro'
+STATUS_EXPIROU = 'expirou'
+
+
+class _Etapa:
+    def __init__(self, nome: str, prazo: Optional[float], padrao: Any):
+        self.nome = nome
+        self.prazo = prazo
+        self.padrao = padrao
+        self.futuro: Future = Future()
+        self.duracao: Optional[float] = None
+        self.status: Optional[str] = None
+
+
+class Pipeline:
+    """Etapas concorrentes de uma requisição, com tempo por etapa para diagnóstico."""
+
+    def __init__(self, nome: str, executor: Executor, app=None):
+        self.nome = nome
+        self.executor = executor
+        self.app = app
+        self.inicio = time.monotonic()
+        self._etapas: Dict[str, _Etapa] = {}
+        self._lock = threading.Lock()
+
+    def etapa(self, nome: str, funcao: Callable, depende: Iterable[str] = (),
+              prazo: Optional[float] = None, padrao: Any = None) -> None:
+        """
+        Registra e dispara a etapa. 'funcao' recebe os resultados das dependências
+        (na ordem de 'depende'); dependência que falhou ou expirou entrega o seu padrão.
+        """
+        etapa = _Etapa(nome, prazo, padrao)
+        dependencias = [self._etapas[d] for d in depende]
+        self._etapas[nome] = etapa
+
+        def executar():
+            argumentos = [self._valor(d) for d in dependencias]
+            inicio = time.monotonic()
+            try:
+                if self.app is not None:
+                    with self.app.app_context():
+                        resultado = funcao(*argumentos)
+                else:
+                    resultado = funcao(*argumentos)
+                etapa.futuro.set_result(resultado)
+            except BaseException as e:
+                etapa.futuro.set_exception(e)
+            finally:
+                etapa.duracao = time.monotonic() - inicio
+                metricas.observar(f'{self.nome}.{nome}_s', etapa.duracao)
+
+        def disparar():
+            try:
+                self.executor.submit(executar)
+            except RuntimeError as e:  # Executor encerrado (shutdown do processo)
+                etapa.futuro.set_exception(e)
+
+        if not dependencias:
+            disparar()
+            return
+
+        pendentes = [len(dependencias)]
+
+        def dependencia_concluida(_):
+            with self._lock:
+                pendentes[0] -= 1
+                pronto = pendentes[0] == 0
+            if pronto:
+                disparar()
+
+        for dependencia in dependencias:
+            dependencia.futuro.add_done_callback(dependencia_concluida)
+
+    def _valor(self, etapa: _Etapa) -> Any:
+        """Resultado de uma etapa já concluída (ou o padrão, se falhou)."""
+        try:
+            return etapa.futuro.result(timeout=0)
+        except Exception:
+            return etapa.padrao
+
+    def resultado(self, nome: str) -> Any:
+        """Espera a etapa até o seu prazo. Atraso ou erro: loga e devolve o padrão."""
+        etapa = self._etapas[nome]
+        restante = None
+        if etapa.prazo is not None:
+            restante = max(0.0, self.inicio + etapa.prazo - time.monotonic())
+        try:
+            valor = etapa.futuro.result(timeout=restante)
+            etapa.status = STATUS_OK
+            return valor
+        except TimeoutError:
+            etapa.status = STATUS_EXPIROU
+            metricas.incrementar(f'{self.nome}.{nome}.expirou')
+            logger.warning(f"[PIPELINE] {self.nome}: etapa '{nome}' passou do prazo de {etapa.prazo:.1f}s.")
+        except Exception as e:
+            etapa.status = STATUS_ERRO
+            metricas.incrementar(f'{self.nome}.{nome}.erro')
+            logger.error(f"[PIPELINE] {self.nome}: etapa '{nome}' falhou: {e}", exc_info=True)
+        return etapa.padrao
+
+    def tempos(self) -> Dict[str, Dict[str, Any]]:
+        """Duração (ms) e status das etapas, mais o tempo total desde o início."""
+        tempos = {
+            nome: {
+                'ms': round(etapa.duracao * 1000, 1) if etapa.duracao is not None else None,
+                'status': etapa.status or (STATUS_OK if etapa.futuro.done() else 'pendente'),
+            }
+            for nome, etapa in self._etapas.items()
+        }
+        tempos['total'] = {'ms': round((time.monotonic() - self.inicio) * 1000, 1), 'status': STATUS_OK}
+        return tempos
+
+    def server_timing(self) -> str:
+        """Cabeçalho HTTP Server-Timing (aparece na aba Network do navegador)."""
+        return ", ".join(
+            f"{nome};dur={t['ms']}" + ("" if t['status'] == STATUS_OK else f';desc="{t["status"]}"')
+            for nome, t in self.tempos().items() if t['ms'] is not None
+        )
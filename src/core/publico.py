@@ -0,0 +1,139 @@
+"""
+Módulo de Público-Alvo (chaves de filtro pré-computadas).
+
+Na ingestão, segmento/séries/períodos/turmas/integral do comunicado viram uma
+lista de chaves canônicas (vocabulário de DADOS_ESCOLA) no metadata 'publico'
+de cada vetor. Na busca, o perfil do aluno vira a lista de chaves que ele
+"enxerga" (escola inteira, segmento, série, turma) e o Pinecone filtra com
+um único $in: o top_k deixa de ser gasto com comunicados de outras séries.
+
+Formato das chaves: 'TODOS' | 'AI' | 'AI/3º Ano' | 'AI/3º Ano/B'.
+Comunicados exclusivos do integral usam as mesmas chaves com prefixo 'integral:'.
+"""
+
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.core.constants import DADOS_ESCOLA
+
+CHAVE_ESCOLA = 'TODOS'
+PREFIXO_INTEGRAL = 'integral:'
+
+_SEGMENTO_DA_SERIE: Dict[str, str] = {
+    serie: segmento for segmento, series in DADOS_ESCOLA['series'].items() for serie in series
+}
+_REGEX_NUMERO = re.compile(r'\d+')
+
+
+def _simplificar(texto: str) -> str:
+    """'3º Ano' -> '3o ano'; 'Série' -> 'serie' (acentos e caixa não importam)."""
+    decomposto = unicodedata.normalize('NFKD', str(texto or ''))
+    return " ".join(''.join(c for c in decomposto if not unicodedata.combining(c)).casefold().split())
+
+
+def _numero(texto: str) -> Optional[str]:
+    encontrado = _REGEX_NUMERO.search(texto)
+    return encontrado.group() if encontrado else None
+
+
+def canonizar_serie(bruto: str, segmento: Optional[str] = None) -> Optional[str]:
+    """
+    Converte a série como veio do formulário ou da IA ('3o ano', '3º Ano/Série',
+    'infantil 4') no nome canônico de DADOS_ESCOLA. Ambíguo ou desconhecido: None.
+    """
+    simples = _simplificar(bruto)
+    for serie in _SEGMENTO_DA_SERIE:
+        if _simplificar(serie) == simples:
+            return serie
+
+    numero = _numero(simples)
+    if numero is None:
+        return None
+    segmentos = [segmento] if segmento in DADOS_ESCOLA['series'] else list(DADOS_ESCOLA['series'])
+    candidatas = [s for seg in segmentos for s in DADOS_ESCOLA['series'][seg] if _numero(s) == numero]
+    if len(candidatas) > 1:
+        # '1' existe em EI, AI e EM: a palavra desempata
+        if 'infantil' in simples:
+            candidatas = [s for s in candidatas if _SEGMENTO_DA_SERIE[s] == 'EI']
+        elif 'serie' in simples and 'ano' not in simples:
+            candidatas = [s for s in candidatas if _SEGMENTO_DA_SERIE[s] == 'EM']
+        elif 'ano' in simples and 'serie' not in simples:
+            candidatas = [s for s in candidatas if _SEGMENTO_DA_SERIE[s] in ('AI', 'AF')]
+    return candidatas[0] if len(candidatas) == 1 else None
+
+
+def turmas_da_serie(serie: str, periodos: Iterable[str] = ()) -> List[str]:
+    """Turmas existentes na série (opcionalmente só as dos períodos informados)."""
+    matriz = DADOS_ESCOLA['turmas'].get(serie, {})
+    filtro = {_simplificar(p) for p in periodos if p}
+    turmas: List[str] = []
+    for periodo, letras in matriz.items():
+        if not filtro or _simplificar(periodo) in filtro:
+            turmas.extend(t for t in letras if t not in turmas)
+    return turmas
+
+
+def _com_integral(chaves: List[str], integral: bool) -> List[str]:
+    return [f"{PREFIXO_INTEGRAL}{c}" for c in chaves] if integral else chaves
+
+
+def chaves_documento(segmento: Optional[str] = None, series: Iterable[str] = (),
+                     periodos: Iterable[str] = (), turmas: Iterable[str] = (),
+                     integral: bool = False, **_: Any) -> List[str]:
+    """
+    Chaves de público de um comunicado (gravadas em cada vetor na ingestão/edição).
+    Séries vazias = segmento inteiro; segmento desconhecido/'TODOS' = escola inteira.
+    """
+    segmento = segmento if segmento in DADOS_ESCOLA['segmentos'] else None
+    periodos = [p for p in periodos or [] if p]
+    letras = {str(t).strip().upper() for t in turmas or [] if str(t).strip()}
+
+    canonicas: List[str] = []
+    for bruto in series or []:
+        serie = canonizar_serie(bruto, segmento)
+        if serie and serie not in canonicas:
+            canonicas.append(serie)
+    # Turma/período sem série: vale para as séries do segmento que têm essas turmas
+    if not canonicas and segmento and (letras or periodos):
+        canonicas = list(DADOS_ESCOLA['series'][segmento])
+
+    if not canonicas:
+        return _com_integral([segmento or CHAVE_ESCOLA], integral)
+
+    chaves: List[str] = []
+    for serie in canonicas:
+        prefixo = f"{_SEGMENTO_DA_SERIE[serie]}/{serie}"
+        if letras or periodos:
+            chaves.extend(
+                f"{prefixo}/{t}" for t in turmas_da_serie(serie, periodos) if not letras or t in letras
+            )
+        else:
+            chaves.append(prefixo)
+    if not chaves:
+        # Combinação inexistente na matriz (dado manual/IA inconsistente): melhor
+        # alcançar a série inteira do que sumir da busca
+        chaves = [f"{_SEGMENTO_DA_SERIE[s]}/{s}" for s in canonicas]
+    return _com_integral(chaves, integral)
+
+
+def chaves_aluno(filho: Dict[str, Any]) -> List[str]:
+    """Chaves que um aluno enxerga: escola, segmento, série e turma (e as do integral, se for o caso)."""
+    chaves = [CHAVE_ESCOLA]
+    segmento = filho.get('segmento')
+    serie = canonizar_serie(filho.get('serie', ''), segmento)
+    if serie:
+        segmento = _SEGMENTO_DA_SERIE[serie]
+    if segmento in DADOS_ESCOLA['segmentos']:
+        chaves.append(segmento)
+        if serie:
+            chaves.append(f"{segmento}/{serie}")
+            turma = str(filho.get('turma') or '').strip().upper()
+            if turma:
+                chaves.append(f"{segmento}/{serie}/{turma}")
+    return chaves + (_com_integral(chaves, True) if filho.get('integral') else [])
+
+
+def chaves_alunos(filhos: Iterable[Dict[str, Any]]) -> List[str]:
+    """União (ordenada, para chave de cache estável) das chaves de vários alunos."""
+    return sorted({c for filho in filhos for c in chaves_aluno(filho)})
@@ -5,14 +5,106 @@ Responsável por upload, download e gerenciamento de arquivos.
 """
 
 from datetime import timedelta
-from typing import Optional, Tuple, Any
+from typing import Dict, Iterable, Optional, Tuple, Any
 from google.cloud import storage
+from google.auth import credentials as google_credentials
+from google.auth.transport.requests import Request as GoogleAuthRequest
 from flask import current_app
+import threading
+import time
 import uuid
 import io
 
+from src.core import clientes
+from src.core.cache import CacheLRU
+
+_credenciais_lock = threading.Lock()
+_cache_urls: Optional[CacheLRU] = None
+
 def _get_client() -> storage.Client:
-    return storage.Client(project=current_app.config['GOOGLE_CLOUD_PROJECT'])
+    """Cliente reaproveitado pelo processo (registro central de clientes)."""
+    return clientes.storage_client()
+
+def _get_bucket(bucket_name: str) -> storage.Bucket:
+    return clientes.bucket(bucket_name)
+
+def _get_cache_urls() -> CacheLRU:
+    global _cache_urls
+    if _cache_urls is None:
+        _cache_urls = CacheLRU(
+            'signed_urls', max_itens=int(current_app.config.get('SIGNED_URL_CACHE_MAX', 4096))
+        )
+    return _cache_urls
+
+def _parametros_assinatura(client: storage.Client) -> Dict[str, Any]:
+    """
+    Com chave privada (service account JSON) a assinatura V4 é local, sem rede.
+    Sem chave (Cloud Run/GCE), usa IAM signBlob com o token em cache, renovado só quando expira.
+    """
+    creds = client._credentials
+    if isinstance(creds, google_credentials.Signing):
+        return {'credentials': creds}
+    with _credenciais_lock:
+        if not creds.valid:
+            creds.refresh(GoogleAuthRequest())
+        return {
+            'service_account_email': creds.service_account_email,
+            'access_token': creds.token
+        }
+
+def generate_signed_urls(blob_names: Iterable[str], expiration: int = 3600) -> Dict[str, Optional[str]]:
+    """
+    Assina vários blobs de uma vez (um único setup de cliente/credenciais).
+    URLs em cache são reaproveitadas enquanto restar validade suficiente;
+    abaixo de SIGNED_URL_RENOVAR_ANTES segundos, são re-assinadas antes de expirar.
+
+    Returns:
+        dict: {blob_name: url ou None se falhar}
+    """
+    bucket_name = current_app.config.get('GCS_BUCKET_NAME')
+    nomes = [n for n in dict.fromkeys(blob_names) if n]
+    if not bucket_name or not nomes:
+        return {n: None for n in nomes}
+
+    renovar_antes = min(
+        float(current_app.config.get('SIGNED_URL_RENOVAR_ANTES', 900)), expiration / 2
+    )
+    cache = _get_cache_urls()
+    resultado: Dict[str, Optional[str]] = {}
+    faltantes = []
+    for nome in nomes:
+        em_cache = cache.obter(f"{bucket_name}/{nome}/{expiration}")
+        if em_cache and em_cache[1] - time.time() > renovar_antes:
+            resultado[nome] = em_cache[0]
+        else:
+            faltantes.append(nome)
+
+    if not faltantes:
+        return resultado
+
+    try:
+        bucket = _get_bucket(bucket_name)
+        parametros = _parametros_assinatura(_get_client())
+    except Exception as e:
+        print(f"Erro ao preparar assinatura de URLs: {e}")
+        return {**resultado, **{n: None for n in faltantes}}
+
+    for nome in faltantes:
+        try:
+            expira_em = time.time() + expiration
+            url = bucket.blob(nome).generate_signed_url(
+                version="v4",
+                expiration=timedelta(seconds=expiration),
+                method="GET",
+                **parametros
+            )
+            cache.definir(f"{bucket_name}/{nome}/{expiration}", (url, expira_em), ttl=expiration - renovar_antes)
+            resultado[nome] = url
+        except Exception as e:
+            print(f"Erro ao gerar Signed URL: {e}")
+            resultado[nome] = None
+
+    return resultado
 
 def generate_signed_url(blob_name: str, expiration: int = 3600) -> Optional[str]:
     """
@@ -21,27 +113,18 @@ def generate_signed_url(blob_name: str, expiration: int = 3600) -> Optional[str]
         blob_name: ID interno do arquivo no GCS.
         expiration: Tempo em segundos (padrão 1 hora).
     """
-    try:
-        bucket_name = current_app.config.get('GCS_BUCKET_NAME')
-        if not bucket_name: return None
+    if not blob_name: return None
+    return generate_signed_urls([blob_name], expiration).get(blob_name)
 
-        client = _get_client()
-        bucket = client.bucket(bucket_name)
-        blob = bucket.blob(blob_name)
-        
-        return blob.generate_signed_url(
-            version="v4",
-            expiration=timedelta(seconds=expiration),
-            method="GET"
-        )
-    except Exception as e:
-        print(f"Erro ao gerar Signed URL: {e}")
-        return None
+def gerar_nome_blob(nome_original: str) -> str:
+    """Nome único do blob; pode ser gerado antes do upload (ingestão via spool)."""
+    return f"{uuid.uuid4().hex}_{nome_original.replace(' ', '_')}"
 
-def upload_file(arquivo_storage: Any, nome_original: str) -> Tuple[str, str]:
+def upload_file(arquivo_storage: Any, nome_original: str, nome_blob: Optional[str] = None) -> Tuple[str, str]:
     """
     Faz o upload e retorna o NOME DO BLOB (ID interno).
     NÃO torna o arquivo público.
+    Se 'nome_blob' for informado (pré-gerado), o upload é idempotente: reenviar sobrescreve.
     
     Returns:
         tuple: (nome_blob, nome_blob) -> Mantendo tupla por compatibilidade, mas ambos são ID.
@@ -52,11 +135,10 @@ def upload_file(arquivo_storage: Any, nome_original: str) -> Tuple[str, str]:
     if not bucket_name:
         raise ValueError("GCS_BUCKET_NAME não configurado")
 
-    client = _get_client()
-    bucket = client.bucket(bucket_name)
+    bucket = _get_bucket(bucket_name)
 
     # Gera nome único
-    nome_blob = f"{uuid.uuid4().hex}_{nome_original.replace(' ', '_')}"
+    nome_blob = nome_blob or gerar_nome_blob(nome_original)
     
     blob = bucket.blob(nome_blob)
     arquivo_storage.seek(0)
@@ -72,8 +154,7 @@ def download_bytes_by_name(nome_blob: str) -> io.BytesIO:
     """
     try:
         bucket_name = current_app.config.get('GCS_BUCKET_NAME')
-        client = _get_client()
-        bucket = client.bucket(bucket_name)
+        bucket = _get_bucket(bucket_name)
         blob = bucket.blob(nome_blob)
         
         arquivo_bytes = io.BytesIO()
@@ -96,8 +177,7 @@ def delete_file(blob_name: str) -> None:
         else:
             nome_blob = blob_name
 
-        client = _get_client()
-        bucket = client.bucket(bucket_name)
+        bucket = _get_bucket(bucket_name)
         blob = bucket.blob(nome_blob)
         blob.delete()
     except Exception as e:
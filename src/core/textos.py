@@ -0,0 +1,190 @@
+"""
+Módulo de Armazenamento de Texto dos Fragmentos.
+
+O texto de cada fragmento ficava em metadata['text'] no Pinecone, e toda
+consulta com include_metadata=True trazia de volta ~120KB de texto, inclusive
+dos matches descartados pelo score. Agora o vetor leva só metadados pequenos
+(filtráveis) e o texto fica aqui, indexado pelo id do vetor ('doc_id#chunk_n').
+
+Backends plugáveis (TEXTOS_BACKEND):
+- 'firestore': coleção 'textos_fragmentos' (padrão; compartilhado entre instâncias).
+- 'sqlite': arquivo local (dev/testes ou instância única).
+
+Na frente de qualquer backend há um LRU em processo; a leitura dos ids que
+faltam no LRU é feita em UMA chamada ao backend.
+"""
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from flask import current_app
+
+from src.core.cache import CacheLRU
+from src.core.database import db
+from src.core.logger import get_logger
+from src.core.metricas import metricas
+
+logger = get_logger(__name__)
+
+COLLECTION_TEXTOS = 'textos_fragmentos'
+
+# Limite de operações por batch de escrita do Firestore
+_LOTE_FIRESTORE = 500
+# Limite de variáveis por consulta do SQLite (SQLITE_MAX_VARIABLE_NUMBER antigo)
+_LOTE_SQLITE = 900
+
+
+# === BACKENDS ===
+
+class BackendFirestore:
+    """Um documento por fragmento; leitura em lote com get_all (uma RPC)."""
+
+    def __init__(self, cliente):
+        self.db = cliente
+
+    def salvar(self, doc_id: str, textos: Dict[str, str]) -> None:
+        colecao = self.db.collection(COLLECTION_TEXTOS)
+        itens = list(textos.items())
+        for i in range(0, len(itens), _LOTE_FIRESTORE):
+            batch = self.db.batch()
+            for vetor_id, texto in itens[i:i + _LOTE_FIRESTORE]:
+                batch.set(colecao.document(vetor_id), {'doc_id': doc_id, 'texto': texto})
+            batch.commit()
+
+    def obter_varios(self, ids: List[str]) -> Dict[str, str]:
+        colecao = self.db.collection(COLLECTION_TEXTOS)
+        textos = {}
+        for snapshot in self.db.get_all([colecao.document(i) for i in ids]):
+            if snapshot.exists:
+                textos[snapshot.id] = snapshot.to_dict().get('texto', '')
+        return textos
+
+    def remover(self, ids: List[str]) -> None:
+        colecao = self.db.collection(COLLECTION_TEXTOS)
+        for i in range(0, len(ids), _LOTE_FIRESTORE):
+            batch = self.db.batch()
+            for vetor_id in ids[i:i + _LOTE_FIRESTORE]:
+                batch.delete(colecao.document(vetor_id))
+            batch.commit()
+
+
+class BackendSQLite:
+    """Arquivo SQLite local. Uma conexão por operação (como a fila e o cache em disco)."""
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        with self._conectar() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS textos "
+                "(id TEXT PRIMARY KEY, doc_id TEXT NOT NULL, texto TEXT NOT NULL)"
+            )
+
+    @contextmanager
+    def _conectar(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.caminho, timeout=10, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def salvar(self, doc_id: str, textos: Dict[str, str]) -> None:
+        with self._lock, self._conectar() as conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT OR REPLACE INTO textos (id, doc_id, texto) VALUES (?, ?, ?)",
+                [(vetor_id, doc_id, texto) for vetor_id, texto in textos.items()]
+            )
+            conn.execute("COMMIT")
+
+    def obter_varios(self, ids: List[str]) -> Dict[str, str]:
+        textos = {}
+        with self._conectar() as conn:
+            for i in range(0, len(ids), _LOTE_SQLITE):
+                parte = ids[i:i + _LOTE_SQLITE]
+                linhas = conn.execute(
+                    f"SELECT id, texto FROM textos WHERE id IN ({', '.join('?' for _ in parte)})", parte
+                ).fetchall()
+                textos.update(linhas)
+        return textos
+
+    def remover(self, ids: List[str]) -> None:
+        with self._lock, self._conectar() as conn:
+            for i in range(0, len(ids), _LOTE_SQLITE):
+                parte = ids[i:i + _LOTE_SQLITE]
+                conn.execute(f"DELETE FROM textos WHERE id IN ({', '.join('?' for _ in parte)})", parte)
+
+
+def criar_backend(config):
+    """Instancia o backend definido em TEXTOS_BACKEND (Firestore indisponível cai no SQLite)."""
+    tipo = (config.get('TEXTOS_BACKEND') or 'firestore').lower()
+    if tipo == 'firestore' and db is not None:
+        return BackendFirestore(db)
+    if tipo not in ('firestore', 'sqlite'):
+        logger.warning(f"[TEXTOS] Backend '{tipo}' desconhecido. Usando SQLite.")
+    elif tipo == 'firestore':
+        logger.warning("[TEXTOS] Firestore indisponível. Usando SQLite.")
+    return BackendSQLite(config.get('TEXTOS_SQLITE_PATH', 'laurabot_textos.db'))
+
+
+# === ARMAZÉM ===
+
+class ArmazemTextos:
+    """Texto por id de vetor, com LRU em processo na frente do backend."""
+
+    def __init__(self, backend, max_itens: int = 4096):
+        self.backend = backend
+        # Sem TTL: o id muda de conteúdo só na reindexação, que passa por salvar/remover
+        self.cache = CacheLRU('textos', max_itens=max_itens)
+
+    def salvar(self, doc_id: str, textos: Dict[str, str]) -> None:
+        """Grava antes do upsert dos vetores: nenhum vetor aponta para texto inexistente."""
+        if not textos:
+            return
+        self.backend.salvar(doc_id, textos)
+        for vetor_id, texto in textos.items():
+            self.cache.definir(vetor_id, texto)
+
+    def obter_varios(self, ids: Iterable[str]) -> Dict[str, str]:
+        """Textos dos ids encontrados; os que faltam no LRU vêm em uma única leitura."""
+        textos: Dict[str, str] = {}
+        faltando: List[str] = []
+        for vetor_id in dict.fromkeys(ids):
+            texto = self.cache.obter(vetor_id)
+            if texto is None:
+                faltando.append(vetor_id)
+            else:
+                textos[vetor_id] = texto
+        if faltando:
+            lidos = self.backend.obter_varios(faltando)
+            metricas.incrementar('textos.leituras_backend')
+            metricas.incrementar('textos.ausentes', len(faltando) - len(lidos))
+            for vetor_id, texto in lidos.items():
+                self.cache.definir(vetor_id, texto)
+            textos.update(lidos)
+        return textos
+
+    def remover(self, ids: Iterable[str]) -> None:
+        ids = list(ids)
+        if not ids:
+            return
+        for vetor_id in ids:
+            self.cache.remover(vetor_id)
+        self.backend.remover(ids)
+
+
+_armazem: Optional[ArmazemTextos] = None
+_armazem_lock = threading.Lock()
+
+def get_armazem_textos() -> ArmazemTextos:
+    global _armazem
+    if _armazem is None:
+        with _armazem_lock:
+            if _armazem is None:
+                _armazem = ArmazemTextos(
+                    criar_backend(current_app.config),
+                    max_itens=int(current_app.config.get('TEXTOS_CACHE_MAX', 4096))
+                )
+    return _armazem
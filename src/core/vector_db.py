@@ -2,123 +2,252 @@
 Módulo de Banco de Dados Vetorial.
 Refatorado para usar configuração centralizada de IA.
 """
+from typing import Dict, List, Optional, Union
 from flask import current_app
-from pinecone import Pinecone
+from src.core import clientes, corpus, textos
+from src.core.cache import CacheLRU, chave_hash, normalizar_texto
+from src.core.fragmentacao import fragmentar_paginas, montar_id_fragmento
 from src.core.logger import get_logger
-from src.core.ai import configurar_genai, get_embedding_model, get_generative_model
-import google.generativeai as genai
+from src.core.ai import gerar_embedding, gerar_embeddings, get_generative_model
 
 logger = get_logger(__name__)
 
-_pinecone_client = None
+def _get_index():
+    """Handle do índice reaproveitado pelo processo (registro central de clientes)."""
+    return clientes.indice_pinecone()
 
-def _get_pinecone_client():
-    global _pinecone_client
-    if _pinecone_client is None:
-        api_key = current_app.config.get('PINECONE_API_KEY')
-        if not api_key:
-            raise ValueError("PINECONE_API_KEY não configurada.")
-        _pinecone_client = Pinecone(api_key=api_key)
-    return _pinecone_client
+def _listar_ids_por_prefixo(index, doc_id: str) -> List[str]:
+    """
+    Lista os ids de fragmentos de um documento ('doc_id#chunk_n').
+    index.list() só existe em índices serverless; em caso de falha retorna [].
+    """
+    try:
+        ids: List[str] = []
+        for pagina_ids in index.list(prefix=f"{doc_id}#"):
+            ids.extend(pagina_ids)
+        return ids
+    except Exception as e:
+        logger.warning(f"Listagem por prefixo indisponível para {doc_id}: {e}")
+        return []
+
+def _ids_do_documento(index, doc_id: str, total_fragmentos: Optional[int] = None) -> List[str]:
+    """Resolve os ids de vetor de um documento pelo manifesto (total) ou por prefixo."""
+    if total_fragmentos:
+        return [montar_id_fragmento(doc_id, i) for i in range(int(total_fragmentos))]
+    return _listar_ids_por_prefixo(index, doc_id)
 
-def salvar_no_vetor(doc_id: str, texto_completo: str, metadados: dict):
+def montar_cabecalho(metadados: dict) -> str:
+    """Bloco de metadados que dá contexto a cada fragmento (embedding e prompt)."""
+    series = metadados.get('series') or []
+    turmas = metadados.get('turmas') or []
+    return (
+        f"Metadados Importantes:\n"
+        f"Assunto: {metadados.get('assunto', '')}\n"
+        f"Segmento: {metadados.get('segmento', '')}\n"
+        f"Séries: {', '.join(series) if series else 'Todas'}\n"
+        f"Turmas: {', '.join(turmas) if turmas else 'Todas'}\n"
+        f"----------------"
+    )
+
+def salvar_no_vetor(doc_id: str, paginas: Union[str, List[str]], metadados: dict) -> int:
+    """
+    Fragmenta o documento e salva N vetores 'doc_id#chunk_n' em lotes.
+    O cabeçalho de metadados é prefixado em cada fragmento apenas no embedding.
+    O texto de cada fragmento vai para o armazém de textos (não para o metadata).
+
+    Returns:
+        int: Total de fragmentos salvos (manifesto usado em exclusão/edição).
+    """
     try:
-        configurar_genai()
-        # Gera Embedding
-        resultado = genai.embed_content(
-            model=get_embedding_model(),
-            content=texto_completo.replace("\n", " "),
+        fragmentos = fragmentar_paginas(
+            paginas,
+            tamanho_max=int(current_app.config.get('CHUNK_TAMANHO', 1500)),
+            sobreposicao=int(current_app.config.get('CHUNK_SOBREPOSICAO', 200))
+        )
+        if not fragmentos:
+            raise ValueError(f"Documento {doc_id} sem texto para indexar.")
+
+        index = _get_index()
+        lote = int(current_app.config.get('PINECONE_LOTE_UPSERT', 100))
+        total = len(fragmentos)
+        cabecalho = montar_cabecalho(metadados)
+
+        # Embeddings em lote (uma requisição para vários fragmentos)
+        vetores = gerar_embeddings(
+            [f"{cabecalho}\n{frag['texto']}".replace("\n", " ").strip() for frag in fragmentos],
             task_type="retrieval_document"
         )
-        vetor = resultado['embedding']
 
-        pc = _get_pinecone_client()
-        index = pc.Index(current_app.config.get('PINECONE_INDEX_NAME'))
+        registros = []
+        for frag, vetor in zip(fragmentos, vetores):
+            registros.append({
+                'id': montar_id_fragmento(doc_id, frag['indice']),
+                'values': vetor,
+                'metadata': {
+                    **metadados,
+                    'doc_id': doc_id,
+                    'chunk': frag['indice'],
+                    'chunk_total': total,
+                    'pagina_inicio': frag['pagina_inicio'],
+                    'pagina_fim': frag['pagina_fim'],
+                }
+            })
 
-        texto_safe = texto_completo[:30000]
+        # Texto antes dos vetores: um match nunca aponta para texto inexistente
+        armazem = textos.get_armazem_textos()
+        armazem.salvar(doc_id, {r['id']: frag['texto'] for r, frag in zip(registros, fragmentos)})
 
-        registro = {
-            'id': doc_id,
-            'values': vetor,
-            'metadata': {
-                **metadados,
-                'text': texto_safe
-            }
-        }
-        index.upsert(vectors=[registro])
-        logger.info(f"Documento vetorizado e salvo: {doc_id}")
+        for i in range(0, total, lote):
+            index.upsert(vectors=registros[i:i + lote])
+
+        # Remove fragmentos excedentes de uma versão anterior e o vetor único legado
+        novos_ids = {r['id'] for r in registros}
+        obsoletos = [i for i in _listar_ids_por_prefixo(index, doc_id) if i not in novos_ids]
+        index.delete(ids=obsoletos + [doc_id])
+        armazem.remover(obsoletos)
+
+        _invalidar_corpus(f"ingestao {doc_id}")
+        logger.info(f"Documento vetorizado e salvo: {doc_id} ({total} fragmentos)")
+        return total
 
     except Exception as e:
         logger.error(f"Erro ao salvar no vetor: {e}", exc_info=True)
         raise e
 
-def excluir_do_vetor(doc_id: str):
+def excluir_do_vetor(doc_id: str, total_fragmentos: Optional[int] = None):
     try:
-        pc = _get_pinecone_client()
-        index = pc.Index(current_app.config.get('PINECONE_INDEX_NAME'))
-        index.delete(ids=[doc_id])
-        logger.info(f"Vetor removido: {doc_id}")
+        index = _get_index()
+        # Inclui o id legado (documentos indexados antes do chunking)
+        ids = _ids_do_documento(index, doc_id, total_fragmentos) + [doc_id]
+        for i in range(0, len(ids), 1000):
+            index.delete(ids=ids[i:i + 1000])
+        textos.get_armazem_textos().remover(ids[:-1])
+        _invalidar_corpus(f"exclusao {doc_id}")
+        logger.info(f"Vetor removido: {doc_id} ({len(ids) - 1} fragmentos)")
     except Exception as e:
         logger.error(f"Erro ao excluir vetor {doc_id}: {e}", exc_info=True)
 
-def atualizar_metadados_vetor(doc_id: str, novos_metadados: dict):
+def atualizar_metadados_vetor(doc_id: str, novos_metadados: dict, total_fragmentos: Optional[int] = None):
     try:
-        pc = _get_pinecone_client()
-        index = pc.Index(current_app.config.get('PINECONE_INDEX_NAME'))
-        index.update(id=doc_id, set_metadata=novos_metadados)
-        logger.info(f"Metadados atualizados: {doc_id}")
+        index = _get_index()
+        ids = _ids_do_documento(index, doc_id, total_fragmentos) or [doc_id]
+        for vetor_id in ids:
+            index.update(id=vetor_id, set_metadata=novos_metadados)
+        _invalidar_corpus(f"edicao {doc_id}")
+        logger.info(f"Metadados atualizados: {doc_id} ({len(ids)} vetores)")
     except Exception as e:
         logger.error(f"Erro ao atualizar metadados {doc_id}: {e}", exc_info=True)
         raise e
 
-def buscar_documentos(query: str, filtro_segmentos: list = None, top_k=4) -> list:
-    if not query: return []
-    try:
-        configurar_genai()
-        emb_res = genai.embed_content(
-            model=get_embedding_model(),
-            content=query,
-            task_type="retrieval_query"
-        )
-        vetor_query = emb_res['embedding']
+def _invalidar_corpus(motivo: str) -> None:
+    """Muda a versão do corpus (e de novo após o atraso de consistência do Pinecone)."""
+    corpus.incrementar_versao(
+        motivo, reforco_em=float(current_app.config.get('PINECONE_ATRASO_CONSISTENCIA', 10))
+    )
 
-        pc = _get_pinecone_client()
-        index = pc.Index(current_app.config.get('PINECONE_INDEX_NAME'))
+_cache_buscas: Optional[CacheLRU] = None
+
+def _get_cache_buscas() -> CacheLRU:
+    global _cache_buscas
+    if _cache_buscas is None:
+        _cache_buscas = CacheLRU(
+            'buscas',
+            max_itens=int(current_app.config.get('RETRIEVAL_CACHE_MAX', 1024)),
+            ttl=float(current_app.config.get('RETRIEVAL_CACHE_TTL', 600))
+        )
+    return _cache_buscas
 
-        filtro_pinecone = {}
-        if filtro_segmentos:
-            lista_busca = list(set(filtro_segmentos + ['TODOS']))
-            filtro_pinecone = {'segmento': {'$in': lista_busca}}
+def buscar_documentos(query: str, filtro_segmentos: list = None, top_k=4,
+                      publico: Optional[List[str]] = None) -> list:
+    """
+    Busca semântica com cache por (versão do corpus, consulta normalizada, filtro, top_k).
+    Qualquer ingestão/edição/exclusão muda a versão e invalida o cache.
 
-        resultados = index.query(
-            vector=vetor_query,
-            top_k=top_k,
-            include_metadata=True,
-            filter=filtro_pinecone
+    'publico' (chaves de src.core.publico) filtra pelo público-alvo pré-computado
+    e substitui o filtro por segmento.
+    """
+    if not query: return []
+    try:
+        cache = _get_cache_buscas()
+        chave = chave_hash(
+            corpus.versao_atual(), normalizar_texto(query), sorted(set(filtro_segmentos or [])), top_k,
+            sorted(set(publico or []))
         )
-        
-        docs = []
-        logger.info(f"--- RESULTADOS DA BUSCA PARA: '{query}' ---")
-        
-        for match in resultados['matches']:
-            # Score mínimo mantido em 0.25 para não perder contexto relevante
-            if match['score'] > 0.25:
-                docs.append({
-                    'id': match['id'],
-                    'conteudo': match['metadata'].get('text', ''),
-                    'fonte': match['metadata'].get('nome_arquivo', 'Arquivo'),
-                    'link': match['metadata'].get('url_download', '#')
-                })
-        
-        return docs
+        docs = cache.obter(chave)
+        if docs is None:
+            docs = _buscar_no_indice(query, filtro_segmentos, top_k, publico)
+            cache.definir(chave, docs)
+        # Cópias rasas: quem chama não altera as entradas do cache
+        return [dict(d) for d in docs]
 
     except Exception as e:
         logger.error(f"Erro na busca: {e}", exc_info=True)
         return []
 
+def _buscar_no_indice(query: str, filtro_segmentos: list, top_k: int,
+                      publico: Optional[List[str]] = None) -> list:
+    """Consulta o Pinecone (sem cache) e agrupa os fragmentos por documento."""
+    vetor_query = gerar_embedding(query, task_type="retrieval_query")
+
+    index = _get_index()
+
+    filtro_pinecone = {}
+    if publico:
+        # 'publico' é lista no metadata: $in casa se qualquer chave do vetor estiver na lista
+        filtro_pinecone = {'publico': {'$in': sorted(set(publico))}}
+    elif filtro_segmentos:
+        lista_busca = list(set(filtro_segmentos + ['TODOS']))
+        filtro_pinecone = {'segmento': {'$in': lista_busca}}
+
+    resultados = index.query(
+        vector=vetor_query,
+        top_k=top_k,
+        include_metadata=True,
+        filter=filtro_pinecone
+    )
+    
+    logger.info(f"--- RESULTADOS DA BUSCA PARA: '{query}' ---")
+    
+    # Score mínimo mantido em 0.25 para não perder contexto relevante
+    matches = [m for m in resultados['matches'] if m['score'] > 0.25]
+
+    # Só os fragmentos que passaram do corte buscam texto (uma leitura em lote).
+    # Vetores legados ainda trazem o texto no próprio metadata.
+    textos_por_id = textos.get_armazem_textos().obter_varios(
+        m['id'] for m in matches if 'text' not in (m['metadata'] or {})
+    )
+
+    # Agrupa os fragmentos pelo documento de origem (mantém a ordem de score)
+    docs_por_id: Dict[str, dict] = {}
+    for match in matches:
+        meta = match['metadata'] or {}
+        doc_id = meta.get('doc_id', match['id'])
+        doc = docs_por_id.get(doc_id)
+        if doc is None:
+            doc = docs_por_id[doc_id] = {
+                'id': doc_id,
+                'score': match['score'],
+                'fonte': meta.get('nome_arquivo', 'Arquivo'),
+                'link': meta.get('url_download', '#'),
+                'cabecalho': montar_cabecalho(meta) if 'doc_id' in meta else '',
+                'trechos': []
+            }
+        texto = meta['text'] if 'text' in meta else textos_por_id.get(match['id'], '')
+        doc['trechos'].append((meta.get('chunk', 0), texto))
+
+    docs = []
+    for doc in docs_por_id.values():
+        trechos = [texto for _, texto in sorted(doc.pop('trechos'))]
+        cabecalho = doc.pop('cabecalho')
+        conteudo = "\n[...]\n".join(trechos)
+        doc['conteudo'] = f"{cabecalho}\n{conteudo}" if cabecalho else conteudo
+        docs.append(doc)
+    
+    return docs
+
 from typing import Generator, List, Dict, Any, Set
 import re
-from src.core.storage import generate_signed_url
+from src.core.storage import generate_signed_urls
 
 def _stream_com_verificacao_links(generator_response, urls_permitidas: Set[str]) -> Generator[str, None, None]:
     """
@@ -191,9 +320,19 @@ def _stream_com_verificacao_links(generator_response, urls_permitidas: Set[str])
     if buffer:
         yield buffer
 
-def gerar_resposta_ia_stream(pergunta: str, contextos: list, historico: list = [], perfil_usuario: dict = {}) -> Generator[str, None, None]:
+def assinar_links(contextos: list) -> Dict[str, Optional[str]]:
+    """doc['link'] traz o blob_name (ID interno) do Pinecone; assina todos de uma vez."""
+    return generate_signed_urls(
+        doc.get('link') for doc in contextos if doc.get('link') and doc.get('link') != "#"
+    )
+
+def gerar_resposta_ia_stream(pergunta: str, contextos: list, historico: list = [], perfil_usuario: dict = {},
+                             urls_assinadas: Optional[Dict[str, Optional[str]]] = None) -> Generator[str, None, None]:
     """
     Gera resposta em STREAM (Yield) com Prompt Refinado e Guardrails de Links.
+
+    'urls_assinadas' (blob -> URL) permite assinar os links antes, em paralelo
+    com o resto da preparação do turno; sem ele, a assinatura acontece aqui.
     """
     model = get_generative_model()
     
@@ -215,17 +354,15 @@ def gerar_resposta_ia_stream(pergunta: str, contextos: list, historico: list = [
     urls_validas = set()
 
     if contextos:
+        if urls_assinadas is None:
+            urls_assinadas = assinar_links(contextos)
         for doc in contextos:
-            # doc['link'] traz o blob_name (ID interno) do Pinecone
-            blob_name = doc.get('link')
+            # Signed URL válida para este contexto (ou "#" se não houver)
+            signed_url = urls_assinadas.get(doc.get('link'))
             link_display = "#"
-            
-            if blob_name and blob_name != "#":
-                # Gera Signed URL válida para este contexto
-                signed_url = generate_signed_url(blob_name)
-                if signed_url:
-                    link_display = signed_url
-                    urls_validas.add(signed_url)
+            if signed_url:
+                link_display = signed_url
+                urls_validas.add(signed_url)
             
             texto_docs += f"\n--- FONTE: {doc['fonte']} ({link_display}) ---\n{doc['conteudo']}\n"
     else:
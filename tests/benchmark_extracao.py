@@ -0,0 +1,108 @@
+"""
+Benchmark: páginas/segundo da extração de PDFs por motor (layout x auto)
+e serial x pool de processos.
+
+Uso:
+    python -m tests.benchmark_extracao                 # PDFs sintéticos de 2, 10, 40 e 120 páginas
+    python -m tests.benchmark_extracao a.pdf b.pdf     # PDFs reais
+    PARSER_WORKERS=4 python -m tests.benchmark_extracao
+"""
+
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+from flask import Flask
+
+from src.core import extracao
+
+
+def gerar_pdf_sintetico(paginas: int, linhas_por_pagina: int = 45, tabela: bool = False,
+                        por_palavra: bool = False) -> bytes:
+    """
+    PDF mínimo com texto (Helvetica) em cada página; 'tabela' gera colunas alinhadas.
+    'por_palavra' posiciona cada palavra com seu próprio operador (como muitos geradores fazem).
+    """
+    objetos: List[bytes] = []
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(paginas))
+    objetos.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objetos.append(f"<< /Type /Pages /Kids [{kids}] /Count {paginas} >>".encode())
+    objetos.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    for p in range(paginas):
+        comandos = ["BT", "/F1 10 Tf"]
+        for linha in range(linhas_por_pagina):
+            y = 800 - linha * 16
+            if tabela:
+                for coluna, x in enumerate((40, 200, 360)):
+                    comandos.append(f"1 0 0 1 {x} {y} Tm (Celula {p}-{linha}-{coluna}) Tj")
+            elif por_palavra:
+                x = 40.0
+                for palavra in f"Pagina {p + 1} linha {linha}: comunicado aos responsaveis sobre o evento".split():
+                    comandos.append(f"1 0 0 1 {x:.1f} {y} Tm ({palavra}) Tj")
+                    x += len(palavra) * 5.5 + 3
+            else:
+                comandos.append(f"1 0 0 1 40 {y} Tm (Pagina {p + 1} linha {linha}: comunicado aos responsaveis sobre o evento) Tj")
+        comandos.append("ET")
+        conteudo = "\n".join(comandos).encode()
+        objetos.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * p} 0 R >>".encode()
+        )
+        objetos.append(b"<< /Length %d >>\nstream\n" % len(conteudo) + conteudo + b"\nendstream")
+
+    saida = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, corpo in enumerate(objetos, start=1):
+        offsets.append(len(saida))
+        saida += f"{i} 0 obj\n".encode() + corpo + b"\nendobj\n"
+    inicio_xref = len(saida)
+    saida += f"xref\n0 {len(objetos) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        saida += f"{offset:010d} 00000 n \n".encode()
+    saida += f"trailer\n<< /Size {len(objetos) + 1} /Root 1 0 R >>\nstartxref\n{inicio_xref}\n%%EOF\n".encode()
+    return bytes(saida)
+
+
+def _medir(app: Flask, caminho: str, workers: int, motor: str) -> float:
+    app.config.update({'PARSER_WORKERS': workers, 'PARSER_MOTOR': motor})
+    with app.app_context():
+        inicio = time.perf_counter()
+        paginas = extracao.extrair_paginas(caminho)
+        return len(paginas) / (time.perf_counter() - inicio)
+
+
+def main(argv: List[str]) -> None:
+    workers = int(os.environ.get('PARSER_WORKERS', max(2, os.cpu_count() or 2)))
+    app = Flask(__name__)
+    app.config['PARSER_MIN_PAGINAS_PARALELO'] = 1
+
+    arquivos = list(argv)
+    temporarios = []
+    if not arquivos:
+        for n, tabela in ((2, False), (10, False), (40, False), (120, False), (10, True), (40, True)):
+            sufixo = f"_{n}p{'_tabela' if tabela else ''}.pdf"
+            with tempfile.NamedTemporaryFile(suffix=sufixo, delete=False) as tmp:
+                tmp.write(gerar_pdf_sintetico(n, tabela=tabela))
+            arquivos.append(tmp.name)
+            temporarios.append(tmp.name)
+
+    try:
+        # Aquece o pool (o spawn dos processos não entra na medição)
+        _medir(app, arquivos[0], workers, 'auto')
+        print(f"{'arquivo':<40} {'layout p/s':>11} {'auto p/s':>9} {f'auto+pool({workers}) p/s':>20}")
+        for caminho in arquivos:
+            layout = _medir(app, caminho, 1, 'layout')
+            auto = _medir(app, caminho, 1, 'auto')
+            paralelo = _medir(app, caminho, workers, 'auto')
+            print(f"{os.path.basename(caminho):<40} {layout:>11.1f} {auto:>9.1f} {paralelo:>20.1f}")
+    finally:
+        extracao.encerrar_pool()
+        for caminho in temporarios:
+            os.remove(caminho)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
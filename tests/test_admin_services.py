@@ -0,0 +1,135 @@
+import io
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from flask import Flask
+
+from src.admin import services
+
+
+class TestIngestaoViaSpool(unittest.TestCase):
+
+    def setUp(self):
+        self.pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.pasta, True)
+
+        app = Flask(__name__)
+        app.config.update({
+            'INGESTAO_SPOOL_DIR': self.pasta,
+            'INGESTAO_WORKERS': 2,
+            'INGESTAO_ETAPA_TENTATIVAS': 1,
+            'INGESTAO_ETAPA_BACKOFF': 0,
+        })
+        ctx = app.app_context()
+        ctx.push()
+        self.addCleanup(ctx.pop)
+
+        self.db = MagicMock()
+        self.storage = MagicMock()
+        self.vector_db = MagicMock()
+        self.vector_db.salvar_no_vetor.return_value = 3
+        self.parser = MagicMock()
+        self.parser.extrair_paginas_detalhadas.return_value = [
+            {'pagina': 1, 'texto': 'texto', 'motor': 'rapido', 'duracao_s': 0.1}
+        ]
+        self.parser.juntar_paginas.return_value = 'texto'
+        self.parser.analisar_metadados_ia.return_value = {'segmento': 'EM', 'series': ['1'], 'assunto': 'Passeio'}
+        for alvo, valor in [('db', self.db), ('storage', self.storage),
+                            ('vector_db', self.vector_db), ('parser', self.parser)]:
+            p = patch(f'src.admin.services.{alvo}', valor)
+            p.start()
+            self.addCleanup(p.stop)
+
+    def _payload(self, spool):
+        dados_manuais = {'segmento': None, 'series': [], 'periodos': [], 'turmas': [], 'integral': False}
+        return services.montar_payload('doc', 'abc_doc.pdf', 'doc.pdf', dados_manuais, spool)
+
+    def test_gravar_spool_copia_conteudo(self):
+        caminho = services.gravar_spool(io.BytesIO(b'%PDF-conteudo'), 'abc_doc.pdf')
+        self.assertEqual(caminho, os.path.join(self.pasta, 'abc_doc.pdf'))
+        with open(caminho, 'rb') as f:
+            self.assertEqual(f.read(), b'%PDF-conteudo')
+        self.assertEqual(os.listdir(self.pasta), ['abc_doc.pdf'])  # sem temporários
+
+    def test_extrai_do_spool_sem_download_e_envia_em_paralelo(self):
+        spool = services.gravar_spool(io.BytesIO(b'%PDF'), 'abc_doc.pdf')
+        extraindo = threading.Event()
+        enviando = threading.Event()
+
+        def upload(arquivo, nome, nome_blob=None):
+            enviando.set()
+            # O envio espera a extração começar: prova que rodam ao mesmo tempo
+            self.assertTrue(extraindo.wait(2))
+            self.assertEqual(arquivo.read(), b'%PDF')
+            return nome_blob, nome_blob
+
+        def extrair(origem):
+            extraindo.set()
+            self.assertTrue(enviando.wait(2))
+            return [{'pagina': 1, 'texto': 'texto', 'motor': 'rapido'},
+                    {'pagina': 2, 'texto': 'tabela', 'motor': 'layout'}]
+
+        self.storage.upload_file.side_effect = upload
+        self.parser.extrair_paginas_detalhadas.side_effect = extrair
+
+        services.processar_comunicado(self._payload(spool))
+
+        self.storage.download_bytes_by_name.assert_not_called()
+        self.parser.extrair_paginas_detalhadas.assert_called_once_with(spool)
+        self.assertEqual(self.storage.upload_file.call_args.kwargs['nome_blob'], 'abc_doc.pdf')
+        campos = self.db.collection.return_value.document.return_value.update.call_args.args[0]
+        self.assertEqual(campos['status'], 'concluido')
+        self.assertEqual(campos['extracao']['motores'], ['rapido', 'layout'])
+        self.assertEqual(campos['extracao']['paginas_layout'], [2])
+        metadados_vetor = self.vector_db.salvar_no_vetor.call_args.args[2]
+        self.assertEqual(metadados_vetor['publico'], ['EM/1ª Série'])
+        self.assertFalse(os.path.exists(spool))
+
+    def test_falha_no_envio_nao_conclui_e_mantem_spool(self):
+        spool = services.gravar_spool(io.BytesIO(b'%PDF'), 'abc_doc.pdf')
+        self.storage.upload_file.side_effect = ConnectionError("gcs fora")
+
+        with self.assertRaises(ConnectionError):
+            services.processar_comunicado(self._payload(spool))
+
+        self.db.collection.return_value.document.return_value.update.assert_not_called()
+        self.assertTrue(os.path.exists(spool))  # o retry do job reaproveita o spool
+
+    def test_arquivo_recusado_e_erro_permanente(self):
+        from src.core.extracao import ArquivoRecusado
+        from src.core.fila import ErroPermanente
+        self.parser.extrair_paginas_detalhadas.side_effect = ArquivoRecusado("grande demais")
+        self.storage.download_bytes_by_name.return_value = io.BytesIO(b'%PDF')
+
+        with self.assertRaises(ErroPermanente):
+            services.processar_comunicado(self._payload(None))
+
+    def test_resumo_registra_paginas_puladas(self):
+        resumo = services.resumo_extracao([
+            {'pagina': 1, 'texto': 'a', 'motor': 'rapido', 'duracao_s': 0.5},
+            {'pagina': 2, 'texto': '', 'motor': None, 'duracao_s': 0.0, 'pulada': 'timeout'},
+            {'pagina': 3, 'texto': '', 'motor': None, 'duracao_s': 0.0, 'pulada': 'limite_paginas'},
+        ])
+        self.assertEqual(resumo['paginas_puladas'], [{'pagina': 2, 'motivo': 'timeout'}])
+        self.assertEqual(resumo['paginas_alem_do_limite'], 1)
+
+    def test_sem_spool_baixa_do_gcs(self):
+        self.storage.download_bytes_by_name.return_value = io.BytesIO(b'%PDF')
+
+        services.processar_comunicado(self._payload(os.path.join(self.pasta, 'inexistente.pdf')))
+
+        self.storage.download_bytes_by_name.assert_called_once_with('abc_doc.pdf')
+        self.storage.upload_file.assert_not_called()
+
+    def test_falha_definitiva_remove_spool(self):
+        spool = services.gravar_spool(io.BytesIO(b'%PDF'), 'abc_doc.pdf')
+        services.marcar_erro_comunicado(self._payload(spool), 'erro')
+        self.assertFalse(os.path.exists(spool))
+
+
+if __name__ == '__main__':
+    unittest.main()
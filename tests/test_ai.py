@@ -0,0 +1,124 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src.core import ai
+from src.core.cache import CacheLRU
+
+
+class TestEmpacotamento(unittest.TestCase):
+
+    def test_respeita_quantidade_maxima(self):
+        lotes = ai.empacotar_lotes(["a"] * 250, max_textos=100)
+        self.assertEqual([len(l) for l in lotes], [100, 100, 50])
+
+    def test_respeita_tamanho_maximo(self):
+        lotes = ai.empacotar_lotes(["x" * 40, "x" * 40, "x" * 40], max_textos=100, max_chars=100)
+        self.assertEqual(lotes, [[0, 1], [2]])
+
+    def test_texto_maior_que_limite_vai_sozinho(self):
+        lotes = ai.empacotar_lotes(["x" * 500, "y"], max_chars=100)
+        self.assertEqual(lotes, [[0], [1]])
+
+
+class TestBaldeTokens(unittest.TestCase):
+
+    def test_limita_taxa(self):
+        balde = ai.BaldeTokens(taxa=50, capacidade=1)
+        inicio = time.monotonic()
+        for _ in range(6):
+            balde.consumir()
+        # 1 token de rajada + 5 a 50/s => ~0.1s
+        self.assertGreaterEqual(time.monotonic() - inicio, 0.08)
+
+
+class TestClienteEmbeddings(unittest.TestCase):
+
+    def _fake_embed(self, atraso=0.0):
+        self.chamadas = []
+        self.ativos = 0
+        self.max_ativos = 0
+        lock = threading.Lock()
+
+        def embed(model, content, task_type):
+            with lock:
+                self.chamadas.append(list(content))
+                self.ativos += 1
+                self.max_ativos = max(self.max_ativos, self.ativos)
+            time.sleep(atraso)
+            with lock:
+                self.ativos -= 1
+            return {'embedding': [[float(t.split('-')[1])] for t in content]}
+
+        return embed
+
+    def test_resultados_na_ordem_de_entrada(self):
+        cliente = ai.ClienteEmbeddings(
+            'modelo', ai.BaldeTokens(1000, 1000), concorrencia=3, max_textos=7,
+            funcao_embed=self._fake_embed(atraso=0.01)
+        )
+        textos = [f"t-{i}" for i in range(50)]
+
+        vetores = cliente.embed(textos)
+
+        self.assertEqual(vetores, [[float(i)] for i in range(50)])
+        self.assertEqual(len(self.chamadas), 8)
+        self.assertTrue(all(len(c) <= 7 for c in self.chamadas))
+
+    def test_teto_de_concorrencia_global(self):
+        cliente = ai.ClienteEmbeddings(
+            'modelo', ai.BaldeTokens(1000, 1000), concorrencia=2, max_textos=1,
+            funcao_embed=self._fake_embed(atraso=0.02)
+        )
+        threads = [
+            threading.Thread(target=cliente.embed, args=([f"t-{i}", f"t-{i}"],))
+            for i in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(self.chamadas), 8)
+        self.assertLessEqual(self.max_ativos, 2)
+
+    def test_lista_vazia(self):
+        cliente = ai.ClienteEmbeddings('modelo', ai.BaldeTokens(1, 1), funcao_embed=self._fake_embed())
+        self.assertEqual(cliente.embed([]), [])
+        self.assertEqual(self.chamadas, [])
+
+
+class TestCacheEmbeddings(unittest.TestCase):
+
+    def setUp(self):
+        self.cliente = MagicMock(modelo='modelo')
+        self.cliente.embed.side_effect = lambda textos, task_type: [[float(len(t))] for t in textos]
+        self.patches = [
+            patch('src.core.ai.get_cliente_embeddings', return_value=self.cliente),
+            patch('src.core.ai.get_cache_embeddings', return_value=CacheLRU('teste_emb', max_itens=10)),
+        ]
+        for p in self.patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_consulta_repetida_nao_chama_api(self):
+        v1 = ai.gerar_embedding("Lista de material")
+        v2 = ai.gerar_embedding("  lista de   MATERIAL ")
+        self.assertEqual(v1, v2)
+        self.cliente.embed.assert_called_once()
+
+    def test_envia_apenas_misses(self):
+        ai.gerar_embedding("a")
+        resultado = ai.gerar_embeddings(["a", "bb", "ccc"], task_type="retrieval_query")
+        self.assertEqual(resultado, [[1.0], [2.0], [3.0]])
+        self.assertEqual(self.cliente.embed.call_args.args[0], ["bb", "ccc"])
+
+    def test_documentos_nao_usam_cache(self):
+        ai.gerar_embeddings(["a"], task_type="retrieval_document")
+        ai.gerar_embeddings(["a"], task_type="retrieval_document")
+        self.assertEqual(self.cliente.embed.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import tempfile
+import time
+import unittest
+
+from src.core import cache
+from src.core.metricas import metricas
+
+
+class TestCacheLRU(unittest.TestCase):
+
+    def setUp(self):
+        metricas.limpar()
+
+    def test_hit_e_miss(self):
+        c = cache.CacheLRU('teste', max_itens=10)
+        self.assertIsNone(c.obter('a'))
+        c.definir('a', [1, 2])
+        self.assertEqual(c.obter('a'), [1, 2])
+        self.assertEqual(c.estatisticas()['hits'], 1)
+        self.assertEqual(c.estatisticas()['misses'], 1)
+
+    def test_despeja_menos_usado(self):
+        c = cache.CacheLRU('teste', max_itens=2)
+        c.definir('a', 1)
+        c.definir('b', 2)
+        c.obter('a')           # 'a' passa a ser o mais recente
+        c.definir('c', 3)      # despeja 'b'
+        self.assertIsNone(c.obter('b'))
+        self.assertEqual(c.obter('a'), 1)
+        self.assertEqual(c.obter('c'), 3)
+        self.assertEqual(len(c), 2)
+
+    def test_ttl_expira(self):
+        c = cache.CacheLRU('teste', ttl=0.05)
+        c.definir('a', 1)
+        self.assertEqual(c.obter('a'), 1)
+        time.sleep(0.06)
+        self.assertIsNone(c.obter('a'))
+
+    def test_camada_disco_sobrevive_reinicio(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = os.path.join(pasta, 'cache.db')
+            c1 = cache.CacheLRU('teste', disco=cache.CacheDisco(caminho, 'teste'))
+            c1.definir('a', [0.5, 0.25])
+
+            c2 = cache.CacheLRU('teste', disco=cache.CacheDisco(caminho, 'teste'))
+            self.assertEqual(c2.obter('a'), [0.5, 0.25])
+            self.assertEqual(metricas.contador('cache.teste.hits_disco'), 1)
+            # Promovido para a memória
+            self.assertEqual(len(c2), 1)
+
+    def test_disco_respeita_expiracao(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            disco = cache.CacheDisco(os.path.join(pasta, 'cache.db'))
+            disco.definir('a', 1, expira_em=time.time() - 1)
+            self.assertEqual(disco.obter('a'), (None, None))
+
+    def test_normalizacao_de_chave(self):
+        self.assertEqual(
+            cache.chave_hash('m', cache.normalizar_texto("  Horário da  Festa Junina ")),
+            cache.chave_hash('m', cache.normalizar_texto("horário da festa junina"))
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
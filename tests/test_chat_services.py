@@ -0,0 +1,158 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from flask import Flask
+
+from src.chat import services
+from src.core.gravacao import GravadorLotes
+
+
+ANA = {'nome': 'Ana Souza', 'segmento': 'AI', 'serie': '3º Ano', 'turma': 'B', 'integral': False}
+PEDRO = {'nome': 'Pedro Souza', 'segmento': 'EM', 'serie': '1ª Série', 'turma': 'A', 'integral': False}
+
+
+def _doc(doc_id, score):
+    return {'id': doc_id, 'score': score, 'fonte': f'{doc_id}.pdf', 'link': '#', 'conteudo': doc_id}
+
+
+class TestBuscarContexto(unittest.TestCase):
+
+    def setUp(self):
+        app = Flask(__name__)
+        app.config.update({'CHAT_BUSCA_TIMEOUT': 0.5, 'CHAT_BUSCA_MAX_DOCS': 6})
+        ctx = app.app_context()
+        ctx.push()
+        self.addCleanup(ctx.pop)
+        services._cache_conversas = None
+
+    @patch('src.chat.services.vector_db.buscar_documentos')
+    def test_filho_citado_faz_uma_busca_enriquecida(self, buscar):
+        buscar.return_value = [_doc('a', 0.9)]
+        services.buscar_contexto("O passeio do Pedro é quando?", [ANA, PEDRO])
+        buscar.assert_called_once()
+        self.assertIn('1ª Série turma A', buscar.call_args.kwargs['query'])
+        self.assertIn('EM/1ª Série/A', buscar.call_args.kwargs['publico'])
+
+    @patch('src.chat.services.vector_db.buscar_documentos')
+    def test_um_ramo_por_filho_em_paralelo(self, buscar):
+        barreira = threading.Barrier(2, timeout=2)
+
+        def buscar_ramo(query, top_k, publico):
+            barreira.wait()  # Só passa se os dois ramos estiverem rodando ao mesmo tempo
+            if 'AI/3º Ano' in publico:
+                return [_doc('comum', 0.6), _doc('ai', 0.9)]
+            return [_doc('em', 0.95), _doc('comum', 0.7)]
+
+        buscar.side_effect = buscar_ramo
+        docs = services.buscar_contexto("Quando é a reunião?", [ANA, PEDRO])
+
+        self.assertEqual(buscar.call_count, 2)
+        # 'comum' aparece nos dois ramos: sobe para o topo e fica a versão de maior score
+        self.assertEqual([d['id'] for d in docs][0], 'comum')
+        self.assertEqual(docs[0]['score'], 0.7)
+        self.assertEqual({d['id'] for d in docs}, {'comum', 'ai', 'em'})
+
+    @patch('src.chat.services.vector_db.buscar_documentos')
+    def test_ramo_atrasado_nao_segura_a_resposta(self, buscar):
+        liberar = threading.Event()
+        self.addCleanup(liberar.set)
+
+        def buscar_ramo(query, top_k, publico):
+            if 'EM' in publico:
+                liberar.wait(5)
+                return [_doc('em', 0.9)]
+            return [_doc('ai', 0.8)]
+
+        buscar.side_effect = buscar_ramo
+        inicio = time.monotonic()
+        docs = services.buscar_contexto("Quando é a reunião?", [ANA, PEDRO])
+
+        self.assertLess(time.monotonic() - inicio, 2)
+        self.assertEqual([d['id'] for d in docs], ['ai'])
+
+    def test_irmaos_na_mesma_turma_compartilham_ramo(self):
+        gemeo = dict(ANA, nome='Bia Souza')
+        self.assertEqual(len(services._ramos("oi", [ANA, gemeo, PEDRO])), 2)
+
+    @patch('src.chat.services.vector_db.assinar_links', return_value={'blob': 'https://assinada'})
+    @patch('src.chat.services.carregar_historico')
+    @patch('src.chat.services.salvar_mensagem')
+    @patch('src.chat.services.vector_db.buscar_documentos')
+    def test_turno_em_paralelo(self, buscar, salvar, carregar, assinar):
+        barreira = threading.Barrier(2, timeout=2)
+
+        def historico(*args):
+            barreira.wait()
+            return [{'role': 'assistant', 'content': 'Olá'}, {'role': 'user', 'content': 'Quando é o passeio?'}]
+
+        def busca(**kwargs):
+            barreira.wait()
+            return [dict(_doc('a', 0.9), link='blob')]
+
+        carregar.side_effect = historico
+        buscar.side_effect = busca
+
+        turno = services.preparar_turno('pai@x.com', 'conv', "Quando é o passeio?", [ANA])
+
+        self.assertEqual(turno.resultado('documentos')[0]['id'], 'a')
+        self.assertEqual(turno.resultado('urls'), {'blob': 'https://assinada'})
+        assinar.assert_called_once_with([dict(_doc('a', 0.9), link='blob')])
+        # A pergunta atual não se repete no histórico
+        self.assertEqual(turno.resultado('historico'), [{'role': 'assistant', 'content': 'Olá'}])
+        salvar.assert_called_once_with('pai@x.com', 'user', "Quando é o passeio?", 'conv')
+
+    @patch('src.chat.services.db')
+    def test_historico_inclui_mensagens_ainda_no_buffer(self, db):
+        gravador = GravadorLotes('teste')
+        self.addCleanup(gravador._fila.clear)
+        gravado = MagicMock(id='m1')
+        gravado.to_dict.return_value = {'role': 'user', 'content': 'Oi'}
+        consulta = db.collection.return_value.where.return_value.where.return_value
+        consulta.order_by.return_value.limit.return_value.stream.return_value = [gravado]
+
+        with patch('src.chat.services.gravador_historico', gravador), \
+                patch.object(gravador, '_garantir_thread'):
+            services.salvar_mensagem('pai@x.com', 'assistant', 'Olá!', 'conv')
+            services.salvar_mensagem('pai@x.com', 'user', 'Outra conversa', 'conv-2')
+            historico = services.carregar_historico('pai@x.com', 'conv')
+
+        self.assertEqual(historico, [{'role': 'user', 'content': 'Oi'}, {'role': 'assistant', 'content': 'Olá!'}])
+
+    @patch('src.chat.services.db')
+    def test_conversa_em_cache_nao_consulta_firestore(self, db):
+        gravador = GravadorLotes('teste')
+        self.addCleanup(gravador._fila.clear)
+        with patch('src.chat.services.gravador_historico', gravador), \
+                patch.object(gravador, '_garantir_thread'):
+            services.iniciar_conversa('pai@x.com', 'conv')
+            self.assertEqual(services.carregar_historico('pai@x.com', 'conv'), [])
+            services.salvar_mensagem('pai@x.com', 'user', 'Oi', 'conv')
+            services.salvar_mensagem('pai@x.com', 'assistant', 'Olá!', 'conv')
+            # Gravado no Firestore, continua no cache sem duplicar
+            gravador._fila.clear()
+            self.assertEqual(services.carregar_historico('pai@x.com', 'conv', 6),
+                             [{'role': 'user', 'content': 'Oi'}, {'role': 'assistant', 'content': 'Olá!'}])
+        db.collection.assert_not_called()
+
+    @patch('src.chat.services.db')
+    def test_miss_le_do_firestore_uma_vez(self, db):
+        gravado = MagicMock(id='m1')
+        gravado.to_dict.return_value = {'role': 'user', 'content': 'Oi'}
+        consulta = db.collection.return_value.where.return_value.where.return_value
+        consulta.order_by.return_value.limit.return_value.stream.return_value = [gravado]
+
+        with patch('src.chat.services.gravador_historico', GravadorLotes('teste')):
+            services.carregar_historico('pai@x.com', 'antiga', 6)
+            self.assertEqual(services.carregar_historico('pai@x.com', 'antiga', 6),
+                             [{'role': 'user', 'content': 'Oi'}])
+        consulta.order_by.return_value.limit.assert_called_once_with(20)
+
+    def test_fusao_respeita_limite(self):
+        docs = services.fundir_resultados([[_doc(str(i), 0.5) for i in range(5)], [_doc('x', 0.9)]], limite=3)
+        self.assertEqual(len(docs), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
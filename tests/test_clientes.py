@@ -0,0 +1,59 @@
+import unittest
+from unittest.mock import MagicMock
+
+from src.core.clientes import RegistroClientes
+
+
+class TestRegistroClientes(unittest.TestCase):
+
+    def setUp(self):
+        self.registro = RegistroClientes()
+        self.construcoes = 0
+
+        def fabrica():
+            self.construcoes += 1
+            return MagicMock(name=f'cliente_{self.construcoes}')
+
+        self.registro.registrar('api', fabrica, verificador=lambda c: c.ping())
+
+    def test_lazy_e_reaproveitado(self):
+        self.assertEqual(self.construcoes, 0)
+        c1 = self.registro.obter('api')
+        c2 = self.registro.obter('api')
+        self.assertIs(c1, c2)
+        self.assertEqual(self.construcoes, 1)
+
+    def test_reset_fecha_e_recria(self):
+        c1 = self.registro.obter('api')
+        self.registro.resetar('api')
+        c1.close.assert_called_once()
+        self.assertIsNot(self.registro.obter('api'), c1)
+
+    def test_reset_derruba_dependentes(self):
+        self.registro.registrar('api:filho', lambda: MagicMock())
+        self.registro.obter('api')
+        filho = self.registro.obter('api:filho')
+        self.registro.resetar('api')
+        self.assertIsNot(self.registro.obter('api:filho'), filho)
+
+    def test_fork_descarta_instancias_sem_fechar(self):
+        c1 = self.registro.obter('api')
+        self.registro._pid = -1  # Simula estar em outro processo
+        c2 = self.registro.obter('api')
+        self.assertIsNot(c1, c2)
+        c1.close.assert_not_called()
+
+    def test_saude(self):
+        self.assertEqual(self.registro.saude()['api']['status'], 'nao_inicializado')
+        cliente = self.registro.obter('api')
+        self.assertEqual(self.registro.saude()['api']['status'], 'ok')
+        cliente.ping.side_effect = ConnectionError("timeout")
+        self.assertEqual(self.registro.saude()['api'], {'status': 'erro', 'erro': 'timeout'})
+
+    def test_cliente_desconhecido(self):
+        with self.assertRaises(KeyError):
+            self.registro.obter('inexistente')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,11 +3,17 @@ import unittest
 from unittest.mock import MagicMock, patch
 import io
 import json
-from src.core import parser
+from src.core import extracao, parser
 
 class TestCoreParser(unittest.TestCase):
 
-    @patch('src.core.parser.pdfplumber.open')
+    def setUp(self):
+        # Os mocks do pdfplumber só valem no próprio processo (sem sandbox)
+        sem_sandbox = patch.dict(extracao.PADROES, {'PARSER_SANDBOX': False})
+        sem_sandbox.start()
+        self.addCleanup(sem_sandbox.stop)
+
+    @patch('src.core.extracao.pdfplumber.open')
     def test_extrair_texto_pdf_sucesso(self, mock_pdf_open):
         # Mock do PDF e Página e texto extraído
         mock_page = MagicMock()
@@ -25,7 +31,23 @@ class TestCoreParser(unittest.TestCase):
         self.assertEqual(resultado, "Texto de Teste Extraído")
         mock_page.extract_text.assert_called_with(layout=True)
 
-    @patch('src.core.parser.pdfplumber.open')
+    @patch('src.core.extracao.pdfplumber.open')
+    def test_extrair_paginas_pdf_preserva_numeracao(self, mock_pdf_open):
+        paginas_mock = []
+        for texto in ["Página 1", None, "Página 3"]:
+            page = MagicMock()
+            page.extract_text.return_value = texto
+            paginas_mock.append(page)
+        mock_pdf = MagicMock()
+        mock_pdf.pages = paginas_mock
+        mock_pdf_open.return_value.__enter__.return_value = mock_pdf
+
+        paginas = parser.extrair_paginas_pdf(io.BytesIO(b"fake content"))
+
+        self.assertEqual(paginas, ["Página 1", "", "Página 3"])
+        self.assertEqual(parser.juntar_paginas(paginas), "Página 1\nPágina 3")
+
+    @patch('src.core.extracao.pdfplumber.open')
     def test_extrair_texto_pdf_falha(self, mock_pdf_open):
         # Simula erro ao abrir PDF
         mock_pdf_open.side_effect = Exception("Arquivo corrompido")
@@ -0,0 +1,182 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from flask import Flask
+
+from src.core import extracao
+from tests.benchmark_extracao import gerar_pdf_sintetico
+
+
+class TestExtracaoParalela(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pdf = gerar_pdf_sintetico(7, linhas_por_pagina=3)
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp:
+            tmp.write(cls.pdf)
+        cls.caminho = tmp.name
+
+    @classmethod
+    def tearDownClass(cls):
+        extracao.encerrar_pool()
+        os.remove(cls.caminho)
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config.update({
+            'PARSER_WORKERS': 2,
+            'PARSER_PAGINAS_POR_LOTE': 2,
+            'PARSER_MIN_PAGINAS_PARALELO': 4,
+        })
+        ctx = self.app.app_context()
+        ctx.push()
+        self.addCleanup(ctx.pop)
+
+    def test_dividir_intervalos(self):
+        self.assertEqual(extracao.dividir_intervalos(7, 3), [(0, 3), (3, 6), (6, 7)])
+        self.assertEqual(extracao.dividir_intervalos(0, 3), [])
+
+    def test_pool_remonta_na_ordem(self):
+        paginas = extracao.extrair_paginas(self.caminho)
+        self.assertEqual([p['pagina'] for p in paginas], list(range(1, 8)))
+        for p in paginas:
+            self.assertIn(f"Pagina {p['pagina']} linha 0", p['texto'])
+
+    def test_pool_igual_ao_serial(self):
+        paralelo = extracao.extrair_paginas(io.BytesIO(self.pdf))
+        self.app.config['PARSER_WORKERS'] = 1
+        serial = extracao.extrair_paginas(io.BytesIO(self.pdf))
+        self.assertEqual([p['texto'] for p in paralelo], [p['texto'] for p in serial])
+
+    def test_arquivo_pequeno_usa_um_sandbox_so(self):
+        self.app.config['PARSER_MIN_PAGINAS_PARALELO'] = 50
+        with patch('src.core.extracao._extrair_intervalo_isolado',
+                   wraps=extracao._extrair_intervalo_isolado) as intervalo:
+            paginas = extracao.extrair_paginas(self.caminho)
+        intervalo.assert_called_once()
+        self.assertEqual(intervalo.call_args.args[1:3], (0, 7))
+        self.assertEqual(len(paginas), 7)
+
+    def test_sem_sandbox_extrai_no_proprio_processo(self):
+        self.app.config['PARSER_SANDBOX'] = False
+        with patch('src.core.extracao.Sandbox') as sandbox:
+            paginas = extracao.extrair_paginas(self.caminho)
+        sandbox.assert_not_called()
+        self.assertEqual(len(paginas), 7)
+
+
+class _SandboxFalso:
+    """Entrega páginas até 'travar' na página indicada (como um filho que estourou o prazo)."""
+    vivo = True
+    limite_memoria = 0
+
+    def __init__(self, trava_em, motivo='timeout'):
+        self.trava_em = trava_em
+        self.motivo = motivo
+        self.encerrado = False
+
+    def extrair(self, caminho, inicio, fim, estrategia, prazo):
+        for i in range(inicio, fim):
+            if i in self.trava_em:
+                raise extracao.LimiteExcedido(self.motivo)
+            yield {'pagina': i + 1, 'texto': f"p{i + 1}", 'motor': 'rapido', 'duracao_s': 0.0}
+
+    def encerrar(self):
+        self.encerrado = True
+
+
+class TestSandbox(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config.update({'PARSER_WORKERS': 1})
+        ctx = self.app.app_context()
+        ctx.push()
+        self.addCleanup(ctx.pop)
+        self.addCleanup(extracao.encerrar_pool)
+
+    def test_pagina_que_estoura_limite_e_pulada_e_o_resto_segue(self):
+        criados = []
+
+        def obter(limite):
+            sandbox = _SandboxFalso(trava_em={2, 5}, motivo='memoria')
+            criados.append(sandbox)
+            return sandbox
+
+        with patch('src.core.extracao._obter_sandbox', side_effect=obter), \
+                patch('src.core.extracao._devolver_sandbox'):
+            paginas = extracao._extrair_intervalo_isolado('x.pdf', 0, 7, 'auto', 1.0, 0)
+
+        self.assertEqual([p['pagina'] for p in paginas], list(range(1, 8)))
+        self.assertEqual([p['texto'] for p in paginas], ['p1', 'p2', '', 'p4', 'p5', '', 'p7'])
+        self.assertEqual(extracao.paginas_puladas(paginas),
+                         [{'pagina': 3, 'motivo': 'memoria'}, {'pagina': 6, 'motivo': 'memoria'}])
+        # Cada estouro descarta o filho e segue em um novo
+        self.assertEqual(len(criados), 3)
+        self.assertTrue(criados[0].encerrado and criados[1].encerrado)
+
+    def test_prazo_estourado_na_abertura_recusa_arquivo(self):
+        self.app.config['PARSER_TIMEOUT_PAGINA'] = 0.001
+        with self.assertRaises(extracao.ArquivoRecusado):
+            extracao.extrair_paginas(io.BytesIO(gerar_pdf_sintetico(2)))
+
+    def test_arquivo_grande_demais_recusado_antes_de_abrir(self):
+        self.app.config['PARSER_MAX_BYTES'] = 100
+        with patch('src.core.extracao.Sandbox') as sandbox:
+            with self.assertRaises(extracao.ArquivoRecusado):
+                extracao.extrair_paginas(io.BytesIO(gerar_pdf_sintetico(2)))
+        sandbox.assert_not_called()
+
+    def test_paginas_alem_do_maximo_sao_puladas(self):
+        self.app.config['PARSER_MAX_PAGINAS'] = 2
+        paginas = extracao.extrair_paginas(io.BytesIO(gerar_pdf_sintetico(4, linhas_por_pagina=2)))
+        self.assertEqual(len(paginas), 4)
+        self.assertIn("Pagina 2", paginas[1]['texto'])
+        self.assertEqual(extracao.paginas_puladas(paginas),
+                         [{'pagina': 3, 'motivo': 'limite_paginas'}, {'pagina': 4, 'motivo': 'limite_paginas'}])
+
+
+class TestMotores(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config.update({'PARSER_WORKERS': 1, 'PARSER_MOTOR': 'auto'})
+        ctx = self.app.app_context()
+        ctx.push()
+        self.addCleanup(ctx.pop)
+
+    def test_parece_grade(self):
+        # Três colunas alinhadas, separadas por vãos largos
+        tabela = [(x, x + 60, y) for y in (800, 784, 768, 752) for x in (40, 200, 360)]
+        self.assertTrue(extracao.parece_grade(tabela))
+        # Palavras contíguas em cada linha: prosa
+        prosa = [(40 + i * 33, 40 + i * 33 + 30, y) for y in (800, 784, 768, 752) for i in range(12)]
+        self.assertFalse(extracao.parece_grade(prosa))
+
+    def test_prosa_usa_motor_rapido(self):
+        paginas = extracao.extrair_paginas(io.BytesIO(gerar_pdf_sintetico(3, linhas_por_pagina=5, por_palavra=True)))
+        self.assertEqual({p['motor'] for p in paginas}, {'rapido'})
+        self.assertIn("Pagina 2 linha 0: comunicado", paginas[1]['texto'])
+
+    def test_tabela_usa_motor_layout(self):
+        paginas = extracao.extrair_paginas(io.BytesIO(gerar_pdf_sintetico(2, linhas_por_pagina=5, tabela=True)))
+        self.assertEqual({p['motor'] for p in paginas}, {'layout'})
+        # Layout preserva o alinhamento das colunas
+        self.assertRegex(paginas[0]['texto'], r"Celula 0-0-0\s{3,}Celula 0-0-1")
+
+    def test_motor_fixo(self):
+        self.app.config['PARSER_MOTOR'] = 'layout'
+        paginas = extracao.extrair_paginas(io.BytesIO(gerar_pdf_sintetico(2, linhas_por_pagina=5)))
+        self.assertEqual({p['motor'] for p in paginas}, {'layout'})
+
+    def test_motor_desconhecido(self):
+        self.app.config['PARSER_MOTOR'] = 'ocr'
+        with self.assertRaises(ValueError):
+            extracao.extrair_paginas(io.BytesIO(gerar_pdf_sintetico(1)))
+
+
+if __name__ == '__main__':
+    unittest.main()
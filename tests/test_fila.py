@@ -0,0 +1,213 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from flask import Flask
+
+from src.core import fila
+
+
+def _criar_app(**config):
+    app = Flask(__name__)
+    app.config.update({
+        'INGESTAO_WORKERS': 2,
+        'INGESTAO_MAX_TENTATIVAS': 3,
+        'INGESTAO_BACKOFF_BASE': 0.01,
+        'INGESTAO_FILA_MAX': 10,
+        'INGESTAO_INTERVALO_OCIOSO': 0.01,
+    })
+    app.config.update(config)
+    return app
+
+
+def _aguardar(condicao, timeout=5.0):
+    limite = time.time() + timeout
+    while time.time() < limite:
+        if condicao():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestBackends(unittest.TestCase):
+
+    def _job(self, job_id, disponivel_em=0.0):
+        return {
+            'id': job_id, 'payload': {'doc_id': job_id}, 'status': fila.STATUS_NA_FILA,
+            'tentativas': 0, 'max_tentativas': 3, 'erro': None,
+            'disponivel_em': disponivel_em, 'criado_em': disponivel_em, 'atualizado_em': disponivel_em
+        }
+
+    def _verificar_backend(self, backend):
+        backend.salvar(self._job('a', 1.0))
+        backend.salvar(self._job('b', 100.0))
+
+        job = backend.reservar(agora=50.0)
+        self.assertEqual(job['id'], 'a')
+        self.assertEqual(job['status'], fila.STATUS_EXECUTANDO)
+        self.assertEqual(job['tentativas'], 1)
+        self.assertEqual(job['payload'], {'doc_id': 'a'})
+
+        # 'b' ainda não está disponível (backoff)
+        self.assertIsNone(backend.reservar(agora=50.0))
+
+        # Reinício da instância: o job 'executando' volta para a fila
+        self.assertEqual(backend.recuperar_orfaos(), 1)
+        self.assertEqual(backend.obter('a')['status'], fila.STATUS_NA_FILA)
+        self.assertEqual(backend.contar(*fila.STATUS_ATIVOS), 2)
+
+        backend.atualizar('a', status=fila.STATUS_CONCLUIDO)
+        self.assertEqual(backend.contar(fila.STATUS_CONCLUIDO), 1)
+
+    def test_backend_memoria(self):
+        self._verificar_backend(fila.BackendMemoria())
+
+    def test_backend_sqlite_persiste_entre_instancias(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = os.path.join(pasta, 'fila.db')
+            self._verificar_backend(fila.BackendSQLite(caminho))
+
+            reaberto = fila.BackendSQLite(caminho)
+            self.assertEqual(reaberto.obter('a')['status'], fila.STATUS_CONCLUIDO)
+            self.assertEqual(reaberto.obter('b')['payload'], {'doc_id': 'b'})
+
+
+class TestFilaTrabalhos(unittest.TestCase):
+
+    def setUp(self):
+        self.fila = fila.FilaTrabalhos('teste')
+
+    def tearDown(self):
+        self.fila.parar()
+
+    def test_processa_job_com_sucesso(self):
+        processados = []
+        self.fila.init_app(_criar_app(), processador=lambda p: processados.append(p['doc_id']))
+
+        self.fila.enfileirar('doc1', {'doc_id': 'doc1'})
+
+        self.assertTrue(_aguardar(lambda: self.fila.obter('doc1')['status'] == fila.STATUS_CONCLUIDO))
+        self.assertEqual(processados, ['doc1'])
+
+    def test_retry_com_backoff_ate_sucesso(self):
+        chamadas = []
+
+        def processador(payload):
+            chamadas.append(time.time())
+            if len(chamadas) < 3:
+                raise ConnectionError("Pinecone indisponível")
+
+        self.fila.init_app(_criar_app(), processador=processador)
+        self.fila.enfileirar('doc1', {'doc_id': 'doc1'})
+
+        self.assertTrue(_aguardar(lambda: self.fila.obter('doc1')['status'] == fila.STATUS_CONCLUIDO))
+        self.assertEqual(self.fila.obter('doc1')['tentativas'], 3)
+
+    def test_falha_definitiva_chama_callback(self):
+        falhas = []
+
+        def processador(payload):
+            raise ValueError("sempre falha")
+
+        self.fila.init_app(
+            _criar_app(), processador=processador,
+            ao_falhar=lambda payload, erro: falhas.append((payload['doc_id'], erro))
+        )
+        self.fila.enfileirar('doc1', {'doc_id': 'doc1'})
+
+        self.assertTrue(_aguardar(lambda: self.fila.obter('doc1')['status'] == fila.STATUS_FALHOU))
+        self.assertEqual(self.fila.obter('doc1')['tentativas'], 3)
+        self.assertTrue(_aguardar(lambda: falhas == [('doc1', 'sempre falha')]))
+
+    def test_erro_permanente_nao_repete(self):
+        def processador(payload):
+            raise fila.ErroPermanente("PDF ilegível")
+
+        self.fila.init_app(_criar_app(), processador=processador)
+        self.fila.enfileirar('doc1', {'doc_id': 'doc1'})
+
+        self.assertTrue(_aguardar(lambda: self.fila.obter('doc1')['status'] == fila.STATUS_FALHOU))
+        self.assertEqual(self.fila.obter('doc1')['tentativas'], 1)
+
+    def test_pool_limitado_de_workers(self):
+        liberar = threading.Event()
+        simultaneos = []
+        ativos = [0]
+        lock = threading.Lock()
+
+        def processador(payload):
+            with lock:
+                ativos[0] += 1
+                simultaneos.append(ativos[0])
+            liberar.wait(2)
+            with lock:
+                ativos[0] -= 1
+
+        self.fila.init_app(_criar_app(INGESTAO_WORKERS=2), processador=processador)
+        for i in range(6):
+            self.fila.enfileirar(f'doc{i}', {'doc_id': i})
+
+        time.sleep(0.2)
+        liberar.set()
+        self.assertTrue(_aguardar(lambda: self.fila.pendentes() == 0))
+        self.assertLessEqual(max(simultaneos), 2)
+
+    def test_fila_cheia(self):
+        liberar = threading.Event()
+        self.fila.init_app(
+            _criar_app(INGESTAO_FILA_MAX=2, INGESTAO_WORKERS=1),
+            processador=lambda p: liberar.wait(2)
+        )
+        self.fila.enfileirar('doc1', {})
+        self.fila.enfileirar('doc2', {})
+        with self.assertRaises(fila.FilaCheia):
+            self.fila.enfileirar('doc3', {})
+        liberar.set()
+
+    def test_varredura_reenfileira_pendentes(self):
+        processados = []
+        app = _criar_app()
+        backend = fila.BackendMemoria()
+        backend.salvar({
+            'id': 'orfao', 'payload': {'doc_id': 'orfao'}, 'status': fila.STATUS_EXECUTANDO,
+            'tentativas': 1, 'max_tentativas': 3, 'erro': None,
+            'disponivel_em': 0.0, 'criado_em': 0.0, 'atualizado_em': 0.0
+        })
+
+        def varredor(f):
+            f.enfileirar('perdido', {'doc_id': 'perdido'})
+            return 1
+
+        app.config['INGESTAO_VARRER_NA_INICIALIZACAO'] = False
+        self.fila.init_app(app, processador=lambda p: processados.append(p['doc_id']), backend=backend)
+        self.fila.varrer(varredor)
+
+        self.assertTrue(_aguardar(lambda: sorted(processados) == ['orfao', 'perdido']))
+
+
+class TestExecutarEtapa(unittest.TestCase):
+
+    def test_repete_ate_sucesso(self):
+        tentativas = []
+
+        def etapa():
+            tentativas.append(1)
+            if len(tentativas) < 2:
+                raise TimeoutError("timeout")
+            return 'ok'
+
+        self.assertEqual(fila.executar_etapa('teste', etapa, tentativas=3, espera_base=0), 'ok')
+        self.assertEqual(len(tentativas), 2)
+
+    def test_propaga_apos_esgotar(self):
+        def etapa():
+            raise TimeoutError("timeout")
+
+        with self.assertRaises(TimeoutError):
+            fila.executar_etapa('teste', etapa, tentativas=2, espera_base=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+
+from src.core import fragmentacao
+
+
+class TestFragmentacao(unittest.TestCase):
+
+    def test_documento_curto_gera_um_fragmento(self):
+        frags = fragmentacao.fragmentar_paginas(["Reunião de pais dia 10/03."])
+        self.assertEqual(len(frags), 1)
+        self.assertEqual(frags[0]['indice'], 0)
+        self.assertEqual(frags[0]['pagina_inicio'], 1)
+        self.assertIn("Reunião de pais", frags[0]['texto'])
+
+    def test_aceita_string_unica(self):
+        frags = fragmentacao.fragmentar_paginas("Texto simples")
+        self.assertEqual(frags[0]['texto'], "Texto simples")
+
+    def test_janelas_respeitam_tamanho_e_paginas(self):
+        paragrafo = "Lorem ipsum dolor sit amet. " * 10  # ~280 chars
+        paginas = ["\n\n".join([paragrafo] * 4), "\n\n".join([paragrafo] * 4)]
+
+        frags = fragmentacao.fragmentar_paginas(paginas, tamanho_max=700, sobreposicao=300)
+
+        self.assertGreater(len(frags), 2)
+        for frag in frags:
+            self.assertLessEqual(len(frag['texto']), 700)
+        self.assertEqual(frags[0]['pagina_inicio'], 1)
+        self.assertEqual(frags[-1]['pagina_fim'], 2)
+        self.assertEqual([f['indice'] for f in frags], list(range(len(frags))))
+
+    def test_sobreposicao_entre_janelas(self):
+        blocos = [f"Parágrafo número {i} com algum conteúdo." for i in range(12)]
+        frags = fragmentacao.fragmentar_paginas(["\n\n".join(blocos)], tamanho_max=200, sobreposicao=60)
+
+        for anterior, proximo in zip(frags, frags[1:]):
+            ultimo_bloco = anterior['texto'].split("\n\n")[-1]
+            self.assertTrue(proximo['texto'].startswith(ultimo_bloco))
+
+    def test_titulo_de_secao_inicia_nova_janela(self):
+        corpo = "Os alunos devem trazer o material na primeira semana de aula. " * 3
+        texto = f"MATERIAL ESCOLAR\n\n{corpo}\n\nCALENDÁRIO DE PROVAS\n\nProva de matemática dia 12."
+        frags = fragmentacao.fragmentar_paginas([texto], tamanho_max=400, sobreposicao=0)
+
+        self.assertEqual(len(frags), 2)
+        self.assertTrue(frags[1]['texto'].startswith("CALENDÁRIO DE PROVAS"))
+
+    def test_bloco_gigante_e_quebrado(self):
+        frags = fragmentacao.fragmentar_paginas(["x" * 5000], tamanho_max=1000, sobreposicao=0)
+        self.assertEqual(len(frags), 5)
+        self.assertEqual("".join(f['texto'] for f in frags), "x" * 5000)
+
+    def test_paginas_vazias_sao_ignoradas(self):
+        self.assertEqual(fragmentacao.fragmentar_paginas(["", "   "]), [])
+
+    def test_id_fragmento(self):
+        self.assertEqual(fragmentacao.montar_id_fragmento("doc.pdf", 3), "doc.pdf#chunk_3")
+
+
+if __name__ == '__main__':
+    unittest.main()
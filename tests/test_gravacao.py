@@ -0,0 +1,106 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from flask import Flask
+
+from src.core.gravacao import GravadorLotes
+from src.core.metricas import metricas
+
+
+class TestGravadorLotes(unittest.TestCase):
+
+    def setUp(self):
+        self.db = MagicMock()
+        self.commits = []
+
+        def novo_batch():
+            batch = MagicMock()
+            batch.commit.side_effect = lambda: self.commits.append(
+                [c.args[1]['n'] for c in batch.set.call_args_list]
+            )
+            return batch
+
+        self.db.batch.side_effect = novo_batch
+        patcher = patch('src.core.gravacao.db', self.db)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.app = Flask(__name__)
+        self.app.config.update({'GRAVACAO_LOTE_MAX': 3, 'GRAVACAO_INTERVALO': 0.05,
+                                'GRAVACAO_BUFFER_MAX': 5, 'GRAVACAO_TENTATIVAS': 3})
+        self.gravador = GravadorLotes('teste')
+        self.gravador._atexit_registrado = True  # Sem atexit nos testes
+        self.gravador.init_app(self.app)
+        self.addCleanup(self.gravador.encerrar)
+
+    def _esperar(self, condicao, limite=2.0):
+        fim = time.monotonic() + limite
+        while not condicao() and time.monotonic() < fim:
+            time.sleep(0.01)
+        self.assertTrue(condicao())
+
+    def test_lotes_por_tamanho_e_por_tempo_em_ordem(self):
+        for n in range(4):
+            self.gravador.registrar('chat_history', {'n': n})
+        self._esperar(lambda: sum(len(c) for c in self.commits) == 4)
+        # Lote cheio (3) sai primeiro; o resto sai no intervalo, sem trocar a ordem
+        self.assertEqual(self.commits, [[0, 1, 2], [3]])
+        self.assertEqual(self.gravador.profundidade(), 0)
+
+    def test_registrar_nao_espera_o_firestore(self):
+        liberar = threading.Event()
+        self.addCleanup(liberar.set)
+        self.db.batch.side_effect = None
+        self.db.batch.return_value.commit.side_effect = lambda: liberar.wait(2)
+
+        inicio = time.monotonic()
+        for n in range(3):
+            self.gravador.registrar('chat_history', {'n': n})
+        self.assertLess(time.monotonic() - inicio, 0.5)
+        self._esperar(lambda: self.gravador.pendentes(lambda c, d: True) != [] and not self.gravador._fila)
+        self.assertEqual([d['n'] for _, d in self.gravador.pendentes(lambda c, d: True)], [0, 1, 2])
+        liberar.set()
+
+    def test_buffer_limitado_descarta_e_conta(self):
+        with patch.object(self.gravador, '_garantir_thread'):
+            ids = [self.gravador.registrar('chat_history', {'n': n}) for n in range(6)]
+        self.assertIsNone(ids[-1])
+        self.assertEqual(metricas.contador('gravacao.teste.fila'), 5)
+        self.assertEqual(self.gravador.profundidade(), 5)
+
+    def test_encerrar_grava_o_restante(self):
+        with patch.object(self.gravador, '_garantir_thread'):
+            for n in range(5):
+                self.gravador.registrar('chat_history', {'n': n})
+        self.gravador.encerrar()
+        self.assertEqual(self.commits, [[0, 1, 2], [3, 4]])
+
+    @patch('src.core.gravacao.time.sleep')
+    def test_lote_com_falha_e_repetido_antes_do_proximo(self, _sleep):
+        falhas = [ConnectionError("fora"), None]
+        original = self.db.batch.side_effect
+
+        def batch_instavel():
+            batch = original()
+            commit = batch.commit.side_effect
+            erro = falhas.pop(0) if falhas else None
+
+            def tentar():
+                if erro:
+                    raise erro
+                commit()
+            batch.commit.side_effect = tentar
+            return batch
+
+        self.db.batch.side_effect = batch_instavel
+        with patch.object(self.gravador, '_garantir_thread'):
+            for n in range(4):
+                self.gravador.registrar('chat_history', {'n': n})
+        self.gravador.descarregar()
+        self.assertEqual(self.commits, [[0, 1, 2], [3]])
+
+
+if __name__ == '__main__':
+    unittest.main()
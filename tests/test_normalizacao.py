@@ -0,0 +1,94 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src.core import normalizacao
+from src.core.normalizacao import compactar_espacos, normalizar_paginas
+
+
+def _pagina(num: int, corpo: str) -> str:
+    return (
+        "          COLÉGIO EXEMPLO - CNPJ 12.345.678/0001-90\n"
+        "          Rua das Flores, 100 - São Paulo\n\n"
+        f"{corpo}\n\n"
+        f"                     www.colegio.com.br      Página {num} de 3\n"
+    )
+
+
+class TestCompactarEspacos(unittest.TestCase):
+
+    def test_prosa_vira_espaco_simples(self):
+        texto = "      Prezados    pais,   o passeio será    na sexta.   "
+        self.assertEqual(compactar_espacos(texto), "Prezados pais, o passeio será na sexta.")
+
+    def test_tabela_mantem_alinhamento(self):
+        tabela = (
+            "       Data          Atividade            Local\n"
+            "       12/03         Museu                Centro\n"
+            "       13/03         Parque Ecológico     Zona Sul"
+        )
+        linhas = compactar_espacos(tabela).split('\n')
+        self.assertEqual(linhas[0], "Data   Atividade         Local")
+        # As colunas continuam começando na mesma posição em todas as linhas
+        for coluna in ("Atividade", "Local"):
+            inicio = linhas[0].index(coluna)
+            self.assertTrue(all(l[inicio - 1] == ' ' and l[inicio] != ' ' for l in linhas))
+        self.assertLess(len("\n".join(linhas)), len(tabela))
+
+    def test_linhas_vazias_colapsam(self):
+        self.assertEqual(compactar_espacos("a\n\n\n\n\nb"), "a\n\nb")
+
+
+class TestLinhasRepetidas(unittest.TestCase):
+
+    def test_remove_timbre_e_rodape_repetidos(self):
+        paginas = [
+            _pagina(1, "Informamos que o passeio ao museu será no dia 12/03.\nTragam lanche.\nAutorização anexa.\nSaída às 8h."),
+            _pagina(2, "O retorno está previsto para as 17h.\nUse o uniforme.\nLeve boné.\nTraga garrafa d'água."),
+            _pagina(3, "Dúvidas com a coordenação.\nAtenciosamente,\nA Direção.\nSetor pedagógico."),
+        ]
+        normalizadas, relatorio = normalizar_paginas(paginas)
+
+        for texto in normalizadas:
+            self.assertNotIn("CNPJ", texto)
+            self.assertNotIn("www.colegio.com.br", texto)
+        self.assertTrue(normalizadas[0].startswith("Informamos que o passeio"))
+        self.assertEqual(relatorio['linhas_removidas'], 9)
+        self.assertLess(relatorio['tokens_depois'], relatorio['tokens_antes'])
+        self.assertGreater(relatorio['economia_pct'], 30)
+
+    def test_pagina_unica_so_remove_boilerplate_do_corpus(self):
+        pagina = _pagina(1, "Reunião de pais na quinta.\nPauta: avaliações.\nLocal: auditório.\nHorário: 19h.")
+        mantida, _ = normalizar_paginas([pagina])
+        self.assertIn("CNPJ", mantida[0])
+
+        chave = normalizacao.chave_linha("COLÉGIO EXEMPLO - CNPJ 12.345.678/0001-90")
+        limpa, relatorio = normalizar_paginas([pagina], boilerplate_corpus={chave})
+        self.assertNotIn("CNPJ", limpa[0])
+        self.assertIn(chave, relatorio['candidatas'])
+
+    def test_numeracao_de_pagina_nao_impede_repeticao(self):
+        self.assertEqual(normalizacao.chave_linha("Página 1 de 3"), normalizacao.chave_linha("Página  2 de 3"))
+
+
+class TestBoilerplateCorpus(unittest.TestCase):
+
+    def test_sem_firestore_nao_faz_nada(self):
+        with patch('src.core.normalizacao.db', None):
+            corpus = normalizacao.BoilerplateCorpus()
+            self.assertEqual(corpus.frequentes(), set())
+            corpus.registrar('doc', ['linha'])
+
+    def test_frequentes_em_cache_pelo_ttl(self):
+        db = MagicMock()
+        doc = MagicMock()
+        doc.to_dict.return_value = {'linha': 'colégio exemplo'}
+        db.collection.return_value.where.return_value.stream.return_value = [doc]
+        with patch('src.core.normalizacao.db', db):
+            corpus = normalizacao.BoilerplateCorpus(min_docs=3, ttl=60)
+            self.assertEqual(corpus.frequentes(), {'colégio exemplo'})
+            corpus.frequentes()
+        db.collection.return_value.where.assert_called_once_with('total', '>=', 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
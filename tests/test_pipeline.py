@@ -0,0 +1,56 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from src.core.pipeline import Pipeline
+
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.addCleanup(self.executor.shutdown, wait=False)
+
+    def test_etapas_independentes_rodam_juntas(self):
+        barreira = threading.Barrier(3, timeout=2)
+        p = Pipeline('teste', self.executor)
+        for nome in ('a', 'b', 'c'):
+            p.etapa(nome, lambda nome=nome: (barreira.wait(), nome)[1], prazo=3)
+        self.assertEqual([p.resultado(n) for n in ('a', 'b', 'c')], ['a', 'b', 'c'])
+
+    def test_dependencia_recebe_resultado_e_comeca_logo(self):
+        p = Pipeline('teste', self.executor)
+        lento = threading.Event()
+        p.etapa('busca', lambda: ['doc'], prazo=2)
+        p.etapa('lenta', lambda: lento.wait(2), prazo=2)
+        p.etapa('assinatura', lambda docs: {d: 'url' for d in docs}, depende=('busca',), prazo=2)
+        # A assinatura não espera a etapa lenta (que não é dependência)
+        self.assertEqual(p.resultado('assinatura'), {'doc': 'url'})
+        self.assertFalse(lento.is_set())
+        lento.set()
+
+    def test_prazo_e_erro_devolvem_padrao(self):
+        p = Pipeline('teste', self.executor)
+        liberar = threading.Event()
+        self.addCleanup(liberar.set)
+        p.etapa('lenta', lambda: liberar.wait(5), prazo=0.1, padrao=[])
+        p.etapa('quebra', lambda: 1 / 0, prazo=1, padrao={})
+        p.etapa('depois', lambda x: x + ['ok'], depende=('quebra',), prazo=1, padrao=None)
+
+        inicio = time.monotonic()
+        self.assertEqual(p.resultado('lenta'), [])
+        self.assertLess(time.monotonic() - inicio, 1)
+        self.assertEqual(p.resultado('quebra'), {})
+        # Dependência com erro entrega o padrão dela
+        self.assertIsNone(p.resultado('depois'))
+
+        tempos = p.tempos()
+        self.assertEqual(tempos['lenta']['status'], 'expirou')
+        self.assertEqual(tempos['quebra']['status'], 'erro')
+        self.assertIn('quebra;dur=', p.server_timing())
+        self.assertIn('total;dur=', p.server_timing())
+
+
+if __name__ == '__main__':
+    unittest.main()
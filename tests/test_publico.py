@@ -0,0 +1,75 @@
+import unittest
+
+from src.core import publico
+
+
+class TestCanonizarSerie(unittest.TestCase):
+
+    def test_variacoes_de_escrita(self):
+        self.assertEqual(publico.canonizar_serie('3o ano'), '3º Ano')
+        self.assertEqual(publico.canonizar_serie('2ª SÉRIE'), '2ª Série')
+        self.assertEqual(publico.canonizar_serie('infantil 4'), 'Infantil 4')
+        self.assertEqual(publico.canonizar_serie('1º Ano/Série', 'EM'), '1ª Série')
+
+    def test_ambigua_ou_desconhecida(self):
+        self.assertIsNone(publico.canonizar_serie('1'))
+        self.assertIsNone(publico.canonizar_serie('Berçário'))
+
+
+class TestChavesDocumento(unittest.TestCase):
+
+    def test_escola_e_segmento_inteiros(self):
+        self.assertEqual(publico.chaves_documento('TODOS'), ['TODOS'])
+        self.assertEqual(publico.chaves_documento('AF'), ['AF'])
+
+    def test_series_e_turmas_da_matriz(self):
+        chaves = publico.chaves_documento('AI', ['3º Ano', '5º Ano'], turmas=['C'])
+        # 5º Ano não tem turma C
+        self.assertEqual(chaves, ['AI/3º Ano/C'])
+
+    def test_periodo_sem_turma_vira_turmas_do_periodo(self):
+        self.assertEqual(publico.chaves_documento('AI', ['4º Ano'], periodos=['Manhã']),
+                         ['AI/4º Ano/A', 'AI/4º Ano/B'])
+
+    def test_serie_da_ia_com_segmento_todos(self):
+        self.assertEqual(publico.chaves_documento('TODOS', ['9o ano']), ['AF/9º Ano'])
+
+    def test_combinacao_inexistente_cai_na_serie(self):
+        self.assertEqual(publico.chaves_documento('EM', ['3ª Série'], turmas=['B']), ['EM/3ª Série'])
+
+    def test_integral(self):
+        self.assertEqual(publico.chaves_documento('EI', integral=True), ['integral:EI'])
+
+
+class TestChavesAluno(unittest.TestCase):
+
+    def test_aluno_enxerga_escola_segmento_serie_e_turma(self):
+        filho = {'nome': 'Ana', 'segmento': 'AI', 'serie': '3º Ano', 'turma': 'B', 'integral': False}
+        chaves = publico.chaves_aluno(filho)
+        self.assertEqual(chaves, ['TODOS', 'AI', 'AI/3º Ano', 'AI/3º Ano/B'])
+        # Bate com os comunicados certos e não com os de outra série/turma
+        self.assertTrue(set(chaves) & set(publico.chaves_documento('AI', ['3º Ano'], turmas=['B'])))
+        self.assertTrue(set(chaves) & set(publico.chaves_documento('AI')))
+        self.assertFalse(set(chaves) & set(publico.chaves_documento('AI', ['3º Ano'], turmas=['C'])))
+        self.assertFalse(set(chaves) & set(publico.chaves_documento('AI', ['4º Ano'])))
+        self.assertFalse(set(chaves) & set(publico.chaves_documento('AI', integral=True)))
+
+    def test_aluno_integral_enxerga_comunicados_do_integral(self):
+        filho = {'segmento': 'EI', 'serie': 'Infantil 2', 'turma': 'A', 'integral': True}
+        chaves = publico.chaves_aluno(filho)
+        self.assertIn('integral:EI', chaves)
+        self.assertIn('EI/Infantil 2/A', chaves)
+
+    def test_varios_filhos(self):
+        chaves = publico.chaves_alunos([
+            {'segmento': 'AI', 'serie': '1º Ano', 'turma': 'A'},
+            {'segmento': 'EM', 'serie': '1ª Série', 'turma': 'A'},
+        ])
+        self.assertEqual(chaves, sorted(set(chaves)))
+        self.assertIn('AI/1º Ano/A', chaves)
+        self.assertIn('EM/1ª Série/A', chaves)
+        self.assertEqual(publico.chaves_alunos([]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
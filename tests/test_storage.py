@@ -0,0 +1,71 @@
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from flask import Flask
+
+from src.core import storage
+
+
+class TestSignedUrls(unittest.TestCase):
+
+    def setUp(self):
+        app = Flask(__name__)
+        app.config.update({
+            'GCS_BUCKET_NAME': 'bucket',
+            'GOOGLE_CLOUD_PROJECT': 'projeto',
+            'SIGNED_URL_RENOVAR_ANTES': 900,
+        })
+        ctx = app.app_context()
+        ctx.push()
+        self.addCleanup(ctx.pop)
+
+        storage._cache_urls = None
+        self.client = MagicMock()
+        self.contador = 0
+
+        def assinar(**kwargs):
+            self.contador += 1
+            return f"https://assinada/{self.contador}"
+
+        self.bucket = MagicMock()
+        self.bucket.blob.return_value.generate_signed_url.side_effect = assinar
+        for alvo, valor in [('_get_client', self.client), ('_get_bucket', self.bucket), ('_parametros_assinatura', {})]:
+            p = patch(f'src.core.storage.{alvo}', return_value=valor)
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_reaproveita_url_em_cache(self):
+        url1 = storage.generate_signed_url('blob_a')
+        url2 = storage.generate_signed_url('blob_a')
+        self.assertEqual(url1, url2)
+        self.assertEqual(self.contador, 1)
+
+    def test_renova_perto_de_expirar(self):
+        storage.generate_signed_url('blob_a')
+        # Simula que só restam 10 minutos de validade (< 15 min de antecedência)
+        chave = 'bucket/blob_a/3600'
+        url, _ = storage._get_cache_urls().obter(chave)
+        storage._get_cache_urls().definir(chave, (url, time.time() + 600))
+
+        nova = storage.generate_signed_url('blob_a')
+        self.assertEqual(nova, 'https://assinada/2')
+
+    def test_lote_assina_apenas_faltantes_com_um_setup(self):
+        storage.generate_signed_url('blob_a')
+        urls = storage.generate_signed_urls(['blob_a', 'blob_b', 'blob_c', 'blob_b', None])
+
+        self.assertEqual(set(urls), {'blob_a', 'blob_b', 'blob_c'})
+        self.assertEqual(urls['blob_a'], 'https://assinada/1')
+        self.assertEqual(self.contador, 3)
+        self.assertEqual(self.bucket.blob.call_count, 3)
+
+    def test_falha_individual_retorna_none(self):
+        blob = self.bucket.blob.return_value
+        blob.generate_signed_url.side_effect = Exception("sem permissão")
+        self.assertIsNone(storage.generate_signed_url('blob_x'))
+        self.assertIsNone(storage._get_cache_urls().obter('bucket/blob_x/3600'))
+
+
+if __name__ == '__main__':
+    unittest.main()
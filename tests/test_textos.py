@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src.core import textos
+
+
+class TestBackendSQLite(unittest.TestCase):
+
+    def setUp(self):
+        arquivo = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        arquivo.close()
+        self.addCleanup(os.remove, arquivo.name)
+        self.backend = textos.BackendSQLite(arquivo.name)
+
+    def test_salvar_ler_e_remover(self):
+        self.backend.salvar('doc', {'doc#chunk_0': 'um', 'doc#chunk_1': 'dois'})
+        self.assertEqual(self.backend.obter_varios(['doc#chunk_1', 'nada']), {'doc#chunk_1': 'dois'})
+        self.backend.remover(['doc#chunk_0'])
+        self.assertEqual(self.backend.obter_varios(['doc#chunk_0', 'doc#chunk_1']), {'doc#chunk_1': 'dois'})
+
+    def test_leitura_de_muitos_ids(self):
+        self.backend.salvar('doc', {f'doc#chunk_{i}': str(i) for i in range(2000)})
+        self.assertEqual(len(self.backend.obter_varios([f'doc#chunk_{i}' for i in range(2000)])), 2000)
+
+
+class TestArmazemTextos(unittest.TestCase):
+
+    def test_so_os_ausentes_do_lru_vao_ao_backend_em_uma_leitura(self):
+        backend = MagicMock()
+        backend.obter_varios.return_value = {'b': 'texto b'}
+        armazem = textos.ArmazemTextos(backend)
+        armazem.salvar('doc', {'a': 'texto a'})
+
+        self.assertEqual(armazem.obter_varios(['a', 'b', 'c', 'b']), {'a': 'texto a', 'b': 'texto b'})
+        backend.obter_varios.assert_called_once_with(['b', 'c'])
+
+        backend.obter_varios.reset_mock()
+        armazem.obter_varios(['a', 'b'])
+        backend.obter_varios.assert_not_called()
+
+    def test_remover_limpa_o_lru(self):
+        backend = MagicMock()
+        backend.obter_varios.return_value = {}
+        armazem = textos.ArmazemTextos(backend)
+        armazem.salvar('doc', {'a': 'texto a'})
+        armazem.remover(['a'])
+        self.assertEqual(armazem.obter_varios(['a']), {})
+        backend.remover.assert_called_once_with(['a'])
+
+
+class TestBackendFirestore(unittest.TestCase):
+
+    def test_leitura_em_lote_com_get_all(self):
+        db = MagicMock()
+        existe, falta = MagicMock(exists=True, id='a'), MagicMock(exists=False, id='b')
+        existe.to_dict.return_value = {'doc_id': 'doc', 'texto': 'texto a'}
+        db.get_all.return_value = [existe, falta]
+
+        self.assertEqual(textos.BackendFirestore(db).obter_varios(['a', 'b']), {'a': 'texto a'})
+        db.get_all.assert_called_once()
+        db.collection.assert_called_with(textos.COLLECTION_TEXTOS)
+
+    def test_sem_firestore_usa_sqlite(self):
+        with tempfile.TemporaryDirectory() as pasta, patch('src.core.textos.db', None):
+            backend = textos.criar_backend({'TEXTOS_SQLITE_PATH': os.path.join(pasta, 't.db')})
+        self.assertIsInstance(backend, textos.BackendSQLite)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+import unittest
+import os
+import tempfile
+from unittest.mock import MagicMock, patch
+
+from flask import Flask
+
+from src.core import textos, vector_db
+
+
+class TestVectorDB(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config.update({
+            'PINECONE_INDEX_NAME': 'teste',
+            'CHUNK_TAMANHO': 300,
+            'CHUNK_SOBREPOSICAO': 0,
+            'PINECONE_LOTE_UPSERT': 2,
+            'PINECONE_ATRASO_CONSISTENCIA': 0,
+        })
+        vector_db._cache_buscas = None
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.index = MagicMock()
+        patcher = patch('src.core.vector_db._get_index', return_value=self.index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.ctx.pop)
+
+        arquivo = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        arquivo.close()
+        self.addCleanup(os.remove, arquivo.name)
+        self.armazem = textos.ArmazemTextos(textos.BackendSQLite(arquivo.name))
+        patcher = patch('src.core.vector_db.textos.get_armazem_textos', return_value=self.armazem)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch('src.core.vector_db.gerar_embeddings')
+    def test_salvar_fragmenta_em_lotes(self, mock_embed):
+        mock_embed.side_effect = lambda textos, task_type: [[0.1, 0.2] for _ in textos]
+        self.index.list.return_value = iter([['doc#chunk_0', 'doc#chunk_9']])
+        paginas = ["\n\n".join(["Parágrafo longo de teste. " * 5] * 3), "Página dois."]
+
+        total = vector_db.salvar_no_vetor('doc', paginas, {'assunto': 'Festa', 'segmento': 'AI'})
+
+        self.assertGreater(total, 1)
+        mock_embed.assert_called_once()
+        self.assertEqual(len(mock_embed.call_args.args[0]), total)
+        registros = [r for c in self.index.upsert.call_args_list for r in c.kwargs['vectors']]
+        self.assertEqual([r['id'] for r in registros], [f'doc#chunk_{i}' for i in range(total)])
+        self.assertTrue(all(len(c.kwargs['vectors']) <= 2 for c in self.index.upsert.call_args_list))
+        self.assertEqual(registros[0]['metadata']['doc_id'], 'doc')
+        self.assertEqual(registros[-1]['metadata']['pagina_fim'], 2)
+        # Fragmento obsoleto de versão anterior e id legado são removidos
+        self.index.delete.assert_called_once_with(ids=['doc#chunk_9', 'doc'])
+        # Texto fica no armazém, não no metadata do vetor
+        self.assertNotIn('text', registros[0]['metadata'])
+        salvos = self.armazem.backend.obter_varios([r['id'] for r in registros])
+        self.assertEqual(len(salvos), total)
+        self.assertIn("Parágrafo longo", salvos['doc#chunk_0'])
+
+    def test_excluir_usa_manifesto(self):
+        self.armazem.salvar('doc', {'doc#chunk_0': 'a', 'doc#chunk_2': 'c', 'outro#chunk_0': 'x'})
+        vector_db.excluir_do_vetor('doc', total_fragmentos=3)
+        self.index.delete.assert_called_once_with(ids=['doc#chunk_0', 'doc#chunk_1', 'doc#chunk_2', 'doc'])
+        self.index.list.assert_not_called()
+        self.assertEqual(self.armazem.backend.obter_varios(['doc#chunk_0', 'doc#chunk_2', 'outro#chunk_0']),
+                         {'outro#chunk_0': 'x'})
+
+    def test_excluir_sem_manifesto_usa_prefixo(self):
+        self.index.list.return_value = iter([['doc#chunk_0'], ['doc#chunk_1']])
+        vector_db.excluir_do_vetor('doc')
+        self.index.list.assert_called_once_with(prefix='doc#')
+        self.index.delete.assert_called_once_with(ids=['doc#chunk_0', 'doc#chunk_1', 'doc'])
+
+    def test_atualizar_metadados_em_todos_os_fragmentos(self):
+        vector_db.atualizar_metadados_vetor('doc', {'segmento': 'EM'}, total_fragmentos=2)
+        ids = [c.kwargs['id'] for c in self.index.update.call_args_list]
+        self.assertEqual(ids, ['doc#chunk_0', 'doc#chunk_1'])
+
+    def test_atualizar_documento_legado(self):
+        self.index.list.return_value = iter([])
+        vector_db.atualizar_metadados_vetor('antigo', {'segmento': 'EM'})
+        self.index.update.assert_called_once_with(id='antigo', set_metadata={'segmento': 'EM'})
+
+    @patch('src.core.vector_db.gerar_embedding', return_value=[0.1])
+    def test_busca_agrupa_fragmentos_por_documento(self, _embed):
+        meta = {'doc_id': 'doc', 'nome_arquivo': 'doc.pdf', 'url_download': 'blob', 'assunto': 'Festa'}
+        self.index.query.return_value = {'matches': [
+            {'id': 'doc#chunk_2', 'score': 0.9, 'metadata': {**meta, 'chunk': 2, 'text': 'trecho dois'}},
+            {'id': 'outro', 'score': 0.8, 'metadata': {'nome_arquivo': 'o.pdf', 'text': 'legado'}},
+            {'id': 'doc#chunk_0', 'score': 0.7, 'metadata': {**meta, 'chunk': 0, 'text': 'trecho zero'}},
+            {'id': 'ruim', 'score': 0.1, 'metadata': {'text': 'irrelevante'}},
+        ]}
+
+        docs = vector_db.buscar_documentos("festa")
+
+        self.assertEqual([d['id'] for d in docs], ['doc', 'outro'])
+        self.assertIn('Assunto: Festa', docs[0]['conteudo'])
+        self.assertLess(docs[0]['conteudo'].index('trecho zero'), docs[0]['conteudo'].index('trecho dois'))
+        self.assertEqual(docs[1]['conteudo'], 'legado')
+
+    @patch('src.core.vector_db.gerar_embedding', return_value=[0.1])
+    def test_busca_le_texto_so_dos_fragmentos_acima_do_corte(self, _embed):
+        self.armazem.salvar('doc', {'doc#chunk_0': 'trecho zero', 'doc#chunk_1': 'trecho um'})
+        self.armazem.cache.limpar()
+        meta = {'doc_id': 'doc', 'nome_arquivo': 'doc.pdf', 'url_download': 'blob'}
+        self.index.query.return_value = {'matches': [
+            {'id': 'doc#chunk_1', 'score': 0.9, 'metadata': {**meta, 'chunk': 1}},
+            {'id': 'doc#chunk_0', 'score': 0.8, 'metadata': {**meta, 'chunk': 0}},
+            {'id': 'longe#chunk_0', 'score': 0.1, 'metadata': {'doc_id': 'longe', 'chunk': 0}},
+        ]}
+
+        with patch.object(self.armazem.backend, 'obter_varios',
+                          wraps=self.armazem.backend.obter_varios) as leitura:
+            docs = vector_db.buscar_documentos("passeio")
+
+        leitura.assert_called_once_with(['doc#chunk_1', 'doc#chunk_0'])
+        self.assertEqual(len(docs), 1)
+        self.assertLess(docs[0]['conteudo'].index('trecho zero'), docs[0]['conteudo'].index('trecho um'))
+
+    @patch('src.core.vector_db.gerar_embedding', return_value=[0.1])
+    def test_cache_de_busca_invalidado_por_mudanca_no_corpus(self, _embed):
+        self.index.query.return_value = {'matches': [
+            {'id': 'a', 'score': 0.9, 'metadata': {'nome_arquivo': 'a.pdf', 'text': 'festa junina'}}
+        ]}
+
+        r1 = vector_db.buscar_documentos("Festa junina", ['AI'])
+        r2 = vector_db.buscar_documentos("  festa   JUNINA ", ['AI'])
+        self.assertEqual(r1, r2)
+        self.assertEqual(self.index.query.call_count, 1)
+
+        # Filtro diferente não reaproveita
+        vector_db.buscar_documentos("Festa junina", ['EM'])
+        self.assertEqual(self.index.query.call_count, 2)
+
+        # Exclusão muda a versão do corpus
+        vector_db.excluir_do_vetor('a', total_fragmentos=1)
+        vector_db.buscar_documentos("Festa junina", ['AI'])
+        self.assertEqual(self.index.query.call_count, 3)
+
+    @patch('src.core.vector_db.gerar_embedding', return_value=[0.1])
+    def test_filtro_por_publico_substitui_segmento(self, _embed):
+        self.index.query.return_value = {'matches': []}
+        vector_db.buscar_documentos("passeio", ['AI'], publico=['TODOS', 'AI', 'AI/3º Ano'])
+        self.assertEqual(self.index.query.call_args.kwargs['filter'],
+                         {'publico': {'$in': ['AI', 'AI/3º Ano', 'TODOS']}})
+
+        # Outro público não reaproveita o cache
+        vector_db.buscar_documentos("passeio", ['AI'], publico=['TODOS', 'AI', 'AI/4º Ano'])
+        self.assertEqual(self.index.query.call_count, 2)
+
+    @patch('src.core.vector_db.gerar_embedding', return_value=[0.1])
+    def test_resultado_em_cache_nao_e_alterado_pelo_chamador(self, _embed):
+        self.index.query.return_value = {'matches': [
+            {'id': 'a', 'score': 0.9, 'metadata': {'nome_arquivo': 'a.pdf', 'text': 'texto'}}
+        ]}
+        vector_db.buscar_documentos("pergunta")[0]['conteudo'] = 'alterado'
+        self.assertEqual(vector_db.buscar_documentos("pergunta")[0]['conteudo'], 'texto')
+
+    @patch('src.core.vector_db.gerar_embedding', side_effect=ConnectionError("rede"))
+    def test_erro_nao_e_cacheado(self, mock_embed):
+        self.assertEqual(vector_db.buscar_documentos("pergunta"), [])
+        self.assertEqual(vector_db.buscar_documentos("pergunta"), [])
+        self.assertEqual(mock_embed.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()